@@ -1,23 +1,37 @@
 # -*- coding: utf-8 -*-
 __title__ = "Mark Detail Items"
 __author__ = "ChatGPT and You"
+__persistentengine__ = True  # SheetMarkUpdater живого режима работает после завершения скрипта
 
-from Autodesk.Revit.DB import FilteredElementCollector, BuiltInCategory, Transaction
-from pyrevit import revit, forms
+import time
+
+from Autodesk.Revit.DB import FilteredElementCollector, Transaction, ViewSheet
+from pyrevit import revit, forms, HOST_APP, EXEC_PARAMS
 from Autodesk.Revit.UI import TaskDialog
+from Peer.SheetViews import SheetViewIndex
+from Peer.SheetMarks import detail_items_on_views, assign_marks, is_registered, register, unregister
 
 doc = revit.doc
 
-try:
-    # 1. Получаем все листы
-    sheets = FilteredElementCollector(doc)\
-        .OfCategory(BuiltInCategory.OST_Sheets)\
-        .WhereElementIsNotElementType()\
-        .ToElements()
+# Shift+клик — включить/выключить живой режим: Mark обновляется сам при размещении
+# и удалении видов на листах и при смене номера листа
+if EXEC_PARAMS.config_mode:
+    if is_registered(HOST_APP.addin_id):
+        unregister(HOST_APP.addin_id)
+        TaskDialog.Show("Assign Sheet Number to Mark", "Живой режим выключен.")
+    else:
+        register(doc, HOST_APP.addin_id)
+        TaskDialog.Show("Assign Sheet Number to Mark",
+                        "Живой режим включён до конца сессии Revit.\n"
+                        "Повторный Shift+клик — выключить.")
+    raise SystemExit
 
-    # 2. Собираем список номеров листов
-    sheet_numbers = [sheet.SheetNumber for sheet in sheets]
-    sheet_numbers.sort()
+try:
+    # 1-2. Листы и словарь номер листа -> лист: один сбор, только листы
+    sheets_by_number = dict((sheet.SheetNumber, sheet) for sheet in FilteredElementCollector(doc)
+                            .OfClass(ViewSheet)
+                            .WhereElementIsNotElementType())
+    sheet_numbers = sorted(sheets_by_number)
 
     # 3. Запрос выбора листов
     selected_sheet_numbers = forms.SelectFromList.show(sheet_numbers,
@@ -28,55 +42,34 @@ try:
     if not selected_sheet_numbers:
         TaskDialog.Show("Assign Sheet Number to Mark", "Вы не выбрали ни одного листа.")
     else:
-        # 4. Фильтруем выбранные листы
-        selected_sheets = [sheet for sheet in sheets if sheet.SheetNumber in selected_sheet_numbers]
+        # 4. Выбранные листы
+        selected_sheets = [sheets_by_number[number] for number in selected_sheet_numbers]
 
-        # 5. Получаем все Viewports
-        viewports = FilteredElementCollector(doc)\
-            .OfCategory(BuiltInCategory.OST_Viewports)\
-            .WhereElementIsNotElementType()\
-            .ToElements()
-
-        # 6. Создаём словарь ViewId → SheetNumber
+        # 5-6. Словарь ViewId → SheetNumber по видам выбранных листов
+        sheet_views = SheetViewIndex(doc, selected_sheets)
         view_to_sheet = {}
-        for vp in viewports:
-            sheet = doc.GetElement(vp.SheetId)
-            if sheet and sheet.SheetNumber in selected_sheet_numbers:
-                view_to_sheet[vp.ViewId.IntegerValue] = sheet.SheetNumber
+        for sheet in selected_sheets:
+            for view_id in sheet_views.view_ids_on(sheet):
+                view_to_sheet[view_id] = sheet.SheetNumber
 
-        # 7. Получаем все Detail Items
-        detail_items = FilteredElementCollector(doc)\
-            .OfCategory(BuiltInCategory.OST_DetailComponents)\
-            .WhereElementIsNotElementType()\
-            .ToElements()
+        # 7. Detail Items только с видов выбранных листов: сборщик на вид вместо всего документа
+        collect_start = time.time()
+        items = detail_items_on_views(doc, view_to_sheet)
+        collect_seconds = time.time() - collect_start
 
-        # 8. Обновляем параметр Mark
+        # 8. Обновляем параметр Mark (пишется только там, где номер отличается)
+        write_start = time.time()
         t = Transaction(doc, "Assign Sheet Number to Mark")
         t.Start()
-
-        updated_count = 0
-        skipped_count = 0
-
-        for item in detail_items:
-            try:
-                owner_view_id = item.OwnerViewId
-                sheet_number = view_to_sheet.get(owner_view_id.IntegerValue)
-                if sheet_number:
-                    param = item.LookupParameter("Mark")
-                    if param and not param.IsReadOnly:
-                        current_value = param.AsString()
-                        if current_value != sheet_number:
-                            param.Set(sheet_number)
-                            updated_count += 1
-                        else:
-                            skipped_count += 1
-            except Exception as e:
-                continue
-
+        updated_count, skipped_count = assign_marks(doc, items, view_to_sheet)
         t.Commit()
+        write_seconds = time.time() - write_start
 
         TaskDialog.Show("Assign Sheet Number to Mark",
-                        "Обновлено элементов: {}\nПропущено (уже совпадает): {}".format(updated_count, skipped_count))
+                        "Обновлено элементов: {}\nПропущено (уже совпадает): {}\n\n"
+                        "Видов: {}, элементов: {}\nСбор: {:.2f} с, запись: {:.2f} с".format(
+                            updated_count, skipped_count, len(view_to_sheet), len(items),
+                            collect_seconds, write_seconds))
 
 except Exception as e:
     TaskDialog.Show("Ошибка выполнения", str(e))
@@ -2,15 +2,30 @@
 
 __title__ = "Numbering"
 __author__ = "Dima D"
-__doc__ = "Нумерует элементы в активной спецификации, сортируя их как в таблице, и записывает в выбранный параметр из выпадающего списка, начиная с 1."
+__doc__ = "Нумерует элементы в активной спецификации в порядке её сортировки и записывает в выбранный параметр. Нумерация сквозная или заново в каждой группе; формат с префиксом, суффиксом и нулями (C-###)."
+
+import time
 
 from pyrevit import script, forms
 from Autodesk.Revit.DB import (
     ViewSchedule,
-    TableData,
-    SectionType,
     Transaction
 )
+from Peer.ScheduleNumbering import (
+    NumberFormat,
+    NumberingReport,
+    sort_fields,
+    schedule_elements,
+    body_element_ids,
+    read_rows,
+    rows_order,
+    unreadable_fields,
+    order_rows,
+    number_rows,
+    plan_writes,
+    writable_rows,
+    write_numbers,
+)
 
 doc = __revit__.ActiveUIDocument.Document
 active_view = doc.ActiveView
@@ -45,34 +60,70 @@ selected_param = forms.SelectFromList.show(
 if not selected_param:
     script.exit("Параметр не выбран.")
 
-# Собираем все элементы из строки спецификации
-table_data = active_view.GetTableData()
-section_data = table_data.GetSectionData(SectionType.Body)
-row_count = section_data.NumberOfRows
-
-element_ids = []
-
-for row in range(row_count):
-    try:
-        el_id = active_view.GetCellElementId(SectionType.Body, row, 0)
-        if el_id and el_id.IntegerValue > 0:
-            element_ids.append(el_id)
-    except Exception:
-        pass  # строка без элемента, например итоги
-
-if not element_ids:
+# Сброс нумерации: сквозная или заново в каждой группе (поля группировки с заголовком/итогом)
+fields = sort_fields(active_view)
+THROUGH = "Сквозная по всей спецификации"
+reset_options = [THROUGH]
+reset_depths = {THROUGH: 0}
+for depth, field in enumerate(fields, 1):
+    if field.has_header:
+        option = "Заново в каждой группе: {}".format(" / ".join(f.name for f in fields[:depth]))
+        reset_options.append(option)
+        reset_depths[option] = depth
+
+reset_option = THROUGH
+if len(reset_options) > 1:
+    reset_option = forms.SelectFromList.show(reset_options, title="Нумерация", multiselect=False)
+    if not reset_option:
+        script.exit("Нумерация не выбрана.")
+
+# Формат: '#' — место номера, число '#' — число цифр с нулями впереди
+pattern = forms.ask_for_string(default="#", prompt="Формат номера (например, C-### -> C-001)")
+if not pattern:
+    script.exit("Формат не задан.")
+number_format = NumberFormat.parse(pattern)
+
+report = NumberingReport()
+
+# Элементы спецификации и значения полей — один сбор и одно чтение
+start = time.time()
+elements = schedule_elements(doc, active_view)
+if not elements:
     forms.alert("Не найдено элементов в таблице.", exitscript=True)
-
-# Нумерация элементов
-with Transaction(doc, "Number Elements from Active Schedule") as t:
-    t.Start()
-    counter = 1
-    for el_id in element_ids:
-        element = doc.GetElement(el_id)
-        param = element.LookupParameter(selected_param)
-        if param and not param.IsReadOnly:
-            param.Set(str(counter))
-            counter += 1
-    t.Commit()
-
-forms.alert("Нумерация завершена!", exitscript=True)
+table, sort_values = read_rows(doc, elements, fields, selected_param)
+report.scanned = len(elements)
+report.timed("Чтение", start)
+
+# Порядок таблицы, номера и сравнение с текущими значениями; номер получают только элементы,
+# у которых параметр можно записать
+start = time.time()
+reset_depth = reset_depths[reset_option]
+ids = [e.Id.IntegerValue for e in elements]
+body_ids = body_element_ids(active_view)
+order = rows_order(ids, body_ids) if body_ids else None
+# Порядок строк таблицы нужен весь, поля — только для сброса по группам; без строк
+# таблицы порядок повторяется сортировкой, и тогда должны читаться все поля
+checked = fields[:reset_depth] if order is not None else fields
+unreadable = unreadable_fields(checked, [row[:len(checked)] for row in sort_values])
+if unreadable:
+    forms.alert(u"Порядок таблицы нельзя повторить: поля сортировки не читаются как параметры:\n{}\n\n"
+                u"Включите построчный вывод элементов или уберите эти поля из сортировки.".format(
+                    u"\n".join(unreadable)), exitscript=True)
+if order is None:
+    order = order_rows(ids, sort_values, [f.descending for f in fields])
+writable = writable_rows(table, selected_param)
+order = [i for i in order if i in writable]
+numbers = number_rows(order, sort_values, reset_depth, number_format)
+writes, report.skipped = plan_writes(table.values(selected_param), numbers, table.storage(selected_param))
+report.timed("Расчёт", start)
+
+# Нумерация элементов: пишем только отличающиеся значения
+start = time.time()
+if writes:
+    with Transaction(doc, "Number Elements from Active Schedule") as t:
+        t.Start()
+        report.written, report.failed = write_numbers(table, selected_param, writes)
+        t.Commit()
+report.timed("Запись", start)
+
+forms.alert(u"Нумерация завершена!\n\n" + report.text(), exitscript=True)
@@ -2,416 +2,245 @@
 __title__ = "Create Column"
 __author__ = "Dmitry D"
 
-from pyrevit import revit, forms
+import time
+
+from pyrevit import revit, forms, script, EXEC_PARAMS
 from Autodesk.Revit.DB import (
-    Transaction,
+    FamilyInstance,
     FilteredElementCollector,
-    BuiltInCategory,
-    FamilySymbol,
+    Transaction,
+    TransactionGroup,
     ViewDrafting,
-    XYZ,
-    Line,
-    ReferenceArray,
-    Dimension,
-    BuiltInParameter,
-    TextNoteType,
-    TextNote,
-    IndependentTag, TagMode, TagOrientation, Reference
+    ViewFamily,
 )
+from Peer.ElementIndex import ElementIndex, collect_buckets, VIEW as VIEW_BUCKET, VIEW_SHEET
+from Peer.NameRegistry import NameRegistry, view_kind
+from Peer.ColumnGroups import collect_column_groups
+from Peer.ColumnReconcile import read_placed_groups
+from Peer.ColumnPlan import columns_data_of, plan_view, view_input, dump_plan
+from Peer.ColumnExecutor import ColumnSymbols, execute_level
+from Peer.RevitFormula import load_formula_file, cross_check, dump_sample
 
 # Параметры для размещения тэга под хомутом
 STIRRUP_TAG_FAMILY_NAME = "Detail items_Tag Rebar(Text Quantity)"  # Имя семейства тэга
 STIRRUP_TAG_TYPE_NAME = "Tag Rebar"  # Имя типа тэга
-TAG_OFFSET_DOWN_CM = 25  # см вниз от центра хомута
-
-def build_marks_and_ranges(marks):
-    """
-    Возвращает список dict:
-    - одиночная марка: {num: str, num2: None, num_plus: False, width: 21}
-    - диапазон: {num: str, num2: str, num_plus: True, width: 50} — только если подряд 3 и более!
-    """
-    nums = []
-    others = []
-    for m in marks:
-        try:
-            nums.append(int(m))
-        except Exception:
-            others.append(m)
-    nums = sorted(nums)
-    result = []
-    i = 0
-    while i < len(nums):
-        start = nums[i]
-        seq = [start]
-        while i + 1 < len(nums) and nums[i + 1] == nums[i] + 1:
-            i += 1
-            seq.append(nums[i])
-        if len(seq) >= 3:
-            result.append({'num': str(seq[0]), 'num2': str(seq[-1]), 'num_plus': True, 'width': 50})
-        else:
-            for n in seq:
-                result.append({'num': str(n), 'num2': None, 'num_plus': False, 'width': 21})
-        i += 1
-    for m in sorted(others):
-        result.append({'num': m, 'num2': None, 'num_plus': False, 'width': 21})
-    return result
-
 
 doc = revit.doc
 
 # 🔹 Настройки
 FAMILY_NAME = "Create Column"
-PARAM_B = "B"
-PARAM_H = "H"
-PARAM_MARK = "Mark"
-PARAM_REBAR_QTY_X = "Rebar_QuantityX"
-PARAM_REBAR_QTY_Y = "Rebar_QuantityY"
-PARAM_LEVEL = "PR_Level"
-
 COLUMN_NUMBER_FAMILY_NAME = "PR_Column Number"
-PARAM_NUMBER = "Num"  # первое значение
-PARAM_NUMBER2 = "Num2"  # второе значение (для диапазона)
-PARAM_NUMBER_PLUS = "Num+"  # булевый (True, если диапазон)
-
 STIRRUP_FAMILY_NAME = "PEER_Rebar_Shape 52(x)"
-PARAM_REBAR_A = "Rebar_A"  # ширина хомута
-PARAM_REBAR_B = "Rebar_B"  # высота хомута
-PARAM_REBAR_NUMBER = "Rebar_Number"  # диаметр хомута (мм)
 
 TEXT_NOTE_TYPE_NAME = "Stractural 2.6"  # <-- Укажи здесь нужное название типа текста!
 
 MAX_ROW_WIDTH_CM = 2300  # Максимальная ширина ряда в см на самом виде
+LAYOUT_STRATEGY = None  # "shelf" / "skyline" / "guillotine"; None — лучшая по площади
+
+# Пакетный режим (несколько уровней за один запуск)
+MODE_PER_LEVEL = "One view per level"
+MODE_STACKED = "One view, levels stacked"
+BATCH_VIEW_NAME = "Column {}"  # имя вида уровня в режиме "вид на уровень"
+
+# Shift+клик — режимы без изменения модели: dry-run (план сохраняется в JSON)
+# или сверка формул семейства (Create Col Formula.txt) с размещёнными колоннами
+MODE_DRY_RUN = "Dry run (save plan)"
+MODE_VALIDATE = "Validate formulas"
+FORMULA_FILE = "Create Col Formula.txt"
+
+service_mode = None
+if EXEC_PARAMS.config_mode:
+    service_mode = forms.CommandSwitchWindow.show([MODE_DRY_RUN, MODE_VALIDATE], message="Shift+click mode")
+    if not service_mode:
+        script.exit()
+DRY_RUN = service_mode == MODE_DRY_RUN
+
+
+def validate_formulas():
+    """Формулы файла против значений, посчитанных семейством на размещённых колоннах."""
+    formulas = load_formula_file(script.get_bundle_file(FORMULA_FILE))
+    instances = [inst for inst in FilteredElementCollector(doc).OfClass(FamilyInstance)
+                 if inst.Symbol.FamilyName == FAMILY_NAME]
+    if not instances:
+        forms.alert("No placed '{}' instances to validate against.".format(FAMILY_NAME), exitscript=True)
+
+    rows, mismatches = cross_check(doc, instances, formulas)
+    output = script.get_output()
+    output.print_md("## Formula check — {} instances, {} mismatches".format(len(rows), len(mismatches)))
+    if mismatches:
+        output.print_table([[output.linkify(elem.Id), name, formula_value, family_value]
+                            for elem, name, formula_value, family_value in mismatches],
+                           columns=["Instance", "Parameter", "Formula", "Family"])
+    if forms.alert("Formulas checked on {} instances: {} mismatches.\n"
+                   "Save the family values as a sample for the formula self-check?".format(
+                       len(rows), len(mismatches)), yes=True, no=True):
+        sample_path = forms.save_file(file_ext="json", default_name="Create Col Sample")
+        if sample_path:
+            dump_sample(sample_path, rows)
+    script.exit()
+
+
+if service_mode == MODE_VALIDATE:
+    validate_formulas()
+
+# 🔹 Сбор колонн: один проход по колоннам и типам, группы сразу для всех уровней PR_Level
+column_groups = collect_column_groups(doc)
+levels = [lvl for lvl in column_groups.levels() if lvl]
+if not levels:
+    forms.alert("No PR_Level values found for columns.", exitscript=True)
 
-# 🔹 Drafting View
-view_name = forms.ask_for_string(default="Column 150", prompt="Enter a name for Drafting View")
-if not view_name:
-    forms.alert("Drafting View name not specified. Script stopped.", exitscript=True)
-
-drafting_view = None
-for view in FilteredElementCollector(doc).OfClass(ViewDrafting):
-    if view.Name == view_name:
-        drafting_view = view
-        break
+selected_levels = forms.SelectFromList.show(levels, title="Select Levels (PR_Level)", multiselect=True)
+if not selected_levels:
+    forms.alert("Level not selected. Script stopped.", exitscript=True)
 
-if not drafting_view:
-    # Если вида нет — создаём новый
-    with Transaction(doc, "Create Drafting View") as t:
-        t.Start()
-        # Получаем любой существующий тип Drafting View
-        view_types = list(FilteredElementCollector(doc).OfClass(ViewDrafting))
-        if view_types:
-            vt = view_types[0].GetTypeId()
-        else:
-            vt = None
-        drafting_view = ViewDrafting.Create(doc, vt)
-        drafting_view.Name = view_name
-        t.Commit()
+# 🔹 Drafting View: один уровень — как раньше; несколько — вид на уровень или один вид стопкой
+if len(selected_levels) == 1:
+    mode = MODE_PER_LEVEL
 else:
-    # Если вид есть — очищаем только нужные элементы (созданные скриптом)
-    with Transaction(doc, "Очистка текущего вида") as t:
-        t.Start()
-        to_delete = []
-        for inst in FilteredElementCollector(doc, drafting_view.Id).WhereElementIsNotElementType():
-            if hasattr(inst, "Symbol") and inst.Symbol.FamilyName in [FAMILY_NAME, COLUMN_NUMBER_FAMILY_NAME, STIRRUP_FAMILY_NAME]:
-                to_delete.append(inst.Id)
-        for eid in to_delete:
-            doc.Delete(eid)
-        t.Commit()
+    mode = forms.CommandSwitchWindow.show([MODE_PER_LEVEL, MODE_STACKED],
+                                          message="{} levels selected".format(len(selected_levels)))
+    if not mode:
+        forms.alert("Mode not selected. Script stopped.", exitscript=True)
+
+if mode == MODE_STACKED or len(selected_levels) == 1:
+    default_name = "Column 150" if len(selected_levels) == 1 else "Columns"
+    view_name = forms.ask_for_string(default=default_name, prompt="Enter a name for Drafting View")
+    if not view_name:
+        forms.alert("Drafting View name not specified. Script stopped.", exitscript=True)
+    view_jobs = [(view_name, list(selected_levels))]
+else:
+    view_jobs = [(BATCH_VIEW_NAME.format(level), [level]) for level in selected_levels]
 
+# Один проход по документу: типоразмеры, типы текста, типы видов, виды; из него же — занятые имена
+buckets = collect_buckets(doc)
+index = ElementIndex(doc, buckets)
+names = NameRegistry.from_views(buckets[VIEW_BUCKET] + buckets[VIEW_SHEET])
 
-family_symbol = None
-for symbol in FilteredElementCollector(doc).OfClass(FamilySymbol):
-    if symbol.FamilyName == FAMILY_NAME:
-        family_symbol = symbol
-        break
+drafting_type = index.view_family_type(ViewFamily.Drafting)
+if drafting_type is None:
+    forms.alert("Drafting View type not found.", exitscript=True)
+
+family_symbol = index.symbol(FAMILY_NAME)
 if family_symbol is None:
     forms.alert("Family '{}' not found.".format(FAMILY_NAME), exitscript=True)
 
 # Поиск семейства хомута
-stirrup_symbol = None
-for symbol in FilteredElementCollector(doc).OfClass(FamilySymbol):
-    if symbol.FamilyName == STIRRUP_FAMILY_NAME:
-        stirrup_symbol = symbol
-        break
+stirrup_symbol = index.symbol(STIRRUP_FAMILY_NAME)
 if stirrup_symbol is None:
     forms.alert("Family '{}' not found.".format(STIRRUP_FAMILY_NAME), exitscript=True)
 
 # Поиск типа тэга для хомутов
-stirrup_tag_type = None
-
-
-for tag_type in FilteredElementCollector(doc).OfClass(FamilySymbol).OfCategory(BuiltInCategory.OST_DetailComponentTags):
-    name_param = tag_type.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
-    tag_type_name = name_param.AsString() if name_param else None
-    if tag_type.FamilyName == STIRRUP_TAG_FAMILY_NAME and tag_type_name == STIRRUP_TAG_TYPE_NAME:
-        stirrup_tag_type = tag_type
-        break
+stirrup_tag_type = index.symbol(STIRRUP_TAG_FAMILY_NAME, STIRRUP_TAG_TYPE_NAME)
 
 if stirrup_tag_type is None:
     forms.alert("Tag type '{}' in family '{}' not found.".format(STIRRUP_TAG_TYPE_NAME, STIRRUP_TAG_FAMILY_NAME), exitscript=True)
 
-# 🔹 Сбор уникальных уровней PR_Level
-all_columns = list(FilteredElementCollector(doc)
-                   .OfCategory(BuiltInCategory.OST_StructuralColumns)
-                   .WhereElementIsNotElementType())
-levels = set()
-for col in all_columns:
-    level_param = col.LookupParameter(PARAM_LEVEL)
-    if level_param and level_param.HasValue:
-        levels.add(level_param.AsString())
-levels = sorted([lvl for lvl in levels if lvl])
-if not levels:
-    forms.alert("No PR_Level values found for columns.", exitscript=True)
-
-selected_level = forms.SelectFromList.show(levels, title="Select a Level (PR_Level)")
-if not selected_level:
-    forms.alert("Level not selected. Script stopped.", exitscript=True)
-
-from collections import defaultdict
+symbols = ColumnSymbols(family_symbol, index.symbol(COLUMN_NUMBER_FAMILY_NAME), stirrup_symbol,
+                        stirrup_tag_type, index.text_note_type(TEXT_NOTE_TYPE_NAME))
 
 low_rebar_marks = []  # Список марок колонн с малым армированием
 
-grouped_columns = defaultdict(lambda: {"marks": [], "width": 0, "height": 0, "rebar_qty_x": 0, "rebar_qty_y": 0, "rebar_diam": 0})
-for col in all_columns:
-    level_param = col.LookupParameter(PARAM_LEVEL)
-    if not (level_param and level_param.HasValue and level_param.AsString() == selected_level):
-        continue
-    mark_param = col.LookupParameter(PARAM_MARK)
-    col_mark = mark_param.AsString() if mark_param and mark_param.HasValue else "N/A"
-    col_type = doc.GetElement(col.GetTypeId())
-    width = col_type.LookupParameter(PARAM_B)
-    height = col_type.LookupParameter(PARAM_H)
-    width_value = width.AsDouble() if width else 0
-    height_value = height.AsDouble() if height else 0
-    rebar_qty_x = col.LookupParameter(PARAM_REBAR_QTY_X)
-    rebar_qty_y = col.LookupParameter(PARAM_REBAR_QTY_Y)
-    qty_x = rebar_qty_x.AsDouble() if rebar_qty_x and rebar_qty_x.HasValue else 0
-    qty_y = rebar_qty_y.AsDouble() if rebar_qty_y and rebar_qty_y.HasValue else 0
-    rebar_diam_param = col.LookupParameter("Rebar_Diameter")
-    rebar_diam_value = rebar_diam_param.AsDouble() if rebar_diam_param and rebar_diam_param.HasValue else 0
-
-
-    key = (round(width_value, 6), round(height_value, 6), qty_x, qty_y)
-    grouped_columns[key]["marks"].append(col_mark)
-    grouped_columns[key]["width"] = width_value
-    grouped_columns[key]["height"] = height_value
-    grouped_columns[key]["rebar_qty_x"] = qty_x
-    grouped_columns[key]["rebar_qty_y"] = qty_y
-    grouped_columns[key]["rebar_diam"] = rebar_diam_value
-
-columns_data = []
-for data in grouped_columns.values():
-    columns_data.append({
-        "marks": data["marks"],
-        "width": data["width"],
-        "height": data["height"],
-        "rebar_qty_x": data["rebar_qty_x"],
-        "rebar_qty_y": data["rebar_qty_y"],
-        "rebar_diam": data["rebar_diam"]
-    })
-columns_data.sort(key=lambda c: (-c["width"] * c["height"], -c["rebar_qty_x"]-c["rebar_qty_y"]))
-
 spacing_ft = 200 * 0.0328084
 max_row_width_ft = MAX_ROW_WIDTH_CM / 100.0 * 3.28084  # из см в футы
-current_row_width = 0
-current_row_y = 0
-
-with Transaction(doc, "Place Columns") as t:
-    t.Start()
-    if not family_symbol.IsActive:
-        family_symbol.Activate()
-    if not stirrup_symbol.IsActive:
-        stirrup_symbol.Activate()
-    if not stirrup_tag_type.IsActive:
-        stirrup_tag_type.Activate()
-    stirrups_to_place = []
-    for col_data in columns_data:
-        width = col_data["width"]
-        height = col_data["height"]
-        if width > 0 and height > 0:
-            if current_row_width + width > max_row_width_ft:
-                current_row_width = 0
-                current_row_y -= (height + spacing_ft)
-            location_point = XYZ(current_row_width, current_row_y, 0)
-            instance = doc.Create.NewFamilyInstance(location_point, family_symbol, drafting_view)
-            # Устанавливаем B и H
-            p_b = instance.LookupParameter(PARAM_B)
-            if p_b: p_b.Set(width)
-            p_h = instance.LookupParameter(PARAM_H)
-            if p_h: p_h.Set(height)
-            # Получаем Reference границ из семейства
-            ref_left = instance.GetReferenceByName("Left")
-            ref_right = instance.GetReferenceByName("Right")
-            ref_top = instance.GetReferenceByName("Top")
-            ref_bottom = instance.GetReferenceByName("Bottom")
-            # Горизонтальный размер (ширина)
-            if ref_left and ref_right:
-                ref_array_h = ReferenceArray()
-                ref_array_h.Append(ref_left)
-                ref_array_h.Append(ref_right)
-                offset_horizontal = XYZ(0, -0.5, 0)
-                pt1 = location_point + offset_horizontal
-                pt2 = XYZ(location_point.X + width, location_point.Y, 0) + offset_horizontal
-                dim_line_h = Line.CreateBound(pt1, pt2)
-                doc.Create.NewDimension(drafting_view, dim_line_h, ref_array_h)
-            # Вертикальный размер (высота)
-            if ref_top and ref_bottom:
-                ref_array_v = ReferenceArray()
-                ref_array_v.Append(ref_bottom)
-                ref_array_v.Append(ref_top)
-                offset_vertical = XYZ(-0.5, 0, 0)
-                pt3 = location_point + offset_vertical
-                pt4 = XYZ(location_point.X, location_point.Y + height, 0) + offset_vertical
-                dim_line_v = Line.CreateBound(pt3, pt4)
-                doc.Create.NewDimension(drafting_view, dim_line_v, ref_array_v)
-
-            # Новый параметр армирования
-            p_rebar_qty_x = instance.LookupParameter(PARAM_REBAR_QTY_X)
-            if p_rebar_qty_x:
-                try:
-                    p_rebar_qty_x.Set(col_data["rebar_qty_x"])
-                except Exception as e:
-                    print("Error setting {}: {}".format(PARAM_REBAR_QTY_X, e))
-
-            p_rebar_qty_y = instance.LookupParameter(PARAM_REBAR_QTY_Y)
-            if p_rebar_qty_y:
-                try:
-                    p_rebar_qty_y.Set(col_data["rebar_qty_y"])
-                except Exception as e:
-                    print("Error setting {}: {}".format(PARAM_REBAR_QTY_Y, e))
-            # Устанавливаем Rebar_Diameter
-            p_rebar_diam = instance.LookupParameter("Rebar_Diameter")
-            if p_rebar_diam:
-                try:
-                    p_rebar_diam.Set(col_data["rebar_diam"])
-                except Exception as e:
-                    print("Error setting Rebar_Diameter: {}".format(e))
-            # Добавляем текст на иврите только с размерами колонны
-
-            text_type = None
-            for ttype in FilteredElementCollector(doc).OfClass(TextNoteType):
-                type_name = ttype.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM).AsString()
-                if type_name == TEXT_NOTE_TYPE_NAME:
-                    text_type = ttype
-                    break
-            if not text_type:
-                text_type = FilteredElementCollector(doc).OfClass(TextNoteType).FirstElement()
-
-            b_int = int(round(width * 30.48))  # футы -> см
-            h_int = int(round(height * 30.48))  # футы -> см
-            hebrew_text = u"עמוד {}/{}".format(b_int, h_int)
-            text_location = location_point + XYZ(0, -1.2, 0)
-            text_note = TextNote.Create(doc, drafting_view.Id, text_location,
-                                        hebrew_text, text_type.Id)
-            # Размещаем семейства с номерами марок (PR_Column Number)
-            column_number_symbol = None
-            for symbol in FilteredElementCollector(doc).OfClass(FamilySymbol):
-                if symbol.FamilyName == COLUMN_NUMBER_FAMILY_NAME:
-                    column_number_symbol = symbol
-                    break
-            if column_number_symbol is not None:
-                if not column_number_symbol.IsActive:
-                    column_number_symbol.Activate()
-                marks_sorted = sorted(col_data["marks"], key=lambda m: int(m) if m.isdigit() else m)
-                marks_for_inserts = build_marks_and_ranges(marks_sorted)
-                row = 0
-                items_in_row = 0
-                cur_x = text_location.X - 21 * 0.0328084  # стартовая позиция по X (слева от подписи)
-                cur_y = text_location.Y - 5.5 * 0.0328084
-                for idx, mark_dict in enumerate(marks_for_inserts):
-                    if (items_in_row >= 5) or (items_in_row >= 2 and mark_dict['num_plus']):
-                        row += 1
-                        cur_x = text_location.X - 21 * 0.0328084
-                        cur_y = cur_y - row * 21 * 0.0328084
-                        items_in_row = 0
-                    mark_location = XYZ(cur_x, cur_y, 0)
-                    mark_instance = doc.Create.NewFamilyInstance(mark_location, column_number_symbol, drafting_view)
-                    p_number = mark_instance.LookupParameter(PARAM_NUMBER)
-                    p_number2 = mark_instance.LookupParameter(PARAM_NUMBER2)
-                    p_num_plus = mark_instance.LookupParameter(PARAM_NUMBER_PLUS)
-                    if p_number:
-                        p_number.Set(str(mark_dict['num']))
-                    if p_number2:
-                        if mark_dict['num2']:
-                            p_number2.Set(str(mark_dict['num2']))
-                        else:
-                            p_number2.Set("")
-                    if p_num_plus:
-                        p_num_plus.Set(1 if mark_dict['num_plus'] else 0)
-                    cur_x -= (mark_dict['width'] * 0.0328084)
-                    items_in_row += 1
-            else:
-                print("Family PR_Column Number not found")
-
-            # Данные для размещения хомута сохраняем для второго прохода
-            stirrups_to_place.append({
-                "location_point": location_point,
-                "width": width,
-                "height": height
-            })
-
-            current_row_width += width + spacing_ft
-
-    # После расстановки всех колонн и аннотаций — расставляем хомуты
-    def mm_to_ft(mm):
-        return mm / 304.8
-
-    for stirrup_info in stirrups_to_place:
-        loc = stirrup_info["location_point"]
-        width = stirrup_info["width"]
-        height = stirrup_info["height"]
-        # Смещение: центр хомута на 30 см правее ПРАВОГО края колонны
-        center_x = loc.X+width/2
-        center_y = loc.Y + height / 2
-        stirrup_x = center_x + width
-        stirrup_location = XYZ(stirrup_x, center_y, 0)
-        stirrup_instance = doc.Create.NewFamilyInstance(stirrup_location, stirrup_symbol, drafting_view)
-
-        # Автоматическое определение единиц: если width > 10 — это мм, иначе футы
-        def mm_to_ft(mm):
-            return mm / 304.8
-
-        if width > 10:
-            stirrup_a = width - 50
-            stirrup_b = height - 50
-        else:
-            stirrup_a = width * 304.8 - 50
-            stirrup_b = height * 304.8 - 50
-        p_stirrup_a = stirrup_instance.LookupParameter(PARAM_REBAR_A)
-        p_stirrup_b = stirrup_instance.LookupParameter(PARAM_REBAR_B)
-        if p_stirrup_a:
-            p_stirrup_a.Set(mm_to_ft(stirrup_a))
-        if p_stirrup_b:
-            p_stirrup_b.Set(mm_to_ft(stirrup_b))
-        p_rebar_number = stirrup_instance.LookupParameter("Rebar_Diameter")
-        if p_rebar_number:
-            p_rebar_number.Set(mm_to_ft(8))
-        p_rebar_spacing = stirrup_instance.LookupParameter("Rebar_Spacing")
-        if p_rebar_spacing:
-            p_rebar_spacing.Set(mm_to_ft(200))
-
-        # --- ДОБАВЛЕНИЕ ТЭГА под хомутом ---
-        # stirrup_b — высота хомута в мм
-        stirrup_b_ft = mm_to_ft(stirrup_b+350)  # в футах
-        Space_x=mm_to_ft(300)
-        tag_y = stirrup_location.Y - stirrup_b_ft / 2  # низ хомута = верх тэга
-        tag_x = stirrup_location.X + Space_x  # низ хомута = верх тэга
-        tag_location = XYZ(tag_x, tag_y, 0)
-        stirrup_tag = IndependentTag.Create(
-            doc,
-            drafting_view.Id,
-            Reference(stirrup_instance),
-            False,  # isLeader
-            TagMode.TM_ADDBY_CATEGORY,
-            TagOrientation.Horizontal,
-            tag_location
-        )
-        stirrup_tag.ChangeTypeId(stirrup_tag_type.Id)
-
-    t.Commit()
+
+
+def get_drafting_view(name):
+    view = index.view(name, ViewDrafting)
+    if view is not None:
+        return view
+    with Transaction(doc, "Create Drafting View") as t:
+        t.Start()
+        view = ViewDrafting.Create(doc, drafting_type.Id)
+        # Имена уникальны только среди чертёжных видов, а такого вида нет (index.view выше),
+        # поэтому имя остаётся как есть и находится при следующем запуске
+        view.Name = names.reserve(view_kind(view.ViewType), name)
+        t.Commit()
+    index.add_view(view)
+    return view
+
+
+# 🔹 Планирование: что уже стоит на видах + группы уровней -> план (без записи в модель)
+inputs = []
+plans = []
+plan_start = time.time()
+for view_name, view_levels in view_jobs:
+    stacked = len(view_levels) > 1 or mode == MODE_STACKED
+    existing = index.view(view_name, ViewDrafting)
+    if existing is None:
+        placed_groups, legacy_ids, legacy_locations = {}, [], []
+    else:
+        placed_groups, legacy_ids, legacy_locations = read_placed_groups(
+            doc, existing, FAMILY_NAME, COLUMN_NUMBER_FAMILY_NAME, STIRRUP_FAMILY_NAME)
+    levels_data = [(level, columns_data_of(column_groups.groups(level)))
+                   for level in view_levels]
+    if DRY_RUN:
+        inputs.append(view_input(view_name, levels_data, placed_groups, legacy_ids,
+                                 legacy_locations, stacked))
+    plans.append(plan_view(view_name, levels_data, placed_groups, legacy_ids, legacy_locations,
+                           stacked, max_row_width_ft, spacing_ft, LAYOUT_STRATEGY))
+plan_seconds = time.time() - plan_start
+
+if DRY_RUN:
+    plan_path = forms.save_file(file_ext="json", default_name="create_column_plan")
+    if not plan_path:
+        script.exit()
+    dump_plan(plan_path, inputs, plans)
+    forms.alert("Dry run: plan for {} view(s) saved to\n{}\nPlanning took {:.2f} s.".format(
+        len(plans), plan_path, plan_seconds))
+    script.exit()
+
+# 🔹 Исполнение плана
+summary_rows = []
+role_timing = {}  # роль -> [экземпляров, вызовов создания, создание с, параметры с]
+
+tg = TransactionGroup(doc, "Create Column")
+tg.Start()
+try:
+    with Transaction(doc, "Activate Symbols") as t:
+        t.Start()
+        symbols.activate()
+        t.Commit()
+    for plan in plans:
+        drafting_view = get_drafting_view(plan["view"])
+        for level_plan in plan["levels"]:
+            start = time.time()
+            with Transaction(doc, "Place Columns: {}".format(level_plan["level"])) as t:
+                t.Start()
+                planner = execute_level(doc, drafting_view, level_plan, symbols)
+                t.Commit()
+            for role, count, batches, create_s, param_s in planner.timing_rows():
+                totals = role_timing.setdefault(role, [0, 0, 0.0, 0.0])
+                for i, value in enumerate((count, batches, create_s, param_s)):
+                    totals[i] += value
+
+            counts = level_plan["counts"]
+            summary_rows.append([level_plan["level"], plan["view"], counts["columns"],
+                                 counts["groups"], counts["created"], counts["updated"],
+                                 counts["deleted"], counts["unchanged"],
+                                 "{:.2f}".format(time.time() - start)])
+    tg.Assimilate()
+except Exception:
+    tg.RollBack()
+    raise
+
+if len(summary_rows) > 1:
+    output = script.get_output()
+    output.print_md("## Create Column — {} levels".format(len(summary_rows)))
+    output.print_table(summary_rows, columns=["Level", "View", "Columns", "Groups", "Created",
+                                              "Updated", "Deleted", "Unchanged", "Time, s"])
+    output.print_table([[role, n, b, "{:.2f}".format(c), "{:.2f}".format(p)]
+                        for role, (n, b, c, p) in sorted(role_timing.items())],
+                       columns=["Instances", "Count", "Create calls", "Create, s", "Parameters, s"])
 
 if low_rebar_marks:
     msg = "No rebar found in columns with marks: {}. Please correct this.".format(", ".join(low_rebar_marks))
     forms.alert(msg)
+elif len(summary_rows) == 1:
+    row = summary_rows[0]
+    timing_text = ", ".join("{} {} in {:.2f} s".format(role, n, c + p)
+                            for role, (n, b, c, p) in sorted(role_timing.items())) or "nothing new"
+    forms.alert("Script completed successfully. Families placed and parameters set.\n"
+                "Column groups: created {}, updated {}, deleted {}, unchanged {}.\n"
+                "Placement: {}.".format(*(row[4:8] + [timing_text])))
 else:
-    forms.alert("Script completed successfully. Families placed and parameters set.")
+    forms.alert("Script completed successfully for {} levels.".format(len(summary_rows)))
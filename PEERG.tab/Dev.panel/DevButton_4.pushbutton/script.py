@@ -2,15 +2,21 @@
 __title__ = "Create Sheets"
 __author__ = "Dmitry D"
 
-from pyrevit import revit, DB
+from pyrevit import revit, script, DB
 from pyrevit.forms import alert, SelectFromList
-import re
+from Peer.ElementIndex import ElementIndex, collect_buckets, VIEW as VIEW_BUCKET, VIEW_SHEET
+from Peer.NameRegistry import NameRegistry, family_view_kind
+from Peer.SheetBatch import SheetBatch
+from Peer.SheetViews import SheetViewIndex
+from Peer.Failures import FailureLog, attach_failure_log
+from Peer.SheetRules import LevelInfo, load_rules
+from Peer.ViewportAlign import align_sheets
 
 uidoc = revit.uidoc
 doc = revit.doc
 
-# Какие номера искать в названиях уровней:
-allowed_bases = [str(x) for x in range(100, 230, 10)]  # 100, 110, ..., 220
+# Номера в названиях уровней, номера и имена листов и видов — в файле правил рядом со скриптом
+RULES_FILE = "sheet_rules.json"
 
 levels = DB.FilteredElementCollector(doc).OfClass(DB.Level).ToElements()
 levels_sorted = sorted(levels, key=lambda l: l.Elevation)
@@ -30,10 +36,13 @@ if not selected_levels:
     alert("Не выбран ни один уровень.")
     raise SystemExit
 
+# Один проход по документу: рамки, типы видов, виды, листы; из него же — занятые имена и номера
+buckets = collect_buckets(doc)
+index = ElementIndex(doc, buckets)
+names = NameRegistry.from_views(buckets[VIEW_BUCKET] + buckets[VIEW_SHEET])
+
 # Получить все типы рамок (TitleBlocks)
-titleblocks = list(DB.FilteredElementCollector(doc)
-    .OfClass(DB.FamilySymbol)
-    .OfCategory(DB.BuiltInCategory.OST_TitleBlocks))
+titleblocks = index.symbols_of_category(DB.BuiltInCategory.OST_TitleBlocks)
 
 if not titleblocks:
     alert(u"В проекте не найдено ни одного шаблона рамки!")
@@ -57,171 +66,145 @@ sheet_type_id = selected_titleblock.Id
 
 
 
-def ft_to_m(number):
-    return number * 0.3048
-
-
-def elevation_str(elev):
-    m = round(elev, 2)
-    # Сначала число, потом знак, чтобы получить 5.10+ или 3.60-
-    return u"{}{}".format(abs(m), "+" if m >= 0 else "-")
-
-
-
-
-
-
-def extract_base_from_name(level_name):
-    for base in allowed_bases:
-        # строгое совпадение числа (не части другого числа)
-        if re.search(r'(?<!\d){}(?!\d)'.format(base), level_name):
-            return int(base)
-    return None
-
-
-def create_sheet(sheet_name, sheet_number):
-    with DB.Transaction(doc, "Create Sheet") as t:
-        t.Start()
-        new_sheet = DB.ViewSheet.Create(doc, sheet_type_id)
-        new_sheet.Name = sheet_name
-        new_sheet.SheetNumber = sheet_number
-        t.Commit()
-
-## --- ПОДГОТОВКА СПИСКОВ СУЩЕСТВУЮЩИХ ЛИСТОВ И ВИДОВ ---
-
-all_sheet_numbers = set([s.SheetNumber for s in DB.FilteredElementCollector(doc).OfClass(DB.ViewSheet)])
-
-# Получить имена всех существующих видов
-all_view_names = set([v.Name for v in DB.FilteredElementCollector(doc).OfClass(DB.View) if hasattr(v, 'Name')])
-
-# --- СОЗДАНИЕ ЛИСТОВ ---
-# Соберём только уровни из allowed_bases, отсортированные по Elevation
-allowed_levels = sorted(
-    [lvl for lvl in levels if extract_base_from_name(lvl.Name) is not None],
-    key=lambda l: l.Elevation
-)
+# --- ПЛАН: листы и виды по правилам sheet_rules.json ---
+rules = load_rules(script.get_bundle_file(RULES_FILE))
+level_infos = dict((lvl.Id.IntegerValue, LevelInfo(lvl.Name, lvl.Elevation, lvl)) for lvl in levels)
+plan = rules.plan(level_infos.values(),
+                  [level_infos[lvl.Id.IntegerValue] for lvl in selected_levels])
 
-# Мапа: base_number -> уровень
-base_to_level = {extract_base_from_name(lvl.Name): lvl for lvl in allowed_levels}
+# Находим нужные типы видов с корректным получением имени
+view_types = {}
+for spec in plan.views:
+    type_key = (spec.family, spec.type_name)
+    if type_key not in view_types:
+        view_types[type_key] = index.view_family_type(getattr(DB.ViewFamily, spec.family), spec.type_name)
+        if view_types[type_key] is None:
+            alert(u"Не найден нужный тип вида {}!".format(spec.type_name))
+            exit()
+
+sheet_batch = SheetBatch(doc, index, names)
+for spec in plan.sheets:
+    sheet_batch.add(spec.name, spec.number, sheet_type_id)
+
+
+def create_views():
+    created_views = []
+    for spec in plan.views:
+        # Имя уже занято видом того же типа — вид не создаём
+        kind = family_view_kind(spec.family)
+        if names.is_taken(kind, spec.name):
+            continue
+        view_type = view_types[(spec.family, spec.type_name)]
+        new_view = DB.ViewPlan.Create(doc, view_type.Id, spec.level.key.Id)
+        new_view.Name = spec.name
+        created_views.append(new_view)
+        names.add(kind, spec.name)
+        index.add_view(new_view)
+    return created_views
 
-for current_level in selected_levels:
-    base_number = extract_base_from_name(current_level.Name)
-    if base_number is None:
-        continue
 
-    relative_elevation = ft_to_m(current_level.Elevation)
+# --- РАЗМЕЩЕНИЕ ВИДОВ НА ЛИСТАХ ---
+def place_views_on_sheets(sheet_views, views_by_sheet):
+    # Ставим все виды листа в одну точку (например, центр листа) — viewport_point в правилах
+    pt = DB.XYZ(rules.viewport_point[0], rules.viewport_point[1], 0)
+    for sheet_number, view_specs in sorted(views_by_sheet.items()):
+        sheet = index.sheet(sheet_number)
+        if not sheet:
+            continue
+        for spec in view_specs:
+            view = index.view(spec.name, DB.ViewPlan)
+            if not view:
+                continue
+            # Уже размещён (на этом или другом листе) — индекс отвечает без сбора Viewport
+            sheet_views.place(sheet, view, pt)
 
-    sheet_data = [
-        (u"תכנית תבניות במפלס {}".format(elevation_str(relative_elevation)), str(base_number)),
-        (u"תכנית זיון תקרה במפלס {}".format(elevation_str(relative_elevation)), str(base_number + 2))
-    ]
 
-    # Найти среди всех allowed_levels предыдущий (ниже по Elevation)
-    prev_allowed_level = None
-    for lvl in reversed(allowed_levels):
-        if lvl.Elevation < current_level.Elevation:
-            prev_allowed_level = lvl
-            break
+# --- ВЫРАВНИВАНИЕ: виды одной группы совмещаются центрами по центру рабочей области рамки ---
+def align_views_on_sheets(doc, sheet_views, groups_by_sheet):
+    sheet_groups = []
+    for sheet_number, spec_groups in sorted(groups_by_sheet.items()):
+        sheet = index.sheet(sheet_number)
+        if not sheet:
+            continue
+        groups = []
+        for specs in spec_groups:
+            views = [index.view(spec.name, DB.ViewPlan) for spec in specs]
+            groups.append([vp for vp in (sheet_views.viewport(sheet, v) for v in views if v) if vp])
+        sheet_groups.append((sheet, groups))
+    return align_sheets(doc, sheet_groups, rules.align_margins_mm, rules.align_gap_mm)
 
-    if prev_allowed_level is not None:
-        lower_relative_elevation = ft_to_m(prev_allowed_level.Elevation)
-        sheet_data.append((
-            u"תכנית זיון קירות ממפלס {} עד {}".format(
-                elevation_str(lower_relative_elevation), elevation_str(relative_elevation)
-            ),
-            str(base_number + 5)
-        ))
 
-    # Если нет prev_allowed_level — не делаем лист диапазона!
+# --- СОЗДАНИЕ: листы, виды и размещение — одна группа, по одной транзакции на шаг ---
+class StepRolledBack(Exception):
+    """Revit откатил транзакцию шага: ошибка без варианта исправления (см. failure_log)."""
 
-    for sheet_name, sheet_number in sheet_data:
-        if sheet_number not in all_sheet_numbers:
-            create_sheet(sheet_name, sheet_number)
-            all_sheet_numbers.add(sheet_number)
 
+def commit(t):
+    if t.Commit() != DB.TransactionStatus.Committed:
+        raise StepRolledBack(t.GetName())
 
-# --- СОЗДАНИЕ ВИДОВ ---
-# Находим нужные типы видов с корректным получением имени
-view_family_types = DB.FilteredElementCollector(doc).OfClass(DB.ViewFamilyType)
-re_type = None
-gr_type = None
-for vft in view_family_types:
-    if vft.ViewFamily == DB.ViewFamily.StructuralPlan:
-        vft_name = vft.get_Parameter(DB.BuiltInParameter.SYMBOL_NAME_PARAM).AsString()
-        if vft_name == "Structural Plan RE":
-            re_type = vft
-        elif vft_name == "Structural Plan GR":
-            gr_type = vft
-if not (re_type and gr_type):
-    alert(u"Не найден нужный тип вида Structural Plan RE или GR!")
-    exit()
 
-created_views = []
-with DB.Transaction(doc, "Create Structural Plan Views for Levels") as t:
-    t.Start()
-    for current_level in selected_levels:
-        base_number = extract_base_from_name(current_level.Name)
-        if base_number is None:
-            continue
-        # Structural Plan RE
-        view_name_re = "{}RE".format(base_number)
-        if view_name_re not in all_view_names:
-            new_view_re = DB.ViewPlan.Create(doc, re_type.Id, current_level.Id)
-            new_view_re.Name = view_name_re
-            created_views.append(new_view_re)
-            all_view_names.add(view_name_re)
-        # Structural Plan GR
-        view_name_gr = "{}GR".format(base_number)
-        if view_name_gr not in all_view_names:
-            new_view_gr = DB.ViewPlan.Create(doc, gr_type.Id, current_level.Id)
-            new_view_gr.Name = view_name_gr
-            created_views.append(new_view_gr)
-            all_view_names.add(view_name_gr)
-    t.Commit()
+failure_log = FailureLog()
+moves = []
+rolled_back_step = None
+tg = DB.TransactionGroup(doc, "Create Sheets")
+tg.Start()
+try:
+    with DB.Transaction(doc, "Create Sheets") as t:
+        attach_failure_log(t, failure_log)
+        t.Start()
+        sheet_batch.execute()
+        commit(t)
 
-# --- РАЗМЕЩЕНИЕ ВИДОВ НА ЛИСТАХ ---
-def place_views_on_sheets_align_centers(doc, base_numbers):
-    all_sheets = {s.SheetNumber: s for s in DB.FilteredElementCollector(doc).OfClass(DB.ViewSheet)}
-    all_views = {v.Name: v for v in DB.FilteredElementCollector(doc).OfClass(DB.View)
-                 if hasattr(v, 'Name') and not v.IsTemplate}
+    with DB.Transaction(doc, "Create Structural Plan Views for Levels") as t:
+        attach_failure_log(t, failure_log)
+        t.Start()
+        create_views()
+        commit(t)
 
     with DB.Transaction(doc, "Place & Align Views on Sheets") as t:
+        attach_failure_log(t, failure_log)
         t.Start()
-        for base_number in base_numbers:
-            sheet_number = str(base_number)
-            sheet = all_sheets.get(sheet_number)
-            if not sheet:
-                continue
-            # Имена нужных видов
-            view_names = ["{}RE".format(base_number), "{}GR".format(base_number)]
-            viewports = []
-            # Ставим оба вида в одну точку (например, центр листа)
-            # Координата центра листа (0.5, 0.5, 0) — можно менять
-            pt = DB.XYZ(0.5, 0.5, 0)
-            for view_name in view_names:
-                view = all_views.get(view_name)
-                if not view:
-                    continue
-                # Уже размещён? Проверяем по листу
-                already_placed = any(
-                    vp.ViewId == view.Id for vp in DB.FilteredElementCollector(doc)
-                    .OfClass(DB.Viewport).WhereElementIsNotElementType() if vp.SheetId == sheet.Id
-                )
-                if already_placed:
-                    continue
-                viewport = DB.Viewport.Create(doc, sheet.Id, view.Id, pt)
-                viewports.append(viewport)
-            # Если оба вида размещены, совмещаем их центры
-
-        t.Commit()
-
-base_numbers_for_sheets = [
-    extract_base_from_name(lvl.Name) for lvl in selected_levels
-    if extract_base_from_name(lvl.Name) is not None
-]
-place_views_on_sheets_align_centers(doc, base_numbers_for_sheets)
-
-
-
-
-alert("Листы и виды успешно созданы.")
+        # Лист -> виды и вид -> листы: один проход по листам (включая только что созданные)
+        sheet_views = SheetViewIndex(doc, index.sheets())
+        place_views_on_sheets(sheet_views, plan.views_by_sheet())
+        doc.Regenerate()  # габариты новых видовых экранов
+        moves = align_views_on_sheets(doc, sheet_views, plan.align_groups())
+        commit(t)
+    tg.Assimilate()
+except StepRolledBack as e:
+    # Следующие шаги опираются на результат откатанного — откатываем весь пакет
+    tg.RollBack()
+    rolled_back_step = e.args[0]
+    moves = []
+except Exception:
+    tg.RollBack()
+    raise
+
+output = script.get_output()
+if len(failure_log):
+    # Предупреждения удалены без диалогов — показываем, что именно
+    output.print_md("## Revit warnings and errors: {}".format(failure_log.summary()))
+    output.print_table(failure_log.rows(), columns=["Kind", "Message"])
+
+if rolled_back_step:
+    alert(u"Ничего не создано: Revit откатил шаг «{}» из-за ошибки, и весь пакет отменён.\n\n{}\n\n"
+          u"Подробности — в окне вывода.".format(rolled_back_step, u"\n".join(failure_log.errors)),
+          exitscript=True)
+
+if moves:
+    output.print_md("## Viewports aligned: {}".format(len(moves)))
+    output.print_table([[sheet.SheetNumber, doc.GetElement(viewport.ViewId).Name,
+                         "{:.1f}".format((move.new[0] - move.old[0]) * 304.8),
+                         "{:.1f}".format((move.new[1] - move.old[1]) * 304.8),
+                         "{:.1f}".format(move.distance * 304.8)]
+                        for sheet, viewport, move in moves],
+                       columns=["Sheet", "View", "dX, mm", "dY, mm", "Moved, mm"])
+
+failed_sheets = sheet_batch.failed
+if failed_sheets:
+    alert(u"Листы созданы: {}, с ошибкой: {}\n{}".format(
+        len(sheet_batch.created), len(failed_sheets),
+        u"\n".join(u"{} {}: {}".format(p.number, p.name, p.error) for p in failed_sheets)))
+else:
+    alert("Листы и виды успешно созданы.")
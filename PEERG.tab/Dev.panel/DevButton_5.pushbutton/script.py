@@ -3,11 +3,16 @@ __title__ = "New View"
 __author__ = "Dmitry D"
 
 
-from pyrevit import forms
-from Autodesk.Revit.DB import FilteredElementCollector, BuiltInCategory, ViewFamilyType, ViewFamily, ViewPlan
+from pyrevit import forms, script
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInCategory, ViewFamily, ViewPlan, Transaction
+from Peer.ElementIndex import ElementIndex, collect_buckets, VIEW as VIEW_BUCKET, VIEW_SHEET
+from Peer.NameRegistry import NameRegistry, view_kind
 
 doc = __revit__.ActiveUIDocument.Document
 
+RE_TYPE_NAME = "Structural Plan RE"
+GR_TYPE_NAME = "Structural Plan GR"
+
 # 1. Собираем все уровни
 levels = list(FilteredElementCollector(doc)
               .OfCategory(BuiltInCategory.OST_Levels)
@@ -18,52 +23,63 @@ if not levels:
     forms.alert("В проекте нет уровней.")
     script.exit()
 
-# 2. Выводим список названий уровней для выбора
+# 2. Выбор уровней (несколько — все виды создаются за один запуск)
 level_dict = {lvl.Name: lvl for lvl in levels}
-level_names = sorted(level_dict.keys())
-selected_level_name = forms.SelectFromList.show(level_names,
-                                                title="Выберите уровень",
-                                                button_name='Создать Structural Plan RE')
+level_names = [lvl.Name for lvl in sorted(levels, key=lambda l: l.Elevation)]
+selected_level_names = forms.SelectFromList.show(level_names,
+                                                 title="Выберите уровни",
+                                                 multiselect=True,
+                                                 button_name='Создать Structural Plan RE')
 
-if not selected_level_name:
+if not selected_level_names:
     script.exit()
 
-selected_level = level_dict[selected_level_name]
-
-# 3. Находим тип вида "Structural Plan RE"
-view_family_types = FilteredElementCollector(doc).OfClass(ViewFamilyType)
-structural_plan_re_type = None
+with_gr = forms.alert("Создать также {}?".format(GR_TYPE_NAME), yes=True, no=True)
 
-from Autodesk.Revit.DB import BuiltInParameter
+# 3. Один проход по документу: типы видов, виды (с индексом (уровень, тип) -> план), занятые имена
+buckets = collect_buckets(doc)
+index = ElementIndex(doc, buckets)
+names = NameRegistry.from_views(buckets[VIEW_BUCKET] + buckets[VIEW_SHEET])
 
-for vft in view_family_types:
-    try:
-        type_name = vft.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM).AsString()
-        if (vft.ViewFamily == ViewFamily.StructuralPlan) and (type_name == "Structural Plan RE"):
-            structural_plan_re_type = vft
-            break
-    except Exception as e:
-        forms.alert("Ошибка при обработке ViewFamilyType: {}".format(e))
+view_types = [(RE_TYPE_NAME, "{}RE.")]
+if with_gr:
+    view_types.append((GR_TYPE_NAME, "{}GR."))
 
-# 4. Проверяем, есть ли уже вид на этом уровне такого типа
-existing_views = FilteredElementCollector(doc).OfClass(ViewPlan).ToElements()
-for vp in existing_views:
-    if (vp.ViewType == ViewFamily.StructuralPlan
-        and vp.ViewFamilyType.Name == "Structural Plan RE"
-        and vp.GenLevel.Id == selected_level.Id):
-        forms.alert("Вид 'Structural Plan RE' для этого уровня уже существует: '{}'.".format(vp.Name))
+jobs = []
+for type_name, name_format in view_types:
+    view_type = index.view_family_type(ViewFamily.StructuralPlan, type_name)
+    if view_type is None:
+        forms.alert("Тип вида '{}' не найден.".format(type_name))
         script.exit()
+    jobs.append((view_type, name_format))
 
-# 5. Создаём вид
-from Autodesk.Revit.DB import Transaction
-
-t = Transaction(doc, "Создать Structural Plan RE")
+# 4. Пропускаем уровни, где план такого типа уже есть — поиск по (уровень, тип) без перебора видов
+created = []
+existing = []
+t = Transaction(doc, "Создать планы уровней")
 t.Start()
 try:
-    new_view = ViewPlan.Create(doc, structural_plan_re_type.Id, selected_level.Id)
-    new_view.Name = ("{}RE.".format(selected_level.Name ))
-    forms.alert("Вид успешно создан: '{}'.".format(new_view.Name))
+    for level_name in selected_level_names:
+        level = level_dict[level_name]
+        for view_type, name_format in jobs:
+            view = index.plan_view(level, view_type)
+            if view is not None:
+                existing.append(view.Name)
+                continue
+            # 5. Создаём вид; занятое имя получает суффикс "(2)", "(3)"... вместо ошибки
+            new_view = ViewPlan.Create(doc, view_type.Id, level.Id)
+            new_view.Name = names.reserve(view_kind(new_view.ViewType), name_format.format(level.Name))
+            index.add_view(new_view)
+            created.append(new_view.Name)
     t.Commit()
 except Exception as e:
     t.RollBack()
     forms.alert("Ошибка: {}".format(e))
+    script.exit()
+
+message = "Создано видов: {}".format(len(created))
+if created:
+    message += "\n" + ", ".join(created)
+if existing:
+    message += "\n\nУже существуют: {}\n{}".format(len(existing), ", ".join(existing))
+forms.alert(message)
@@ -1,62 +1,118 @@
 # -*- coding: utf-8 -*-
 
 __title__   = "Family Load"
-__doc__     = """Version = 1.0
+__doc__     = """Version = 1.2
 Date    = 02.06.2025
-Loads all families from a folder"""
+Loads new and changed families from a folder and its subfolders.
+Shift+Click: choose the library folder"""
 
 
-from pyrevit import revit, DB, forms
+from pyrevit import revit, forms, script, EXEC_PARAMS
 import os
-import re  # модуль для работы с регулярными выражениями
-
-# Путь к папке с семействами
-FAMILIES_FOLDER = r"F:\P-O-S-T\DIMA.D\Revit\Familiy\Rebar"
+from Peer.FamilyLibrary import (
+    Manifest,
+    load_status,
+    document_key,
+    project_family_names,
+    load_family,
+    NEW,
+    CHANGED,
+    MISSING,
+    UNCHANGED,
+)
+from Peer.FamilyScan import LibraryScanner
+
+# Путь к папке с семействами по умолчанию; свой путь — Shift+клик, хранится в настройках pyRevit
+DEFAULT_FAMILIES_FOLDER = r"F:\P-O-S-T\DIMA.D\Revit\Familiy\Rebar"
+MANIFEST_ID = "family_load_manifest"
 
 # Получаем активный документ
 doc = revit.doc
+config = script.get_config()
+
+if EXEC_PARAMS.config_mode:
+    folder = forms.pick_folder(title="Family library folder")
+    if not folder:
+        script.exit()
+    config.library_path = folder
+    script.save_config()
+
+FAMILIES_FOLDER = config.get_option("library_path", DEFAULT_FAMILIES_FOLDER)
 
 # Проверяем, существует ли папка
 if not os.path.exists(FAMILIES_FOLDER):
-    forms.alert("Family folder not found: {}".format(FAMILIES_FOLDER), exitscript=True)
+    forms.alert("Family folder not found: {}\nShift+Click to choose another folder.".format(FAMILIES_FOLDER),
+                exitscript=True)
 
+# Манифест: размер, время и хэш файлов + какая версия какого семейства загружена в какой проект
+manifest_path = script.get_universal_data_file(MANIFEST_ID, "json")
+manifest = Manifest.load(manifest_path)
 
-# Получаем список файлов в папке (без подпапок)
-family_files = [
-    f for f in os.listdir(FAMILIES_FOLDER)
-    if os.path.isfile(os.path.join(FAMILIES_FOLDER, f))
-    and f.lower().endswith('.rfa')
-    and not re.search(r'\.\d{4}\.rfa$', f)  # Исключаем версии семейства (например, .0001.rfa)
-]
-
-# Проверяем, есть ли семейства для загрузки
-if not family_files:
-    forms.alert("No suitable family (.rfa) files found in folder '{}'.".format(FAMILIES_FOLDER), exitscript=True)
+doc_key = document_key(doc)
+project_families = project_family_names(doc)
 
-
-# Загружаем семейства (с заменой существующих)
+# Обход подпапок и хэширование идут в фоновых потоках (хэш — только для новых
+# и изменённых по размеру и времени файлов); семейства загружаются по мере готовности
+scanner = LibraryScanner(FAMILIES_FOLDER, manifest)
+counts = {NEW: 0, CHANGED: 0, MISSING: 0, UNCHANGED: 0}
 loaded_count = 0
-skipped_files = []
+failed_files = []
+cancelled = False
 
-with revit.Transaction("Load Families from Folder"):
-    for family_file in family_files:
-        family_path = os.path.join(FAMILIES_FOLDER, family_file)
+# Отмена останавливает потоки сканера сразу через stop(), не дожидаясь закрытия генератора
+with forms.ProgressBar(title="Loading families... ({value} of {max_value})", cancellable=True) as pb:
+    with revit.Transaction("Load Families from Folder"):
         try:
-            loaded = doc.LoadFamily(family_path)
-            if loaded:
-                loaded_count += 1
-            else:
-                skipped_files.append(family_file)
-        except Exception:
-            skipped_files.append(family_file)
-            continue
+            for record in scanner:
+                if pb.cancelled:
+                    cancelled = True
+                    break
+                pb.update_progress(scanner.done, max(scanner.found, scanner.done))
+                if record.hash is None:
+                    continue  # файл не прочитан — в scanner.errors
+                status = load_status(record, manifest, doc_key, project_families)
+                manifest.remember(record)
+                counts[status] += 1
+                if status == UNCHANGED:
+                    continue
+                try:
+                    loaded = load_family(doc, record.path)
+                except Exception as e:
+                    # Версия не загружена: в манифест не пишем, чтобы следующий запуск повторил
+                    failed_files.append("{}: {}".format(os.path.basename(record.path), e))
+                    continue
+                if loaded:
+                    loaded_count += 1
+                elif record.family not in project_families:
+                    failed_files.append(os.path.basename(record.path))
+                    continue
+                # Загружено — или LoadFamily вернул False: эта версия уже в проекте
+                manifest.mark_loaded(doc_key, record)
+        finally:
+            scanner.stop()
+
+manifest.save(manifest_path)
+
+# Проверяем, были ли семейства в папке
+if not scanner.done:
+    forms.alert("No suitable family (.rfa) files found in folder '{}'.".format(FAMILIES_FOLDER), exitscript=True)
 
 # Выводим результат
 result_message = "{} families loaded (or updated) from folder '{}'.\n".format(loaded_count, FAMILIES_FOLDER)
-
-
-if skipped_files:
-    result_message += "\nThe following files could not be loaded:\n" + "\n".join(skipped_files)
+result_message += "New: {}, changed: {}, missing in project: {}, unchanged (skipped): {}.\n".format(
+    counts[NEW], counts[CHANGED], counts[MISSING], counts[UNCHANGED])
+if cancelled:
+    result_message += "Cancelled after {} of {} files.\n".format(scanner.done, scanner.found)
+
+if failed_files:
+    result_message += "\nThe following files could not be loaded:\n" + "\n".join(failed_files)
+if scanner.duplicates:
+    result_message += "\nSkipped files with a family name already found in another folder:\n" + "\n".join(
+        "{} (loaded from {})".format(os.path.relpath(path, FAMILIES_FOLDER), os.path.relpath(owner, FAMILIES_FOLDER))
+        for path, owner in scanner.duplicates)
+if scanner.errors:
+    result_message += "\nThe following files could not be read:\n" + "\n".join(
+        os.path.basename(path) for path, _ in scanner.errors)
 
 
 forms.alert(result_message)
@@ -1,135 +1,55 @@
 # -*- coding: utf-8 -*-
 from pyrevit import revit, forms, script
-from Autodesk.Revit.DB import *
-from Autodesk.Revit.DB import UnitUtils, UnitTypeId
+from Autodesk.Revit.DB import ViewSheet
+from Peer.SheetViews import SheetViewIndex
+from Peer.RebarSync import RebarSync, ANNOTATION_FAMILY_NAME
 
 doc = revit.doc
 
-# Имя семейства аннотации
-ANNOTATION_FAMILY_NAME = "PEER_Rebar TAG"
+SCOPE_SHEET = "Текущий лист"
+SCOPE_VIEW = "Активный вид"
+SCOPE_PROJECT = "Весь проект"
 
-# 1. Определяем лист, с которым работаем
-active_view = revit.active_view
-sheet = None
-
-# Если находимся на листе — берём его напрямую
-if isinstance(active_view, ViewSheet):
-    sheet = active_view
-else:
-    # Если активный вид размещён на листе — ищем этот лист через Viewport
-    viewports = FilteredElementCollector(doc).OfClass(Viewport).ToElements()
-    for vp in viewports:
-        if vp.ViewId == active_view.Id:
-            sheet = doc.GetElement(vp.SheetId)
-            break
-
-if not sheet:
-    forms.alert("Активный вид не размещён на листе, или лист не найден.")
+# 1. Область обновления: лист (как раньше), активный вид или весь проект
+scope = forms.CommandSwitchWindow.show([SCOPE_SHEET, SCOPE_VIEW, SCOPE_PROJECT],
+                                       message="Обновить аннотации '{}':".format(ANNOTATION_FAMILY_NAME))
+if not scope:
     script.exit()
 
-# 2. Находим все виды, размещённые на этом листе
-views_on_sheet = []
-viewports = FilteredElementCollector(doc).OfClass(Viewport).ToElements()
-for vp in viewports:
-    if vp.SheetId == sheet.Id:
-        view = doc.GetElement(vp.ViewId)
-        if view:
-            views_on_sheet.append(view)
-
-if not views_on_sheet:
-    forms.alert("На листе нет размещённых видов.")
-    script.exit()
-
-# 3. Собираем все аннотации на всех видах листа
-annotation_instances = []
-for view in views_on_sheet:
-    collector = FilteredElementCollector(doc, view.Id)\
-        .OfCategory(BuiltInCategory.OST_DetailComponents)\
-        .WhereElementIsNotElementType()
-    for fi in collector:
-        if isinstance(fi, FamilyInstance):
-            try:
-                if fi.Symbol.Family.Name == ANNOTATION_FAMILY_NAME:
-                    annotation_instances.append(fi)
-            except Exception:
-                continue
+active_view = revit.active_view
+view_ids = None
+
+if scope == SCOPE_SHEET:
+    sheet_views = SheetViewIndex(doc)
+    # Если находимся на листе — берём его напрямую, иначе лист, на котором размещён активный вид
+    if isinstance(active_view, ViewSheet):
+        sheet = active_view
+    else:
+        sheet = sheet_views.sheet_of(active_view)
+
+    if not sheet:
+        forms.alert("Активный вид не размещён на листе, или лист не найден.")
+        script.exit()
+
+    # 2. Виды, размещённые на этом листе
+    view_ids = sheet_views.view_ids_on(sheet)
+    if not view_ids:
+        forms.alert("На листе нет размещённых видов.")
+        script.exit()
+elif scope == SCOPE_VIEW:
+    view_ids = [active_view.Id.IntegerValue]
+
+# 3. Все аннотации области — один запрос по типам семейства
+sync = RebarSync(doc)
+annotation_instances = sync.collect(view_ids)
 
 if not annotation_instances:
-    forms.alert("На выбранном листе не найдено аннотационных семейств '{}' на размещённых видах.".format(ANNOTATION_FAMILY_NAME))
+    forms.alert("В области '{}' не найдено аннотационных семейств '{}'.".format(scope, ANNOTATION_FAMILY_NAME))
     script.exit()
 
-# Функция для получения значения параметра
-def get_param_value(elem, param_name):
-    param = elem.LookupParameter(param_name)
-    if param:
-        try:
-            if param.StorageType == StorageType.Integer:
-                return str(param.AsInteger())
-            elif param.StorageType == StorageType.Double:
-                raw_value = param.AsValueString()
-                cleaned = "".join(c for c in raw_value if c.isdigit() or c in ['.', ','])
-                return cleaned
-            else:
-                return param.AsString() or "(пусто)"
-        except Exception:
-            return "(ошибка чтения)"
-    return None
-
-# Функция для установки значения параметра
-def set_param_value(elem, param_name, value):
-    param = elem.LookupParameter(param_name)
-    if param and value:
-        try:
-            cleaned_value = "".join(c for c in str(value) if c.isdigit() or c in ['.', ','])
-            if param.StorageType == StorageType.Integer:
-                param.Set(int(float(cleaned_value)))
-            elif param.StorageType == StorageType.Double:
-                internal_value = UnitUtils.ConvertToInternalUnits(float(cleaned_value), UnitTypeId.Millimeters)
-                param.Set(internal_value)
-            else:
-                param.Set(str(value))
-        except Exception as e:
-            forms.alert("Ошибка при установке параметра '{}': {}".format(param_name, e))
-
-# Основная часть: обновляем параметры
-updated_count = 0
-missing_elements = []
-
+# 4. Сравнение с исходными элементами и запись только изменившихся значений
 with revit.Transaction("Обновление параметров аннотаций арматуры"):
-    for tag in annotation_instances:
-        source_id_param = tag.LookupParameter("PR_Rebar_ID")
-        if source_id_param:
-            try:
-                raw_id = source_id_param.AsString() or source_id_param.AsValueString()
-                if not raw_id:
-                    continue
-                source_id_str = "".join(c for c in raw_id if c.isdigit())
-                if not source_id_str:
-                    continue
-                source_elem_id = int(source_id_str)
-                source_elem = doc.GetElement(ElementId(source_elem_id))
-                if not source_elem:
-                    missing_elements.append(source_id_str)
-                    continue
-
-                # Читаем параметры из исходного элемента
-                rebar_number = get_param_value(source_elem, "Rebar_Number")
-                rebar_diameter = get_param_value(source_elem, "Rebar_Diameter")
-                rebar_length = get_param_value(source_elem, "Rebar_Length")
-
-                # Записываем параметры обратно в аннотацию
-                set_param_value(tag, "Rebar_Number", rebar_number)
-                set_param_value(tag, "Rebar_Diameter", rebar_diameter)
-                set_param_value(tag, "Rebar_Length", rebar_length)
-
-                updated_count += 1
-            except Exception as e:
-                forms.alert("Ошибка при обработке элемента ID {}: {}".format(raw_id, e))
+    result = sync.run(annotation_instances)
 
 # Выводим итог
-result_message = "Обновлено {} обозначений арматуры.".format(updated_count)
-if missing_elements:
-    missing_str = ", ".join(missing_elements)
-    result_message += "\n\n⚠️ Для следующих элементов не найдены исходные объекты (возможно, они были удалены): {}".format(missing_str)
-
-forms.alert(result_message)
+forms.alert(result.summary())
@@ -1,140 +1,189 @@
 # -*- coding: utf-8 -*-
 __title__ = "Rebar Tag Select"
+__persistentengine__ = True  # обработчик DocumentChanged индекса живёт между запусками
 __doc__ = """Version = 5.1
 Date = 02.06.2025
 Author: Erik Frits
 """
 
-from pyrevit import revit, DB, forms, script
+from pyrevit import revit, forms, script, EXEC_PARAMS
 from Autodesk.Revit.DB import *
+from Peer.ParamCopy import ParamCopier, set_value
+from Peer.ParamTable import read_parameters
+from Peer.RebarIndex import get_rebar_index
+from Peer.RebarSync import ANNOTATION_FAMILY_NAME, SOURCE_ID_PARAM
+from Peer.RebarTagSession import (
+    parse_number_list,
+    read_mapping_csv,
+    resolve_numbers,
+    plan_transfers,
+    SessionReport,
+)
 from Autodesk.Revit.UI.Selection import ObjectType
+from Autodesk.Revit.Exceptions import OperationCanceledException
 
 doc = revit.doc
 uidoc = revit.uidoc
 
-# 1️⃣ Выбираем семейство на активном виде
-try:
-    ref = uidoc.Selection.PickObject(ObjectType.Element, "Select a family to update")
-    selected_elem = doc.GetElement(ref.ElementId)
-except Exception as e:
-    if "cancelled" in str(e).lower():
-        forms.alert("Selection operation cancelled.")
-        script.exit()
+TRANSFER_PARAMS = ['Rebar_Number', 'Rebar_Diameter', 'Rebar_Length']
+
+MODE_PICK = "Pick several annotations"
+MODE_VIEW = "All annotations in active view"
+
+NUMBERS_OWN = "Own Rebar_Number of each annotation"
+NUMBERS_LIST = "List of numbers (in pick order)"
+NUMBERS_CSV = "CSV file: annotation id, number"
+
+
+def is_annotation(elem):
+    try:
+        return isinstance(elem, FamilyInstance) and elem.Symbol.Family.Name == ANNOTATION_FAMILY_NAME
+    except Exception:
+        return False
+
+
+def run_session(mode):
+    """Пакетный режим: много аннотаций, один индекс листа, одна транзакция, один отчёт."""
+    # 1️⃣ Аннотации: выбранные (порядок выбора сохраняется) или все на активном виде
+    if mode == MODE_VIEW:
+        tags = [elem for elem in FilteredElementCollector(doc, revit.active_view.Id)
+                .OfCategory(BuiltInCategory.OST_DetailComponents)
+                .WhereElementIsNotElementType() if is_annotation(elem)]
     else:
-        raise
-
-# Проверяем, что выбрано именно Detail Item
-if not isinstance(selected_elem, FamilyInstance):
-    forms.alert("The selected element is not a Detail Item.")
-    script.exit()
-
-# 2️⃣ Запрашиваем у пользователя номер арматуры
-rebar_number_input = forms.ask_for_string(
-    default='',
-    prompt="Enter the rebar number to search for:",
-    title="Rebar Search"
-)
+        try:
+            refs = uidoc.Selection.PickObjects(ObjectType.Element, "Select annotations, then Finish")
+        except OperationCanceledException:
+            script.exit()  # Esc — выбор отменён
+        tags = [elem for elem in (doc.GetElement(r.ElementId) for r in refs) if is_annotation(elem)]
+    if not tags:
+        forms.alert("No '{}' annotations selected.".format(ANNOTATION_FAMILY_NAME))
+        script.exit()
 
-if not rebar_number_input:
-    forms.alert("Rebar number not entered. Script stopped.")
-    script.exit()
-
-try:
-    user_input_number = int(rebar_number_input.strip())
-except:
-    forms.alert("Please enter a valid number for the rebar number.")
-    script.exit()
-
-# 3️⃣ Ищем лист, на который размещён активный вид
-viewport_collector = FilteredElementCollector(doc).OfClass(Viewport)
-sheet_id = None
-
-for vp in viewport_collector:
-    if vp.ViewId == revit.active_view.Id:
-        sheet_id = vp.SheetId
-        break
-
-if not sheet_id:
-    forms.alert("The active view is not placed on any sheet.")
-    script.exit()
-
-sheet = doc.GetElement(sheet_id)
-
-# 4️⃣ Получаем все виды на этом листе
-placed_views = []
-viewport_ids = sheet.GetAllViewports()
-
-for vp_id in viewport_ids:
-    vp = doc.GetElement(vp_id)
-    if hasattr(vp, 'ViewId'):
-        view = doc.GetElement(vp.ViewId)
-        placed_views.append(view)
-
-# 5️⃣ Ищем Detail Item с этим номером
-detail_items = []
-
-for view in placed_views:
-    collector = FilteredElementCollector(doc, view.Id) \
-        .OfCategory(BuiltInCategory.OST_DetailComponents) \
-        .WhereElementIsNotElementType()
-    for item in collector:
-        if isinstance(item, FamilyInstance):
-            param = item.LookupParameter('Rebar_Number')
-            if param:
-                val = None
-                if param.StorageType == StorageType.Integer:
-                    val = param.AsInteger()
-                elif param.StorageType == StorageType.Double:
-                    val = int(param.AsDouble())
-                else:
-                    val = param.AsString()
-                if val and str(val).strip() == rebar_number_input.strip():
-                    detail_items.append(item)
-
-if not detail_items:
-    forms.alert("Detail Item with number '{}' was not found on the sheet.".format(user_input_number))
-    script.exit()
-
-first_item = detail_items[0]
-
-def get_param(elem, param_name):
-    param = elem.LookupParameter(param_name)
-    if param:
-        if param.StorageType == StorageType.Integer:
-            return str(param.AsInteger())
-        elif param.StorageType == StorageType.Double:
-            return param.AsValueString()
+    # 2️⃣ Номер стержня для каждой аннотации
+    numbers_source = forms.CommandSwitchWindow.show([NUMBERS_OWN, NUMBERS_LIST, NUMBERS_CSV],
+                                                    message="Rebar numbers for {} annotations:".format(len(tags)))
+    if not numbers_source:
+        script.exit()
+    tag_ids = [tag.Id.IntegerValue for tag in tags]
+    if numbers_source == NUMBERS_LIST:
+        text = forms.ask_for_string(default='', prompt="Rebar numbers, comma separated:", title="Rebar Search")
+        if not text:
+            script.exit()
+        resolved = resolve_numbers(tag_ids, list_numbers=parse_number_list(text))
+    elif numbers_source == NUMBERS_CSV:
+        path = forms.pick_file(file_ext='csv')
+        if not path:
+            script.exit()
+        resolved = resolve_numbers(tag_ids, mapping=read_mapping_csv(path))
+    else:
+        own = read_parameters(doc, tags, ['Rebar_Number']).values('Rebar_Number')
+        resolved = resolve_numbers(tag_ids, own_numbers=own)
+
+    # 3️⃣ Источники — из индекса листа (один на весь сеанс); сами аннотации источником не считаются
+    rebar_index = get_rebar_index(doc)
+    tag_sheets = dict((tag.Id.IntegerValue, rebar_index.sheet_of(doc.GetElement(tag.OwnerViewId))) for tag in tags)
+    source_flags = {}  # id элемента -> годится ли в источники
+
+    def find_sources(tag_id, number):
+        sheet_id = tag_sheets.get(tag_id)
+        if not sheet_id:
+            return []
+        sources = []
+        for item_id in rebar_index.find(sheet_id, number):
+            if item_id not in source_flags:
+                elem = doc.GetElement(ElementId(item_id))
+                # Устаревший id индекса (элемент удалён) источником не считается
+                source_flags[item_id] = elem is not None and not is_annotation(elem)
+            if source_flags[item_id]:
+                sources.append(item_id)
+        return sources
+
+    transfers, missing, unnumbered = plan_transfers(resolved, find_sources)
+
+    # 4️⃣ Все переносы — одна транзакция
+    tags_by_id = dict((tag.Id.IntegerValue, tag) for tag in tags)
+    pairs = [(doc.GetElement(ElementId(source_id)), tags_by_id[tag_id]) for tag_id, source_id, _ in transfers]
+    copied = None
+    if pairs:
+        with revit.Transaction("Установка параметров ({})".format(len(pairs))):
+            copied = ParamCopier(TRANSFER_PARAMS).copy(doc, pairs)
+            for source, tag in pairs:
+                set_value(tag.LookupParameter(SOURCE_ID_PARAM), str(source.Id.IntegerValue))
+
+    forms.alert(SessionReport(len(tags), transfers, missing, unnumbered, copied).text())
+
+
+def run_single():
+    """Одна аннотация, один номер, одна транзакция."""
+    # 1️⃣ Выбираем семейство на активном виде
+    try:
+        ref = uidoc.Selection.PickObject(ObjectType.Element, "Select a family to update")
+        selected_elem = doc.GetElement(ref.ElementId)
+    except Exception as e:
+        if "cancelled" in str(e).lower():
+            forms.alert("Selection operation cancelled.")
+            script.exit()
         else:
-            return param.AsString() or "(empty)"
-    return "(not found)"
-
-rebar_number = get_param(first_item, 'Rebar_Number')
-rebar_diameter = get_param(first_item, 'Rebar_Diameter')
-rebar_length = get_param(first_item, 'Rebar_Length')
-element_id = str(first_item.Id.IntegerValue)
-
-# 6️⃣ Записываем параметры в выбранное семейство
-with revit.Transaction("Установка параметров"):
-    def set_param(elem, param_name, value):
-        for param in elem.Parameters:
-            if param.Definition.Name == param_name:
-                try:
-                    if param.StorageType == StorageType.Integer:
-                        cleaned_value = ''.join(c for c in str(value) if c.isdigit() or c in ['.', ','])
-                        param.Set(int(float(cleaned_value)))
-                    elif param.StorageType == StorageType.Double:
-                        cleaned_value = ''.join(c for c in str(value) if c.isdigit() or c in ['.', ','])
-                        converted_value = UnitUtils.ConvertToInternalUnits(float(cleaned_value), UnitTypeId.Millimeters)
-                        param.Set(converted_value)
-                    else:
-                        param.Set(str(value))
-                except Exception as e:
-                    forms.alert("Error: Parameter '{}' requires a number. {}".format(param_name, str(e)))
-
-
-    set_param(selected_elem, 'Rebar_Number', rebar_number)
-    set_param(selected_elem, 'Rebar_Diameter', rebar_diameter)
-    set_param(selected_elem, 'Rebar_Length', rebar_length)
-    set_param(selected_elem, 'PR_Rebar_ID', element_id)
-
-forms.alert("Values successfully transferred to the selected family!")
+            raise
+
+    # Проверяем, что выбрано именно Detail Item
+    if not isinstance(selected_elem, FamilyInstance):
+        forms.alert("The selected element is not a Detail Item.")
+        script.exit()
+
+    # 2️⃣ Запрашиваем у пользователя номер арматуры
+    rebar_number_input = forms.ask_for_string(
+        default='',
+        prompt="Enter the rebar number to search for:",
+        title="Rebar Search"
+    )
+
+    if not rebar_number_input:
+        forms.alert("Rebar number not entered. Script stopped.")
+        script.exit()
+
+    try:
+        user_input_number = int(rebar_number_input.strip())
+    except:
+        forms.alert("Please enter a valid number for the rebar number.")
+        script.exit()
+
+    # 3️⃣ Лист активного вида и Detail Items с этим номером — из индекса сессии:
+    # строится при первом поиске на листе, дальше обновляется по изменениям документа
+    rebar_index = get_rebar_index(doc)
+    sheet_id = rebar_index.sheet_of(revit.active_view)
+
+    if not sheet_id:
+        forms.alert("The active view is not placed on any sheet.")
+        script.exit()
+
+    # 4️⃣-5️⃣ Ищем Detail Item с этим номером
+    detail_items = [doc.GetElement(ElementId(item_id)) for item_id in rebar_index.find(sheet_id, rebar_number_input)]
+    detail_items = [item for item in detail_items if item is not None and item.Id != selected_elem.Id]
+
+    if not detail_items:
+        forms.alert("Detail Item with number '{}' was not found on the sheet.".format(user_input_number))
+        script.exit()
+
+    first_item = detail_items[0]
+    element_id = str(first_item.Id.IntegerValue)
+
+    # 6️⃣ Записываем параметры в выбранное семейство: сырые значения по StorageType, без разбора строк
+    with revit.Transaction("Установка параметров"):
+        copied = ParamCopier(TRANSFER_PARAMS).copy(doc, [(first_item, selected_elem)])
+        set_value(selected_elem.LookupParameter(SOURCE_ID_PARAM), element_id)
+
+    if copied.failed:
+        forms.alert("Error: {}".format("; ".join("{}: {}".format(name, text) for _, name, text in copied.failed)))
+
+    forms.alert("Values successfully transferred to the selected family!")
+
+
+# Клик — одна аннотация, как раньше; Shift+клик — пакетный режим
+if EXEC_PARAMS.config_mode:
+    mode = forms.CommandSwitchWindow.show([MODE_PICK, MODE_VIEW], message="Rebar Tag Select: batch")
+    if not mode:
+        script.exit()
+    run_session(mode)
+else:
+    run_single()
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
-from pyrevit import revit, DB, forms, script
+from pyrevit import revit, forms, script
 from Autodesk.Revit.DB import *
+from Peer.ParamCopy import ParamCopier, set_value
+from Peer.ParamTable import read_parameters
+from Peer.SheetViews import SheetViewIndex
 
 doc = revit.doc
 uidoc = revit.uidoc
@@ -26,55 +29,34 @@ except:
 active_view = revit.active_view
 
 # 3️⃣ Ищем лист, на который размещён активный вид
-viewport_collector = FilteredElementCollector(doc).OfClass(Viewport)
-sheet_id = None
+sheet_views = SheetViewIndex(doc)
+sheet = sheet_views.sheet_of(active_view)
 
-for vp in viewport_collector:
-    if vp.ViewId == active_view.Id:
-        sheet_id = vp.SheetId
-        break
-
-if not sheet_id:
+if not sheet:
     forms.alert("Активный вид не размещён ни на одном листе.")
     script.exit()
 
-# 4️⃣ Получаем сам лист
-sheet = doc.GetElement(sheet_id)
-
 # 5️⃣ Получаем все виды на этом листе
-placed_views = []
-viewport_ids = sheet.GetAllViewports()
-
-for vp_id in viewport_ids:
-    vp = doc.GetElement(vp_id)
-    if hasattr(vp, 'ViewId'):
-        view = doc.GetElement(vp.ViewId)
-        placed_views.append(view)
+placed_views = sheet_views.views_on(sheet)
 
 # 6️⃣ Ищем Detail Items с этим номером
 detail_items = []
 
+view_items = []
 for view in placed_views:
     collector = FilteredElementCollector(doc, view.Id)\
         .OfCategory(BuiltInCategory.OST_DetailComponents)\
         .WhereElementIsNotElementType()
+    view_items.extend(item for item in collector if isinstance(item, FamilyInstance))
 
-    for item in collector:
-        if isinstance(item, FamilyInstance):
-            param = item.LookupParameter('Rebar_Number')
-            if param:
-                if param.StorageType == StorageType.Integer:
-                    param_value = param.AsInteger()
-                    if param_value == user_input_number:
-                        detail_items.append(item)
-                elif param.StorageType == StorageType.Double:
-                    param_value = param.AsDouble()
-                    if int(param_value) == user_input_number:
-                        detail_items.append(item)
-                else:
-                    param_value = param.AsString()
-                    if param_value and param_value.strip() == rebar_number_input.strip():
-                        detail_items.append(item)
+# Rebar_Number со всех элементов листа одним проходом
+rebar_numbers = read_parameters(doc, view_items, ['Rebar_Number']).values('Rebar_Number')
+for item, val in zip(view_items, rebar_numbers):
+    if isinstance(val, (int, float)):
+        if int(val) == user_input_number:
+            detail_items.append(item)
+    elif val and val.strip() == rebar_number_input.strip():
+        detail_items.append(item)
 
 if not detail_items:
     forms.alert("На листе не найден Detail Item с номером: {}".format(user_input_number))
@@ -84,7 +66,7 @@ if not detail_items:
 first_item = detail_items[0]
 element_id = str(first_item.Id.IntegerValue)
 
-# 8️⃣ Читаем параметры
+# 8️⃣ Читаем параметры (строки — только для показа; копируются сырые значения)
 def get_param_as_string(elem, param_name):
     param = elem.LookupParameter(param_name)
     if param:
@@ -142,14 +124,7 @@ except Exception as e:
 with revit.Transaction("Размещение и установка параметров"):
     annotation_instance = doc.Create.NewFamilyInstance(picked_point, annotation_symbol, active_view)
 
-    def set_param(elem, param_name, value):
-        param = elem.LookupParameter(param_name)
-        if param and not param.IsReadOnly:
-            param.Set(value)
-
-    set_param(annotation_instance, 'Rebar_Number', rebar_number)
-    set_param(annotation_instance, 'Rebar_Diameter', rebar_diameter)
-    set_param(annotation_instance, 'Rebar_Spacing', rebar_spacing)
-    set_param(annotation_instance, 'PR_Rebar_ID', element_id)
+    ParamCopier(['Rebar_Number', 'Rebar_Diameter', 'Rebar_Spacing']).copy(doc, [(first_item, annotation_instance)])
+    set_value(annotation_instance.LookupParameter('PR_Rebar_ID'), element_id)
 
 forms.alert("Обозначение арматуры успешно размещено и параметры обновлены!")
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Применение плана Create Column (Peer.ColumnPlan) к документу.
+
+Вызывается внутри открытой транзакции, по одному плану уровня за раз:
+удаления одним Delete, обновление изменившихся групп, затем создание
+экземпляров пачками через PlacementPlanner, одна регенерация и размеры
+с тэгами, которым нужна геометрия созданных элементов.
+"""
+
+from Peer.ColumnReconcile import text_notes_at, delete_ids, set_fingerprint
+from Peer.Placement import PlacementPlanner
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+ROLE_COLUMN = "column"
+ROLE_MARK = "mark"
+ROLE_STIRRUP = "stirrup"
+
+
+class ColumnSymbols(object):
+    """Типоразмеры и типы, которыми исполняется план."""
+
+    def __init__(self, column, mark, stirrup, tag_type, text_type):
+        self.column = column
+        self.mark = mark
+        self.stirrup = stirrup
+        self.tag_type = tag_type
+        self.text_type = text_type
+
+    def activate(self):
+        for symbol in (self.column, self.stirrup, self.tag_type, self.mark):
+            if symbol is not None and not symbol.IsActive:
+                symbol.Activate()
+
+
+def _xyz(point):
+    return DB.XYZ(point[0], point[1], 0)
+
+
+def _params(item):
+    params = dict(item["params"])
+    if item.get("comments"):
+        params[DB.BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS] = item["comments"]
+    return params
+
+
+def _add_marks(planner, symbols, marks):
+    if symbols.mark is None:
+        if marks:
+            print("Family PR_Column Number not found")
+        return
+    for mark in marks:
+        planner.add(symbols.mark, _xyz(mark["location"]), _params(mark), role=ROLE_MARK)
+
+
+def execute_level(doc, view, level_plan, symbols):
+    """Применяет план уровня; возвращает PlacementPlanner со статистикой по ролям."""
+    ids = [DB.ElementId(i) for i in level_plan["delete_ids"]]
+    ids.extend(text_notes_at(doc, view, [tuple(loc) for loc in level_plan["delete_text_at"]]))
+    delete_ids(doc, ids)
+
+    planner = PlacementPlanner(doc, view)
+
+    # Изменились только марки: переставляем марки у существующей колонны
+    for update in level_plan["updates"]:
+        column = doc.GetElement(DB.ElementId(update["column_id"]))
+        set_fingerprint(column, update["comments"])
+        for name, value in update["params"].items():
+            param = column.LookupParameter(name)
+            if param:
+                try:
+                    param.Set(value)
+                except Exception as e:
+                    print("Error setting {}: {}".format(name, e))
+        _add_marks(planner, symbols, update["marks"])
+
+    # Новые группы: колонны, марки и хомуты создаются пачками
+    created = []
+    for group in level_plan["groups"]:
+        note = group["text_note"]
+        DB.TextNote.Create(doc, view.Id, _xyz(note["location"]), note["text"], symbols.text_type.Id)
+        column = planner.add(symbols.column, _xyz(group["column"]["location"]),
+                             _params(group["column"]), role=ROLE_COLUMN)
+        stirrup = planner.add(symbols.stirrup, _xyz(group["stirrup"]["location"]),
+                              _params(group["stirrup"]), role=ROLE_STIRRUP)
+        _add_marks(planner, symbols, group["marks"])
+        created.append((group, column, stirrup))
+    planner.execute()
+    for role, key, error in planner.errors:
+        print("Error ({}, {}): {}".format(role, key, error))
+
+    # Размеры и тэги ссылаются на геометрию — одна регенерация после записи B/H
+    if created:
+        doc.Regenerate()
+    for group, column, stirrup in created:
+        if column.instance is not None:
+            for dimension in group["dimensions"]:
+                add_dimension(doc, view, column.instance, dimension)
+        if stirrup.instance is not None:
+            add_tag(doc, view, stirrup.instance, group["tag"], symbols.tag_type)
+    return planner
+
+
+def add_dimension(doc, view, instance, dimension):
+    references = [instance.GetReferenceByName(name) for name in dimension["references"]]
+    if not all(references):
+        return None
+    ref_array = DB.ReferenceArray()
+    for reference in references:
+        ref_array.Append(reference)
+    line = DB.Line.CreateBound(_xyz(dimension["start"]), _xyz(dimension["end"]))
+    return doc.Create.NewDimension(view, line, ref_array)
+
+
+def add_tag(doc, view, instance, tag, tag_type):
+    stirrup_tag = DB.IndependentTag.Create(
+        doc,
+        view.Id,
+        DB.Reference(instance),
+        False,  # isLeader
+        DB.TagMode.TM_ADDBY_CATEGORY,
+        DB.TagOrientation.Horizontal,
+        _xyz(tag["location"])
+    )
+    stirrup_tag.ChangeTypeId(tag_type.Id)
+    return stirrup_tag
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Группировка несущих колонн по (B, H, qty_x, qty_y) сразу для всех уровней PR_Level.
+
+Каждая колонна и каждый тип читаются ровно один раз (ParamTable, значения типа
+кэшируются по TypeId). Результат — ColumnGroups: группы по всем уровням,
+пригодные и для одного уровня (Create Column), и для пакетного прогона, и для
+сравнения уровней между собой.
+"""
+
+from Peer.ParamTable import ParamSpec, read_parameters
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+PARAM_B = "B"
+PARAM_H = "H"
+PARAM_MARK = "Mark"
+PARAM_REBAR_QTY_X = "Rebar_QuantityX"
+PARAM_REBAR_QTY_Y = "Rebar_QuantityY"
+PARAM_REBAR_DIAMETER = "Rebar_Diameter"
+PARAM_LEVEL = "PR_Level"
+
+NO_MARK = "N/A"
+
+COLUMN_PARAMS = [
+    PARAM_LEVEL, PARAM_MARK, PARAM_REBAR_QTY_X, PARAM_REBAR_QTY_Y, PARAM_REBAR_DIAMETER,
+    ParamSpec(PARAM_B, from_type=True), ParamSpec(PARAM_H, from_type=True),
+]
+
+
+class ColumnGroup(object):
+    """Одинаковые колонны одного уровня: размеры в футах, армирование, марки."""
+
+    def __init__(self, level, width, height, rebar_qty_x, rebar_qty_y):
+        self.level = level
+        self.width = width
+        self.height = height
+        self.rebar_qty_x = rebar_qty_x
+        self.rebar_qty_y = rebar_qty_y
+        self.rebar_diam = 0
+        self.marks = []
+        self.element_ids = []
+
+    @property
+    def key(self):
+        return group_key(self.width, self.height, self.rebar_qty_x, self.rebar_qty_y)
+
+    def sort_key(self):
+        # Крупные сечения первыми, при равной площади — с большим армированием
+        return (-self.width * self.height, -self.rebar_qty_x - self.rebar_qty_y)
+
+    def as_dict(self):
+        """Словарь в формате columns_data скрипта Create Column."""
+        return {
+            "marks": self.marks,
+            "width": self.width,
+            "height": self.height,
+            "rebar_qty_x": self.rebar_qty_x,
+            "rebar_qty_y": self.rebar_qty_y,
+            "rebar_diam": self.rebar_diam,
+        }
+
+
+def group_key(width, height, qty_x, qty_y):
+    return (round(width, 6), round(height, 6), qty_x, qty_y)
+
+
+class ColumnGroups(object):
+    """Группы колонн по всем уровням: level -> {ключ: ColumnGroup}."""
+
+    def __init__(self):
+        self._by_level = {}
+
+    def add(self, level, width, height, qty_x, qty_y, rebar_diam, mark, element_id=None):
+        groups = self._by_level.setdefault(level, {})
+        key = group_key(width, height, qty_x, qty_y)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ColumnGroup(level, width, height, qty_x, qty_y)
+        group.rebar_diam = rebar_diam
+        group.marks.append(mark)
+        if element_id is not None:
+            group.element_ids.append(element_id)
+        return group
+
+    def levels(self):
+        return sorted(self._by_level.keys())
+
+    def groups(self, level):
+        """Группы уровня в порядке размещения на чертёжном виде."""
+        return sorted(self._by_level.get(level, {}).values(), key=lambda g: g.sort_key())
+
+    def group_map(self, level):
+        return dict(self._by_level.get(level, {}))
+
+    def column_count(self, level):
+        return sum(len(g.marks) for g in self._by_level.get(level, {}).values())
+
+
+def group_table(table, element_ids=None):
+    """ColumnGroups из уже прочитанной ParamTable (COLUMN_PARAMS)."""
+    result = ColumnGroups()
+    for i in range(len(table)):
+        level = table.get(PARAM_LEVEL, i)
+        if not level:
+            continue
+        result.add(
+            level,
+            table.get(PARAM_B, i, 0),
+            table.get(PARAM_H, i, 0),
+            table.get(PARAM_REBAR_QTY_X, i, 0),
+            table.get(PARAM_REBAR_QTY_Y, i, 0),
+            table.get(PARAM_REBAR_DIAMETER, i, 0),
+            table.get(PARAM_MARK, i, NO_MARK),
+            element_ids[i] if element_ids is not None else None,
+        )
+    return result
+
+
+def collect_column_groups(doc, columns=None):
+    """Один проход по несущим колоннам документа -> ColumnGroups по всем уровням."""
+    if columns is None:
+        columns = list(DB.FilteredElementCollector(doc)
+                       .OfCategory(DB.BuiltInCategory.OST_StructuralColumns)
+                       .WhereElementIsNotElementType())
+    table = read_parameters(doc, columns, COLUMN_PARAMS)
+    return group_table(table, [col.Id for col in table.elements])
+
+
+def compare_levels(groups, level_a, level_b):
+    """Сравнение двух уровней по ключам групп: (только в a, только в b, общие)."""
+    keys_a = set(groups.group_map(level_a).keys())
+    keys_b = set(groups.group_map(level_b).keys())
+    return sorted(keys_a - keys_b), sorted(keys_b - keys_a), sorted(keys_a & keys_b)
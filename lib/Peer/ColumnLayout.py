@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Раскладка сечений колонн на чертёжном виде Create Column.
+
+Каждая группа колонн занимает на виде не только своё сечение B x H, но и
+аннотации вокруг: размеры, подпись, марки PR_Column Number слева, хомут
+справа и тэг под хомутом. footprint() считает габарит всего этого
+относительно точки вставки колонны (левый нижний угол сечения, футы), а
+layout_columns() раскладывает габариты движком Peer.Packing без наложений.
+"""
+
+from Peer.Packing import pack, pack_best
+
+CM_TO_FT = 0.0328084
+MM_TO_FT = 1 / 304.8
+
+# Смещения аннотаций — те же, что использует Create Column при размещении
+DIM_OFFSET_FT = 0.5            # размерные линии на 0.5 фута от сечения
+DIM_TEXT_FT = 0.4              # запас под текст размера
+TEXT_OFFSET_FT = 1.2           # подпись "עמוד B/H" под сечением
+TEXT_WIDTH_CM = 60             # ширина подписи
+TEXT_HEIGHT_CM = 8
+MARK_START_CM = 21             # первая марка левее подписи на 21 см
+MARK_TOP_CM = 5.5              # и ниже неё на 5.5 см
+MARK_ROW_CM = 21               # шаг рядов марок
+MARK_HEIGHT_CM = 21
+MARKS_PER_ROW = 5
+STIRRUP_COVER_MM = 50          # хомут меньше сечения на 50 мм
+TAG_OFFSET_X_MM = 300          # тэг правее центра хомута на 300 мм
+TAG_DROP_MM = 350              # и ниже низа хомута
+TAG_WIDTH_CM = 60
+TAG_HEIGHT_CM = 10
+
+
+def mark_offsets(marks_for_inserts):
+    """Смещения (dx, dy) в футах каждой марки от точки подписи."""
+    offsets = []
+    row = 0
+    items_in_row = 0
+    cur_x = -MARK_START_CM * CM_TO_FT  # стартовая позиция по X (слева от подписи)
+    cur_y = -MARK_TOP_CM * CM_TO_FT
+    for mark_dict in marks_for_inserts:
+        if (items_in_row >= MARKS_PER_ROW) or (items_in_row >= 2 and mark_dict['num_plus']):
+            row += 1
+            cur_x = -MARK_START_CM * CM_TO_FT
+            cur_y = cur_y - row * MARK_ROW_CM * CM_TO_FT
+            items_in_row = 0
+        offsets.append((cur_x, cur_y))
+        cur_x -= mark_dict['width'] * CM_TO_FT
+        items_in_row += 1
+    return offsets
+
+
+def footprint(width, height, marks_for_inserts=()):
+    """(min_x, min_y, max_x, max_y) всех элементов группы относительно точки вставки колонны."""
+    min_x = -(DIM_OFFSET_FT + DIM_TEXT_FT)
+    min_y = -TEXT_OFFSET_FT - TEXT_HEIGHT_CM * CM_TO_FT
+    max_x = max(width, TEXT_WIDTH_CM * CM_TO_FT)
+    max_y = height
+
+    # Марки слева под подписью
+    for (dx, dy), mark_dict in zip(mark_offsets(marks_for_inserts), marks_for_inserts):
+        min_x = min(min_x, dx)
+        min_y = min(min_y, -TEXT_OFFSET_FT + dy - MARK_HEIGHT_CM * CM_TO_FT)
+        max_x = max(max_x, dx + mark_dict['width'] * CM_TO_FT)
+
+    # Хомут справа от сечения (центр на 1.5 B) и тэг под ним
+    stirrup_center_x = 1.5 * width
+    stirrup_half_w = max(width - STIRRUP_COVER_MM * MM_TO_FT, 0) / 2
+    stirrup_h = max(height - STIRRUP_COVER_MM * MM_TO_FT, 0)
+    max_x = max(max_x, stirrup_center_x + stirrup_half_w)
+    tag_x = stirrup_center_x + TAG_OFFSET_X_MM * MM_TO_FT
+    tag_y = height / 2 - (stirrup_h + TAG_DROP_MM * MM_TO_FT) / 2
+    max_x = max(max_x, tag_x + TAG_WIDTH_CM * CM_TO_FT)
+    min_y = min(min_y, tag_y - TAG_HEIGHT_CM * CM_TO_FT)
+    return min_x, min_y, max_x, max_y
+
+
+def layout_columns(columns_data, sheet_width_ft, spacing_ft, strategy=None):
+    """[(col_data, (x, y))] — точки вставки колонн без наложения аннотаций.
+
+    columns_data — словари с "width", "height" и (необязательно) "mark_inserts".
+    strategy=None — лучшая из shelf/skyline/guillotine по площади габарита.
+    """
+    items = []
+    for col_data in columns_data:
+        width, height = col_data["width"], col_data["height"]
+        if not (width > 0 and height > 0):
+            continue
+        box = footprint(width, height, col_data.get("mark_inserts", ()))
+        items.append((box[2] - box[0] + spacing_ft, box[3] - box[1] + spacing_ft, (col_data, box)))
+
+    if strategy is None:
+        result = pack_best(items, sheet_width_ft)
+    else:
+        result = pack(items, sheet_width_ft, strategy)
+
+    # Packing: y вниз от верха; на виде Revit y растёт вверх, раскладка уходит вниз от нуля
+    placed = []
+    for p in result.placements:
+        col_data, (min_x, min_y, max_x, max_y) = p.payload
+        placed.append((col_data, (p.x - min_x, -p.y - max_y)))
+    return placed
+
+
+def layout_bottom(layout):
+    """Нижняя граница (y, футы) раскладки layout_columns() с учётом аннотаций."""
+    bottom = 0.0
+    for col_data, (x, y) in layout:
+        box = footprint(col_data["width"], col_data["height"], col_data.get("mark_inserts", ()))
+        bottom = min(bottom, y + box[1])
+    return bottom
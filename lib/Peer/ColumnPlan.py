@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""План размещения Create Column — чистый Python, без Revit.
+
+Планирование отделено от записи в модель: plan_view() по группам колонн и
+тому, что уже стоит на виде, строит сериализуемый план — колонны с
+параметрами, размеры, подписи, марки, хомуты и тэги с координатами (футы),
+а также что удалить и что обновить. Peer.ColumnExecutor применяет план к
+документу; в режиме dry-run план просто сохраняется в JSON.
+
+Запись dry-run содержит и входные данные ("input"), поэтому раскладку можно
+перепланировать и замерить вне Revit:
+
+    cd lib && python -m Peer.ColumnPlan recorded.json
+"""
+
+import json
+import random
+import time
+
+from Peer.ColumnLayout import (
+    footprint, layout_columns, layout_bottom, mark_offsets, TEXT_OFFSET_FT, DIM_OFFSET_FT, MM_TO_FT
+)
+from Peer.MarkRanges import compress_marks
+from Peer.ParamTable import basestring_types
+from Peer.ColumnReconcile import (
+    PlacedGroup, reconcile, data_key, key_dimensions, column_fingerprint, member_fingerprint, parse_marks
+)
+
+
+PLAN_VERSION = 1
+
+# Параметры семейств
+PARAM_B = "B"
+PARAM_H = "H"
+PARAM_REBAR_QTY_X = "Rebar_QuantityX"
+PARAM_REBAR_QTY_Y = "Rebar_QuantityY"
+PARAM_REBAR_DIAMETER = "Rebar_Diameter"
+PARAM_NUMBER = "Num"  # первое значение
+PARAM_NUMBER2 = "Num2"  # второе значение (для диапазона)
+PARAM_NUMBER_PLUS = "Num+"  # булевый (True, если диапазон)
+PARAM_REBAR_A = "Rebar_A"  # ширина хомута
+PARAM_REBAR_B = "Rebar_B"  # высота хомута
+PARAM_REBAR_SPACING = "Rebar_Spacing"
+
+STIRRUP_COVER_MM = 50
+STIRRUP_DIAMETER_MM = 8
+STIRRUP_SPACING_MM = 200
+TAG_OFFSET_X_MM = 300
+TAG_DROP_MM = 350
+
+DEFAULT_SPACING_FT = 200 * 0.0328084
+DEFAULT_ROW_WIDTH_FT = 2300 / 100.0 * 3.28084
+
+
+MARK_WIDTH_CM = 21
+RANGE_WIDTH_CM = 50
+
+
+def build_marks_and_ranges(marks):
+    """
+    Возвращает список dict в естественном порядке марок (Peer.MarkRanges):
+    - одиночная марка: {num: str, num2: None, num_plus: False, width: 21}
+    - диапазон: {num: str, num2: str, num_plus: True, width: 50} — только если подряд 3 и более!
+    """
+    result = []
+    for mark_range in compress_marks(marks):
+        if mark_range.is_range:
+            result.append({'num': mark_range.first, 'num2': mark_range.last, 'num_plus': True,
+                           'width': RANGE_WIDTH_CM})
+        else:
+            result.append({'num': mark_range.first, 'num2': None, 'num_plus': False,
+                           'width': MARK_WIDTH_CM})
+    return result
+
+
+def columns_data_of(groups, scope=None):
+    """Словари columns_data (с mark_inserts и scope) из ColumnGroup уровня."""
+    columns_data = [group.as_dict() for group in groups]
+    for col_data in columns_data:
+        col_data["mark_inserts"] = build_marks_and_ranges(col_data["marks"])
+        col_data["scope"] = scope
+    return columns_data
+
+
+def placed_bottom(placed_groups, new_marks=None):
+    """Нижняя граница (y, футы) всего уже размещённого; 0, если вид пуст.
+
+    Габарит — тот же footprint(), что у раскладки, с полосой марок под подписью;
+    new_marks — ключ группы -> марки, которые получит обновляемая группа.
+    """
+    new_marks = new_marks or {}
+    bottom = None
+    for key, placed in placed_groups.items():
+        if placed.location is None:
+            continue
+        width, height = key_dimensions(key)
+        marks = new_marks.get(key)
+        if marks is None:
+            marks = list(placed.marks or ())
+        min_y = placed.location[1] + footprint(width, height, build_marks_and_ranges(marks))[1]
+        bottom = min_y if bottom is None else min(bottom, min_y)
+    return bottom if bottom is not None else 0.0
+
+
+def _xy(x, y):
+    return [x, y]
+
+
+def _id_value(element_id):
+    return getattr(element_id, "IntegerValue", element_id)
+
+
+# --- Элементы плана ---
+
+def plan_marks(col_data, text_x, text_y):
+    fingerprint = member_fingerprint(col_data)
+    marks = []
+    inserts = col_data["mark_inserts"]
+    for mark_dict, (dx, dy) in zip(inserts, mark_offsets(inserts)):
+        marks.append({
+            "location": _xy(text_x + dx, text_y + dy),
+            "params": {
+                PARAM_NUMBER: str(mark_dict['num']),
+                PARAM_NUMBER2: str(mark_dict['num2']) if mark_dict['num2'] else "",
+                PARAM_NUMBER_PLUS: 1 if mark_dict['num_plus'] else 0,
+            },
+            "comments": fingerprint,
+        })
+    return marks
+
+
+def stirrup_size_mm(width, height):
+    """(A, B) хомута в мм."""
+    # Автоматическое определение единиц: если width > 10 — это мм, иначе футы
+    if width > 10:
+        return width - STIRRUP_COVER_MM, height - STIRRUP_COVER_MM
+    return width * 304.8 - STIRRUP_COVER_MM, height * 304.8 - STIRRUP_COVER_MM
+
+
+def plan_group(col_data, x, y):
+    """Всё, что ставится для новой группы с точкой вставки колонны (x, y)."""
+    width = col_data["width"]
+    height = col_data["height"]
+    text_x, text_y = x, y - TEXT_OFFSET_FT
+
+    # Центр хомута на 1.5 B правее точки вставки, тэг ниже низа хомута
+    stirrup_x = x + width / 2 + width
+    stirrup_y = y + height / 2
+    stirrup_a, stirrup_b = stirrup_size_mm(width, height)
+
+    return {
+        "key": data_key(col_data),
+        "column": {
+            "location": _xy(x, y),
+            "params": {
+                PARAM_B: width,
+                PARAM_H: height,
+                PARAM_REBAR_QTY_X: col_data["rebar_qty_x"],
+                PARAM_REBAR_QTY_Y: col_data["rebar_qty_y"],
+                PARAM_REBAR_DIAMETER: col_data["rebar_diam"],
+            },
+            "comments": column_fingerprint(col_data),
+        },
+        "dimensions": [
+            {"references": ["Left", "Right"],
+             "start": _xy(x, y - DIM_OFFSET_FT), "end": _xy(x + width, y - DIM_OFFSET_FT)},
+            {"references": ["Bottom", "Top"],
+             "start": _xy(x - DIM_OFFSET_FT, y), "end": _xy(x - DIM_OFFSET_FT, y + height)},
+        ],
+        "text_note": {
+            "location": _xy(text_x, text_y),
+            "text": u"עמוד {}/{}".format(int(round(width * 30.48)), int(round(height * 30.48))),
+        },
+        "marks": plan_marks(col_data, text_x, text_y),
+        "stirrup": {
+            "location": _xy(stirrup_x, stirrup_y),
+            "params": {
+                PARAM_REBAR_A: stirrup_a * MM_TO_FT,
+                PARAM_REBAR_B: stirrup_b * MM_TO_FT,
+                PARAM_REBAR_DIAMETER: STIRRUP_DIAMETER_MM * MM_TO_FT,
+                PARAM_REBAR_SPACING: STIRRUP_SPACING_MM * MM_TO_FT,
+            },
+            "comments": member_fingerprint(col_data),
+        },
+        "tag": {
+            "location": _xy(stirrup_x + TAG_OFFSET_X_MM * MM_TO_FT,
+                            stirrup_y - (stirrup_b + TAG_DROP_MM) * MM_TO_FT / 2),
+        },
+    }
+
+
+def plan_level(level, scope, columns_data, changes, offset_y, legacy_ids=(), legacy_locations=(),
+               row_width_ft=DEFAULT_ROW_WIDTH_FT, spacing_ft=DEFAULT_SPACING_FT, strategy=None):
+    """(план уровня, раскладка новых групп) по результату reconcile() для уровня."""
+    layout = layout_columns(changes.create, row_width_ft, spacing_ft, strategy)
+
+    # Удаления одним вызовом: исчезнувшие группы (с подписями), старые марки
+    # изменившихся групп и непомеченные элементы прежних запусков
+    delete_ids = [_id_value(eid) for eid in legacy_ids]
+    removed_locations = [list(loc) for loc in legacy_locations]
+    for placed in changes.delete:
+        delete_ids.extend(_id_value(eid) for eid in placed.element_ids)
+        if placed.location is not None:
+            removed_locations.append(list(placed.location))
+
+    # Изменились только марки: новые марки у существующей колонны
+    updates = []
+    for col_data, placed in changes.update:
+        delete_ids.extend(_id_value(eid) for eid in placed.mark_ids)
+        updates.append({
+            "column_id": _id_value(placed.column_id),
+            "comments": column_fingerprint(col_data),
+            "params": {PARAM_REBAR_DIAMETER: col_data["rebar_diam"]},
+            "marks": plan_marks(col_data, placed.location[0], placed.location[1] - TEXT_OFFSET_FT),
+        })
+
+    groups = [plan_group(col_data, x, y + offset_y) for col_data, (x, y) in layout]
+    level_plan = {
+        "level": level,
+        "scope": scope,
+        "counts": {
+            "columns": sum(len(c["marks"]) for c in columns_data),
+            "groups": len(columns_data),
+            "created": len(changes.create),
+            "updated": len(changes.update),
+            "deleted": len(changes.delete),
+            "unchanged": len(changes.keep),
+        },
+        "delete_ids": delete_ids,
+        "delete_text_at": removed_locations,
+        "updates": updates,
+        "groups": groups,
+    }
+    return level_plan, layout
+
+
+def plan_view(view_name, levels_data, placed_groups=None, legacy_ids=(), legacy_locations=(),
+              stacked=False, row_width_ft=DEFAULT_ROW_WIDTH_FT, spacing_ft=DEFAULT_SPACING_FT,
+              strategy=None):
+    """План одного вида. levels_data — [(уровень, columns_data)] в порядке размещения."""
+    placed_groups = placed_groups or {}
+    # Сначала сравнение по всем уровням: что остаётся на виде и с какими марками
+    kept_all = dict(placed_groups)
+    new_marks = {}
+    level_changes = []
+    for level, columns_data in levels_data:
+        scope = level if stacked else None
+        for col_data in columns_data:
+            col_data["scope"] = scope
+        changes = reconcile(placed_groups, columns_data, scopes=set([scope]))
+        for placed in changes.delete:
+            kept_all.pop(placed.key, None)
+        for col_data, placed in changes.update:
+            new_marks[placed.key] = col_data["marks"]
+        level_changes.append((level, scope, columns_data, changes))
+
+    # Новые группы уходят ниже всего, что остаётся на виде
+    bottom_y = placed_bottom(kept_all, new_marks) - spacing_ft if kept_all else 0.0
+    level_plans = []
+    for level, scope, columns_data, changes in level_changes:
+        level_plan, layout = plan_level(
+            level, scope, columns_data, changes, bottom_y, legacy_ids, legacy_locations,
+            row_width_ft, spacing_ft, strategy)
+        level_plans.append(level_plan)
+        # Непомеченные элементы удаляются один раз на вид
+        legacy_ids, legacy_locations = (), ()
+        if layout:
+            bottom_y += layout_bottom(layout) - spacing_ft
+    return {"version": PLAN_VERSION, "view": view_name, "stacked": stacked, "levels": level_plans}
+
+
+# --- Сериализация входа (для воспроизведения вне Revit) ---
+
+def placed_group_to_dict(placed):
+    return {
+        "key": placed.key,
+        "marks": list(placed.marks) if placed.marks is not None else None,
+        "rebar_diam": placed.rebar_diam,
+        "column_id": _id_value(placed.column_id),
+        "location": list(placed.location) if placed.location is not None else None,
+        "mark_ids": [_id_value(eid) for eid in placed.mark_ids],
+        "stirrup_ids": [_id_value(eid) for eid in placed.stirrup_ids],
+    }
+
+
+def placed_group_from_dict(data):
+    placed = PlacedGroup(data["key"])
+    marks = data.get("marks")
+    if isinstance(marks, basestring_types):
+        marks = parse_marks(marks)  # запись прежней версии: марки текстом отпечатка
+    placed.marks = tuple(marks) if marks is not None else None
+    placed.rebar_diam = data.get("rebar_diam")
+    placed.column_id = data.get("column_id")
+    placed.location = tuple(data["location"]) if data.get("location") else None
+    placed.mark_ids = list(data.get("mark_ids", []))
+    placed.stirrup_ids = list(data.get("stirrup_ids", []))
+    return placed
+
+
+def view_input(view_name, levels_data, placed_groups=None, legacy_ids=(), legacy_locations=(),
+               stacked=False):
+    """Вход plan_view() в виде, пригодном для JSON."""
+    return {
+        "view": view_name,
+        "stacked": stacked,
+        "levels": [[level, [dict((k, v) for k, v in c.items() if k != "mark_inserts")
+                            for c in columns_data]]
+                   for level, columns_data in levels_data],
+        "placed": [placed_group_to_dict(p) for p in (placed_groups or {}).values()],
+        "legacy_ids": [_id_value(eid) for eid in legacy_ids],
+        "legacy_locations": [list(loc) for loc in legacy_locations],
+    }
+
+
+def plan_from_input(data, **settings):
+    """plan_view() по записи view_input()."""
+    levels_data = []
+    for level, columns_data in data["levels"]:
+        for col_data in columns_data:
+            col_data["mark_inserts"] = build_marks_and_ranges(col_data["marks"])
+        levels_data.append((level, columns_data))
+    placed_groups = dict((p["key"], placed_group_from_dict(p)) for p in data.get("placed", []))
+    return plan_view(data["view"], levels_data, placed_groups, data.get("legacy_ids", ()),
+                     [tuple(loc) for loc in data.get("legacy_locations", ())],
+                     data.get("stacked", False), **settings)
+
+
+def dump_plan(path, inputs, plans):
+    """Запись dry-run: входы и планы всех видов."""
+    with open(path, "w") as f:
+        json.dump({"version": PLAN_VERSION, "input": inputs, "plans": plans}, f, indent=1)
+
+
+def load_record(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# --- Бенчмарк ---
+
+def random_levels(level_count=3, groups_per_level=100, seed=0):
+    """Синтетические columns_data: уровни с группами случайных сечений и марок."""
+    rnd = random.Random(seed)
+    levels = []
+    mark = 1
+    for li in range(level_count):
+        columns_data = []
+        for gi in range(groups_per_level):
+            marks = []
+            for _ in range(rnd.randint(1, 12)):
+                marks.append(str(mark))
+                mark += rnd.choice((1, 1, 1, 2))
+            columns_data.append({
+                "marks": marks,
+                "width": rnd.choice((25, 30, 40, 50, 60)) * 0.0328084,
+                "height": rnd.choice((25, 30, 40, 50, 60, 80, 100)) * 0.0328084 + gi * 1e-4,
+                "rebar_qty_x": rnd.randint(2, 6),
+                "rebar_qty_y": rnd.randint(2, 6),
+                "rebar_diam": 16 / 304.8,
+            })
+        levels.append(["Level {}".format(li + 1), columns_data])
+    return {"view": "Columns", "stacked": True, "levels": levels}
+
+
+def benchmark(record, repeat=3, **settings):
+    """[(вид, групп, элементов плана, лучшее время, с)] повторного планирования записи."""
+    rows = []
+    for data in record:
+        best = None
+        plan = None
+        for _ in range(repeat):
+            data_copy = json.loads(json.dumps(data))
+            start = time.time()
+            plan = plan_from_input(data_copy, **settings)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        groups = sum(len(lp["groups"]) for lp in plan["levels"])
+        items = sum(3 + len(g["marks"]) + len(g["dimensions"]) for lp in plan["levels"] for g in lp["groups"])
+        rows.append((plan["view"], groups, items, best))
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        record = load_record(sys.argv[1])["input"]
+    else:
+        record = [random_levels()]
+    print("{:<20} {:>7} {:>8} {:>9}".format("view", "groups", "items", "sec"))
+    for view_name, groups, items, elapsed in benchmark(record):
+        print("{:<20} {:>7} {:>8} {:>9.3f}".format(view_name, groups, items, elapsed))
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""Инкрементальное обновление чертёжного вида Create Column.
+
+Каждая размещённая группа помечается отпечатком в параметре Comments:
+    - колонна:          "PEER_CC:[<уровень>@]<B|H|qty_x|qty_y>#<марки>#<диаметр>"
+    - марки и хомут:    "PEER_CC:[<уровень>@]<B|H|qty_x|qty_y>"
+Уровень (col_data["scope"]) пишется, когда на одном виде стоят несколько уровней.
+Марки разделяются ","; в уровне и марках "#", ",", "@" и "\\" экранируются
+обратной косой чертой, так что имя уровня "Ур. 1@2" или марка "К#3" разбираются
+верно. Марки сравниваются кортежами, а не текстом.
+Размеры и тэг хомута привязаны к колонне/хомуту и удаляются вместе с ними,
+подпись находится по точке вставки колонны.
+
+reconcile() сравнивает размещённое с новыми группами и говорит, что создать,
+что обновить (изменились марки или диаметр арматуры) и что удалить — чистая
+функция без Revit.
+"""
+
+from Peer.ColumnLayout import TEXT_OFFSET_FT
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+FINGERPRINT_PREFIX = "PEER_CC:"
+MARKS_SEPARATOR = "#"
+SCOPE_SEPARATOR = "@"
+MARK_SEPARATOR = ","
+ESCAPE = "\\"
+_SPECIAL = ESCAPE + MARKS_SEPARATOR + MARK_SEPARATOR + SCOPE_SEPARATOR
+
+
+def escape(text):
+    return "".join(ESCAPE + c if c in _SPECIAL else c for c in text)
+
+
+def unescape(text):
+    result = []
+    chars = iter(text)
+    for c in chars:
+        result.append(next(chars, c) if c == ESCAPE else c)
+    return "".join(result)
+
+
+def split_escaped(text, separator):
+    """Части text по неэкранированному separator; экранирование в частях сохраняется."""
+    parts = []
+    current = []
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == ESCAPE:
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        if c == separator:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(c)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+
+def group_key_text(width, height, qty_x, qty_y, scope=None):
+    key = "{:.6f}|{:.6f}|{:g}|{:g}".format(width, height, qty_x, qty_y)
+    return escape(scope) + SCOPE_SEPARATOR + key if scope else key
+
+
+def data_key(col_data):
+    return group_key_text(col_data["width"], col_data["height"],
+                          col_data["rebar_qty_x"], col_data["rebar_qty_y"], col_data.get("scope"))
+
+
+def marks_key(marks):
+    """Марки группы для сравнения: отсортированный кортеж."""
+    return tuple(sorted(marks))
+
+
+def marks_text(marks):
+    return MARK_SEPARATOR.join(escape(mark) for mark in marks_key(marks))
+
+
+def parse_marks(text):
+    return tuple(unescape(mark) for mark in split_escaped(text, MARK_SEPARATOR)) if text else ()
+
+
+def diameter_text(col_data):
+    return "{:.6f}".format(col_data.get("rebar_diam") or 0)
+
+
+def column_fingerprint(col_data):
+    """Отпечаток группы для колонны: ключ сечения/армирования + марки + диаметр."""
+    return FINGERPRINT_PREFIX + data_key(col_data) + MARKS_SEPARATOR + marks_text(col_data["marks"]) \
+        + MARKS_SEPARATOR + diameter_text(col_data)
+
+
+def member_fingerprint(col_data):
+    """Отпечаток для марок и хомута группы (без марок — они меняются отдельно)."""
+    return FINGERPRINT_PREFIX + data_key(col_data)
+
+
+def parse_fingerprint(text):
+    """(ключ, марки кортежем, диаметр) из Comments (марки и диаметр — None у марок и
+    хомута); None, если элемент не помечен. У отпечатков прежних версий диаметра нет — None."""
+    if not text or not text.startswith(FINGERPRINT_PREFIX):
+        return None
+    parts = split_escaped(text[len(FINGERPRINT_PREFIX):], MARKS_SEPARATOR)
+    marks = parse_marks(parts[1]) if len(parts) > 1 else None
+    diameter = parts[2] if len(parts) > 2 else None
+    return parts[0], marks, diameter
+
+
+def key_scope(key):
+    """Уровень из ключа группы (None для вида одного уровня)."""
+    parts = split_escaped(key, SCOPE_SEPARATOR)
+    return unescape(parts[0]) if len(parts) > 1 else None
+
+
+def key_dimensions(key):
+    """(B, H) в футах из ключа группы."""
+    parts = split_escaped(key, SCOPE_SEPARATOR)[-1].split("|")
+    return float(parts[0]), float(parts[1])
+
+
+class PlacedGroup(object):
+    """Уже размещённая на виде группа."""
+
+    def __init__(self, key):
+        self.key = key
+        self.marks = None  # кортеж марок из отпечатка (marks_key)
+        self.rebar_diam = None  # диаметр из отпечатка, текстом (diameter_text)
+        self.column_id = None
+        self.location = None  # (x, y) точки вставки колонны
+        self.mark_ids = []
+        self.stirrup_ids = []
+
+    @property
+    def element_ids(self):
+        ids = list(self.mark_ids) + list(self.stirrup_ids)
+        if self.column_id is not None:
+            ids.append(self.column_id)
+        return ids
+
+
+class Reconciliation(object):
+    def __init__(self):
+        self.create = []   # col_data новых групп
+        self.update = []   # (col_data, PlacedGroup) — изменились марки или диаметр
+        self.delete = []   # PlacedGroup, которых больше нет
+        self.keep = []     # (col_data, PlacedGroup) без изменений
+
+    def summary(self):
+        return "created {}, updated {}, deleted {}, unchanged {}".format(
+            len(self.create), len(self.update), len(self.delete), len(self.keep))
+
+
+def reconcile(placed_groups, columns_data, scopes=None):
+    """Сравнение размещённых групп (key -> PlacedGroup) с новыми columns_data.
+
+    scopes — если задано, группы других уровней на виде не трогаются.
+    """
+    result = Reconciliation()
+    if scopes is not None:
+        placed_groups = dict((key, placed) for key, placed in placed_groups.items()
+                             if key_scope(key) in scopes)
+    new_by_key = {}
+    for col_data in columns_data:
+        if col_data["width"] > 0 and col_data["height"] > 0:
+            new_by_key[data_key(col_data)] = col_data
+
+    for key, placed in placed_groups.items():
+        col_data = new_by_key.get(key)
+        if col_data is None or placed.column_id is None:
+            result.delete.append(placed)
+        elif placed.marks != marks_key(col_data["marks"]) or placed.rebar_diam != diameter_text(col_data):
+            result.update.append((col_data, placed))
+        else:
+            result.keep.append((col_data, placed))
+
+    matched = set(key for key, placed in placed_groups.items() if placed.column_id is not None)
+    for key, col_data in new_by_key.items():
+        if key not in matched:
+            result.create.append(col_data)
+    return result
+
+
+def text_location_of(location):
+    return location[0], location[1] - TEXT_OFFSET_FT
+
+
+# --- Чтение состояния вида (Revit) ---
+
+def _comments(elem):
+    param = elem.get_Parameter(DB.BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)
+    return param.AsString() if param else None
+
+
+def read_placed_groups(doc, view, column_family, mark_family, stirrup_family):
+    """Размещённое на виде: (key -> PlacedGroup, id непомеченных экземпляров трёх семейств,
+    точки вставки непомеченных колонн — для поиска их подписей)."""
+    groups = {}
+    legacy_ids = []
+    legacy_locations = []
+    families = (column_family, mark_family, stirrup_family)
+    collector = DB.FilteredElementCollector(doc, view.Id).OfClass(DB.FamilyInstance)
+    for inst in collector:
+        family_name = inst.Symbol.FamilyName
+        if family_name not in families:
+            continue
+        parsed = parse_fingerprint(_comments(inst))
+        if parsed is None:
+            legacy_ids.append(inst.Id)
+            if family_name == column_family:
+                point = inst.Location.Point
+                legacy_locations.append((point.X, point.Y))
+            continue
+        key, marks, diameter = parsed
+        placed = groups.get(key)
+        if placed is None:
+            placed = groups[key] = PlacedGroup(key)
+        if family_name == column_family:
+            if placed.column_id is not None:
+                legacy_ids.append(inst.Id)  # дубликат группы — убираем
+                continue
+            placed.column_id = inst.Id
+            placed.marks = marks
+            placed.rebar_diam = diameter
+            point = inst.Location.Point
+            placed.location = (point.X, point.Y)
+        elif family_name == mark_family:
+            placed.mark_ids.append(inst.Id)
+        else:
+            placed.stirrup_ids.append(inst.Id)
+    return groups, legacy_ids, legacy_locations
+
+
+def text_notes_at(doc, view, locations):
+    """Id подписей TextNote, стоящих в точках подписи колонн с точками вставки locations."""
+    wanted = set(_point_key(text_location_of(loc)) for loc in locations)
+    if not wanted:
+        return []
+    return [note.Id for note in DB.FilteredElementCollector(doc, view.Id).OfClass(DB.TextNote)
+            if _point_key((note.Coord.X, note.Coord.Y)) in wanted]
+
+
+def _point_key(point):
+    # Точки считаются тем же кодом, что их и ставил, — достаточно округления
+    return round(point[0], 4), round(point[1], 4)
+
+
+def set_fingerprint(elem, text):
+    param = elem.get_Parameter(DB.BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)
+    if param and not param.IsReadOnly:
+        param.Set(text)
+
+
+def delete_ids(doc, element_ids):
+    """Одно doc.Delete(ICollection) на все удаления."""
+    from System.Collections.Generic import List
+    ids = List[DB.ElementId]()
+    for eid in element_ids:
+        ids.Add(eid)
+    if ids.Count:
+        doc.Delete(ids)
+    return ids.Count
+
+
+# --- Проверка разбора отпечатков (тестов в репозитории нет — запуск как модуля) ---
+
+def check_fingerprints():
+    """Отпечатки с разделителями в уровне и марках разбираются обратно без потерь."""
+    problems = []
+    cases = [
+        ("Level 1", ["1", "2"]),
+        ("Ур. 1@2", ["К#3", "К,4", "a\\b"]),
+        ("#@,\\", ["@", "#", ",", "\\", ""]),
+        (None, ["12"]),
+        (None, []),
+    ]
+    for scope, marks in cases:
+        col_data = {"width": 0.9842, "height": 1.3123, "rebar_qty_x": 3, "rebar_qty_y": 4,
+                    "rebar_diam": 16 / 304.8, "marks": marks, "scope": scope}
+        key, parsed_marks, diameter = parse_fingerprint(column_fingerprint(col_data))
+        member_key = parse_fingerprint(member_fingerprint(col_data))[0]
+        if key != data_key(col_data) or member_key != key:
+            problems.append("{!r}: key {!r}".format(scope, key))
+        if key_scope(key) != scope or key_dimensions(key) != (0.9842, 1.3123):
+            problems.append("{!r}: scope {!r}, size {}".format(scope, key_scope(key), key_dimensions(key)))
+        if parsed_marks != marks_key(marks) or diameter != diameter_text(col_data):
+            problems.append("{!r}: marks {!r}, diameter {!r}".format(scope, parsed_marks, diameter))
+        placed = PlacedGroup(key)
+        placed.column_id, placed.marks, placed.rebar_diam = 1, parsed_marks, diameter
+        result = reconcile({key: placed}, [col_data], scopes=[scope])
+        if len(result.keep) != 1:
+            problems.append("{!r}: {}".format(scope, result.summary()))
+    return problems
+
+
+if __name__ == "__main__":
+    problems = check_fingerprints()
+    for problem in problems:
+        print(problem)
+    print("fingerprint checks: {} problems".format(len(problems)))
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Индекс элементов документа: один проход по документу, дальше поиск по словарям.
+
+Вместо повторных FilteredElementCollector(doc).OfClass(...) в циклах скрипты
+строят ElementIndex один раз и берут из него:
+    - типоразмеры семейств по (имя семейства, имя типа);
+    - типы текста по имени;
+    - типы видов по (ViewFamily, имя);
+    - виды по имени и листы по номеру;
+    - планы по (уровень, тип вида) — без обращения к элементу типа.
+
+Индекс можно собрать без Revit: достаточно передать готовые списки элементов
+(buckets), например из фейкового документа.
+"""
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+# Ключи "корзин", по которым раскладываются элементы документа
+FAMILY_SYMBOL = "FamilySymbol"
+TEXT_NOTE_TYPE = "TextNoteType"
+VIEW_FAMILY_TYPE = "ViewFamilyType"
+VIEW_SHEET = "ViewSheet"
+VIEW = "View"
+
+
+def get_type_name(elem):
+    """Имя типа через SYMBOL_NAME_PARAM (в IronPython .Name у ElementType ненадёжен)."""
+    if DB is not None:
+        try:
+            param = elem.get_Parameter(DB.BuiltInParameter.SYMBOL_NAME_PARAM)
+            if param:
+                return param.AsString()
+        except Exception:
+            pass
+    return getattr(elem, "Name", None)
+
+
+def _int_id(item):
+    if hasattr(item, "Id"):
+        item = item.Id
+    return getattr(item, "IntegerValue", item)
+
+
+def plan_key(level, view_type):
+    """Ключ плана (id уровня, id типа вида) — числа из элементов, ElementId или чисел."""
+    return _int_id(level), _int_id(view_type)
+
+
+def clr_type(cls):
+    import clr
+    return clr.GetClrType(cls)
+
+
+def collect_buckets(doc):
+    """Один FilteredElementCollector с ElementMulticlassFilter -> {ключ: [элементы]}."""
+    from System import Type
+    from System.Collections.Generic import List
+
+    classes = [DB.FamilySymbol, DB.TextNoteType, DB.ViewFamilyType, DB.View]
+    type_list = List[Type]([clr_type(c) for c in classes])
+    collector = DB.FilteredElementCollector(doc).WherePasses(DB.ElementMulticlassFilter(type_list))
+
+    buckets = {FAMILY_SYMBOL: [], TEXT_NOTE_TYPE: [], VIEW_FAMILY_TYPE: [], VIEW_SHEET: [], VIEW: []}
+    for elem in collector:
+        if isinstance(elem, DB.FamilySymbol):
+            buckets[FAMILY_SYMBOL].append(elem)
+        elif isinstance(elem, DB.TextNoteType):
+            buckets[TEXT_NOTE_TYPE].append(elem)
+        elif isinstance(elem, DB.ViewFamilyType):
+            buckets[VIEW_FAMILY_TYPE].append(elem)
+        elif isinstance(elem, DB.ViewSheet):
+            buckets[VIEW_SHEET].append(elem)
+        elif isinstance(elem, DB.View):
+            buckets[VIEW].append(elem)
+    return buckets
+
+
+class ElementIndex(object):
+    """Словари поиска по элементам документа, собранные за один проход."""
+
+    def __init__(self, doc=None, buckets=None):
+        self.doc = doc
+        if buckets is None:
+            buckets = collect_buckets(doc)
+
+        self._symbols = {}             # (FamilyName, имя типа) -> FamilySymbol
+        self._family_symbols = {}      # FamilyName -> [FamilySymbol]
+        self._category_symbols = {}    # Category.Id.IntegerValue -> [FamilySymbol]
+        self._text_note_types = {}     # имя -> TextNoteType
+        self._first_text_note_type = None
+        self._view_family_types = {}   # (ViewFamily, имя) -> ViewFamilyType
+        self._first_view_family_types = {}  # ViewFamily -> первый ViewFamilyType
+        self._views = {}               # имя -> [View] (без шаблонов и листов)
+        self._plan_views = {}          # (id уровня, id типа вида) -> [ViewPlan]
+        self._sheets = {}              # SheetNumber -> ViewSheet
+
+        for symbol in buckets.get(FAMILY_SYMBOL, []):
+            self.add_symbol(symbol)
+        for ttype in buckets.get(TEXT_NOTE_TYPE, []):
+            self.add_text_note_type(ttype)
+        for vft in buckets.get(VIEW_FAMILY_TYPE, []):
+            self.add_view_family_type(vft)
+        for sheet in buckets.get(VIEW_SHEET, []):
+            self.add_sheet(sheet)
+        for view in buckets.get(VIEW, []):
+            self.add_view(view)
+
+    # --- Пополнение индекса (для элементов, созданных после сборки) ---
+
+    def add_symbol(self, symbol):
+        family_name = symbol.FamilyName
+        self._symbols.setdefault((family_name, get_type_name(symbol)), symbol)
+        self._family_symbols.setdefault(family_name, []).append(symbol)
+        category = symbol.Category
+        if category is not None:
+            self._category_symbols.setdefault(category.Id.IntegerValue, []).append(symbol)
+
+    def add_text_note_type(self, ttype):
+        if self._first_text_note_type is None:
+            self._first_text_note_type = ttype
+        self._text_note_types.setdefault(get_type_name(ttype), ttype)
+
+    def add_view_family_type(self, vft):
+        self._view_family_types.setdefault((vft.ViewFamily, get_type_name(vft)), vft)
+        self._first_view_family_types.setdefault(vft.ViewFamily, vft)
+
+    def add_sheet(self, sheet):
+        self._sheets[sheet.SheetNumber] = sheet
+
+    def add_view(self, view):
+        if getattr(view, "IsTemplate", False):
+            return
+        self._views.setdefault(view.Name, []).append(view)
+        if DB is None or isinstance(view, DB.ViewPlan):
+            key = plan_key(view.LevelId, view.GetTypeId())
+            if key[0] > 0:
+                self._plan_views.setdefault(key, []).append(view)
+
+    # --- Поиск ---
+
+    def symbol(self, family_name, type_name=None):
+        """Типоразмер по имени семейства и типа; без type_name — первый тип семейства."""
+        if type_name is not None:
+            return self._symbols.get((family_name, type_name))
+        symbols = self._family_symbols.get(family_name)
+        return symbols[0] if symbols else None
+
+    def symbols_of_family(self, family_name):
+        return list(self._family_symbols.get(family_name, []))
+
+    def symbols_of_category(self, built_in_category):
+        return list(self._category_symbols.get(int(built_in_category), []))
+
+    def text_note_type(self, name, fallback_to_first=True):
+        """Тип текста по имени; если не найден — первый тип текста в проекте."""
+        ttype = self._text_note_types.get(name)
+        if ttype is None and fallback_to_first:
+            return self._first_text_note_type
+        return ttype
+
+    def view_family_type(self, view_family, name=None):
+        """Тип вида по (ViewFamily, имя); без имени — первый тип этого семейства видов."""
+        if name is not None:
+            return self._view_family_types.get((view_family, name))
+        return self._first_view_family_types.get(view_family)
+
+    def view(self, name, view_class=None):
+        """Вид по имени; view_class сужает поиск (имена уникальны только внутри типа вида)."""
+        for view in self._views.get(name, []):
+            if view_class is None or isinstance(view, view_class):
+                return view
+        return None
+
+    def plan_view(self, level, view_type):
+        """План уровня данного типа вида (уровень и тип — элементы или ElementId) или None."""
+        views = self._plan_views.get(plan_key(level, view_type))
+        return views[0] if views else None
+
+    def views(self):
+        return [view for views in self._views.values() for view in views]
+
+    def sheet(self, sheet_number):
+        return self._sheets.get(sheet_number)
+
+    def sheets(self):
+        return list(self._sheets.values())
+
+    def view_names(self):
+        return set(self._views.keys())
+
+    def sheet_numbers(self):
+        return set(self._sheets.keys())
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Обработка предупреждений и ошибок транзакции без диалогов Revit.
+
+attach_failure_log(t, log) ставит на транзакцию IFailuresPreprocessor:
+предупреждения удаляются и записываются в log, ошибки с вариантом
+исправления исправляются, остальные записываются. Так пакетная операция не
+останавливается на диалоге из-за одного элемента, а итог можно показать
+пользователю одним сообщением.
+
+Ошибка без варианта исправления не удаляется: Revit откатывает всю
+транзакцию (Commit() возвращает RolledBack) — вызывающий код должен это
+проверить и сообщить, что откатан весь пакет.
+"""
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+class FailureLog(object):
+    def __init__(self):
+        self.warnings = []
+        self.resolved = []
+        self.errors = []
+
+    def __len__(self):
+        return len(self.warnings) + len(self.resolved) + len(self.errors)
+
+    def summary(self):
+        return "warnings {}, resolved {}, errors {}".format(
+            len(self.warnings), len(self.resolved), len(self.errors))
+
+    def rows(self):
+        """[(вид, текст)] для таблицы отчёта: сначала ошибки, затем исправленные и предупреждения."""
+        return [("error", text) for text in self.errors] + \
+            [("resolved", text) for text in self.resolved] + \
+            [("warning (deleted)", text) for text in self.warnings]
+
+
+if DB is not None:
+    class LoggingFailuresPreprocessor(DB.IFailuresPreprocessor):
+        def __init__(self, log):
+            self.log = log
+
+        def PreprocessFailures(self, accessor):
+            resolved = False
+            for failure in accessor.GetFailureMessages():
+                text = failure.GetDescriptionText()
+                if failure.GetSeverity() == DB.FailureSeverity.Warning:
+                    self.log.warnings.append(text)
+                    accessor.DeleteWarning(failure)
+                elif failure.HasResolutions():
+                    self.log.resolved.append(text)
+                    accessor.ResolveFailure(failure)
+                    resolved = True
+                else:
+                    self.log.errors.append(text)
+            if resolved:
+                return DB.FailureProcessingResult.ProceedWithCommit
+            return DB.FailureProcessingResult.Continue
+
+
+def attach_failure_log(transaction, log):
+    """Подключает LoggingFailuresPreprocessor к транзакции (до или после Start)."""
+    options = transaction.GetFailureHandlingOptions()
+    options.SetFailuresPreprocessor(LoggingFailuresPreprocessor(log))
+    options.SetClearAfterRollback(True)
+    transaction.SetFailureHandlingOptions(options)
+    return log
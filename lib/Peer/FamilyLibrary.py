@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Инкрементальная загрузка семейств из папки библиотеки.
+
+Манифест (JSON) помнит по каждому файлу размер, время изменения и хэш
+содержимого, а по каждому проекту — какое семейство загружено из файла с
+каким хэшем. Дерево папок обходит Peer.FamilyScan.LibraryScanner: хэш
+пересчитывается только у файлов с изменившимися размером или временем, из
+одноимённых файлов в разных папках берётся первый по обходу. Загружаются
+только новые и изменённые семейства и те, которых нет в проекте; остальные
+пропускаются без вызова doc.LoadFamily.
+
+    manifest = Manifest.load(path)
+    for record in LibraryScanner(library, manifest):
+        if load_status(record, manifest, doc_key, family_names_in_project) != UNCHANGED:
+            load_family(doc, record.path)  # в транзакции
+            manifest.mark_loaded(doc_key, record)
+        manifest.remember(record)
+    manifest.save(path)
+"""
+
+import hashlib
+import json
+import os
+import re
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+MANIFEST_VERSION = 1
+# Резервные копии Revit: Name.0001.rfa
+BACKUP_PATTERN = re.compile(r"\.\d{4}\.rfa$", re.IGNORECASE)
+HASH_CHUNK = 1 << 20
+
+NEW = "new"                  # файла не было в манифесте
+CHANGED = "changed"          # хэш отличается от загруженного в проект
+MISSING = "missing"          # семейства нет в проекте
+UNCHANGED = "unchanged"      # в проекте та же версия — пропуск
+
+
+def is_family_file(name):
+    lower = name.lower()
+    return lower.endswith(".rfa") and not BACKUP_PATTERN.search(lower)
+
+
+def family_name_of(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        chunk = f.read(HASH_CHUNK)
+        while chunk:
+            digest.update(chunk)
+            chunk = f.read(HASH_CHUNK)
+    return digest.hexdigest()
+
+
+class FileRecord(object):
+    __slots__ = ("path", "size", "mtime", "hash", "rehashed")
+
+    def __init__(self, path, size, mtime, hash=None, rehashed=False):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.hash = hash
+        self.rehashed = rehashed
+
+    @property
+    def family(self):
+        return family_name_of(self.path)
+
+
+class Manifest(object):
+    def __init__(self, data=None):
+        data = data or {}
+        self.files = data.get("files", {})          # путь -> {size, mtime, hash}
+        self.documents = data.get("documents", {})  # ключ проекта -> {семейство: хэш}
+
+    @classmethod
+    def load(cls, path):
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return cls()
+        if data.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls(data)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files, "documents": self.documents},
+                      f, indent=1, sort_keys=True)
+
+    def known_hash(self, path, size, mtime):
+        """Хэш из манифеста, если размер и время файла не изменились, иначе None."""
+        entry = self.files.get(path)
+        if entry and entry.get("size") == size and entry.get("mtime") == mtime:
+            return entry.get("hash")
+        return None
+
+    def remember(self, record):
+        self.files[record.path] = {"size": record.size, "mtime": record.mtime, "hash": record.hash}
+
+    def loaded_hash(self, doc_key, family):
+        return self.documents.get(doc_key, {}).get(family)
+
+    def mark_loaded(self, doc_key, record):
+        self.documents.setdefault(doc_key, {})[record.family] = record.hash
+
+
+def load_status(record, manifest, doc_key, project_families):
+    """MISSING, NEW, CHANGED — загружать; UNCHANGED — в проекте та же версия."""
+    family = record.family
+    if family not in project_families:
+        return MISSING
+    if record.path not in manifest.files:
+        return NEW
+    if manifest.loaded_hash(doc_key, family) != record.hash:
+        return CHANGED
+    return UNCHANGED
+
+
+# --- Revit ---
+
+def document_key(doc):
+    return doc.PathName or doc.Title
+
+
+def project_family_names(doc):
+    return set(family.Name for family in DB.FilteredElementCollector(doc).OfClass(DB.Family))
+
+
+if DB is not None:
+    class OverwriteFamilyLoadOptions(DB.IFamilyLoadOptions):
+        """Изменённое семейство заменяет загруженное вместе со значениями параметров."""
+
+        def OnFamilyFound(self, familyInUse, overwriteParameterValues):
+            overwriteParameterValues.Value = True
+            return True
+
+        def OnSharedFamilyFound(self, sharedFamily, familyInUse, source, overwriteParameterValues):
+            source.Value = DB.FamilySource.Family
+            overwriteParameterValues.Value = True
+            return True
+
+
+def load_family(doc, path):
+    """doc.LoadFamily с заменой существующего семейства (внутри транзакции) -> bool."""
+    result = doc.LoadFamily(path, OverwriteFamilyLoadOptions())
+    # IronPython возвращает out-параметр вместе с результатом: (bool, Family)
+    if isinstance(result, tuple):
+        result = result[0]
+    return bool(result)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""Параллельный рекурсивный обход библиотеки семейств.
+
+Дерево папок обходится в отдельном потоке (os.scandir, если он есть; в
+IronPython 2.7 — os.listdir + os.stat), резервные копии отсекаются одним
+скомпилированным BACKUP_PATTERN из FamilyLibrary. Файлы с тем же размером
+и временем, что в манифесте, сразу идут в результат со старым хэшем;
+остальные хэшируются пулом потоков. Записи отдаются по мере готовности —
+загрузчик начинает работать, пока обход и хэширование ещё идут.
+
+Имя семейства — имя файла, и в проекте оно одно. Одноимённые файлы в разных
+папках не выдаются: остаётся первый по обходу (порядок обхода не зависит от
+потоков), остальные попадают в scanner.duplicates для отчёта. Так манифест,
+ключом которого служит имя семейства, не перезаписывается на каждом запуске:
+
+    scanner = LibraryScanner(root, manifest, workers=8)
+    try:
+        for record in scanner:
+            ...  # scanner.found / scanner.done — для прогресса
+    finally:
+        scanner.stop()  # отмена: генератор IronPython закрывается не сразу
+
+Бенчмарк на синтетическом дереве: cd lib && python -m Peer.FamilyScan
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    from Queue import Queue, Empty  # IronPython 2.7
+except ImportError:
+    from queue import Queue, Empty
+
+from Peer.FamilyLibrary import FileRecord, Manifest, family_name_of, file_hash, is_family_file
+
+WORKERS = 8
+_DONE = object()
+
+
+def walk_families(root):
+    """(путь, размер, время) всех семейств дерева в порядке обхода в глубину (без рекурсии)."""
+    scandir = getattr(os, "scandir", None)
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            if scandir is not None:
+                entries = [(e.name, e.path, e.is_dir(follow_symlinks=False), e) for e in scandir(folder)]
+            else:
+                entries = []
+                for name in os.listdir(folder):
+                    path = os.path.join(folder, name)
+                    entries.append((name, path, os.path.isdir(path), None))
+        except OSError:
+            continue
+        subfolders = []
+        for name, path, is_dir, entry in sorted(entries, key=lambda e: e[0]):
+            if is_dir:
+                subfolders.append(path)
+            elif is_family_file(name):
+                st = entry.stat() if entry is not None else os.stat(path)
+                yield path, st.st_size, int(st.st_mtime)
+        # Подпапки — по алфавиту: файлы папки раньше файлов её подпапок
+        stack.extend(reversed(subfolders))
+
+
+class LibraryScanner(object):
+    """Итератор FileRecord по дереву root; хэши считает пул из workers потоков."""
+
+    def __init__(self, root, manifest=None, workers=WORKERS, hasher=file_hash):
+        self.root = root
+        self.manifest = manifest if manifest is not None else Manifest()
+        self.workers = max(1, workers)
+        self.hasher = hasher
+        self.found = 0       # найдено файлов семейств (растёт, пока идёт обход)
+        self.done = 0        # отдано записей
+        self.hashed = 0      # из них с пересчитанным хэшем
+        self.errors = []     # [(путь, текст ошибки)] — не удалось прочитать файл
+        self.duplicates = []  # [(путь, путь выданного файла с тем же именем семейства)]
+        self._stopped = False
+        self._jobs = None
+
+    def stop(self):
+        """Останавливает обход и хэширование; ждать закрытия генератора не нужно.
+
+        Невзятые задания выбрасываются, потоки пула дочищают очередь без
+        хэширования и завершаются по _DONE от walker.
+        """
+        self._stopped = True
+        jobs = self._jobs
+        while jobs is not None:
+            try:
+                record = jobs.get_nowait()
+            except Empty:
+                return
+            if record is _DONE:
+                jobs.put(record)  # маркеры нужны пулу для выхода
+                return
+
+    def _walk(self, jobs, results):
+        owners = {}  # имя семейства -> первый путь по обходу
+        try:
+            for path, size, mtime in walk_families(self.root):
+                if self._stopped:
+                    break
+                family = family_name_of(path).lower()
+                if family in owners:
+                    self.duplicates.append((path, owners[family]))
+                    continue
+                owners[family] = path
+                self.found += 1
+                known = self.manifest.known_hash(path, size, mtime)
+                if known is not None:
+                    results.put(FileRecord(path, size, mtime, known))
+                else:
+                    jobs.put(FileRecord(path, size, mtime, rehashed=True))
+        finally:
+            for _ in range(self.workers):
+                jobs.put(_DONE)
+
+    def _hash(self, jobs, results):
+        while True:
+            record = jobs.get()
+            if record is _DONE:
+                results.put(_DONE)
+                return
+            if self._stopped:
+                continue
+            try:
+                record.hash = self.hasher(record.path)
+            except (IOError, OSError) as e:
+                self.errors.append((record.path, str(e)))
+            results.put(record)
+
+    def __iter__(self):
+        jobs = self._jobs = Queue(maxsize=self.workers * 4)
+        results = Queue()
+        self._stopped = False
+        threads = [threading.Thread(target=self._walk, args=(jobs, results))]
+        threads += [threading.Thread(target=self._hash, args=(jobs, results)) for _ in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        finished = 0
+        try:
+            # Записи с известным хэшем walker кладёт раньше, чем пул получит _DONE,
+            # поэтому после последнего _DONE пула очередь пуста
+            while finished < self.workers:
+                record = results.get()
+                if record is _DONE:
+                    finished += 1
+                    continue
+                self.done += 1
+                if record.rehashed:
+                    self.hashed += 1
+                yield record
+        finally:
+            # Потребитель вышел раньше (отмена) — walker останавливается, пул дочищает очередь
+            self.stop()
+
+
+# --- Бенчмарк на синтетическом дереве (тестов в репозитории нет — запуск как модуля) ---
+
+def make_tree(root, count=10000, per_folder=50, depth=3, size=2048):
+    """count файлов .rfa (и по резервной копии на каждые 10) в дереве папок глубины depth."""
+    payload = os.urandom(size)
+    for i in range(count):
+        parts = [str((i // per_folder) // (8 ** level) % 8) for level in range(depth)]
+        folder = os.path.join(root, *parts)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(os.path.join(folder, "Family_{}.rfa".format(i)), "wb") as f:
+            f.write(payload + str(i).encode("ascii"))
+        if i % 10 == 0:
+            with open(os.path.join(folder, "Family_{}.0001.rfa".format(i)), "wb") as f:
+                f.write(payload)
+
+
+def benchmark(count=10000, workers=WORKERS, latency=0.0005):
+    """Время полного обхода: последовательно, пулом, и повторно с манифестом.
+
+    latency — задержка на файл при хэшировании (эмуляция сетевого диска).
+    """
+    def hasher(path):
+        if latency:
+            time.sleep(latency)
+        return file_hash(path)
+
+    root = tempfile.mkdtemp(prefix="family_scan_")
+    try:
+        make_tree(root, count)
+        timings = []
+        for label, worker_count in (("sequential", 1), ("pool of {}".format(workers), workers)):
+            start = time.time()
+            records = list(LibraryScanner(root, Manifest(), worker_count, hasher))
+            timings.append((label, len(records), time.time() - start))
+        manifest = Manifest()
+        for record in records:
+            manifest.remember(record)
+        start = time.time()
+        rescanned = list(LibraryScanner(root, manifest, workers, hasher))
+        timings.append(("rescan with manifest", len(rescanned), time.time() - start))
+        return timings
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    for label, files, seconds in benchmark():
+        print("{:<22} {} files in {:.2f} s".format(label, files, seconds))
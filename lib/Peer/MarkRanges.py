@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""Естественная сортировка марок и сжатие подряд идущих номеров в диапазоны.
+
+Марка делится на префикс, последнее число и суффикс: "C12" -> ("C", 12, ""),
+"12a" -> ("", 12, "a"), "7" -> ("", 7, ""). Номера подряд (3 и более) внутри
+одной пары префикс/суффикс (без учёта регистра) и одной записи номера (с
+нулями или без) сжимаются в диапазон: C1, C2, C3 -> C1..C3, 01, 02, 03 -> 01..03.
+Марки без числа остаются одиночными. Одна сортировка + линейный проход —
+O(n log n).
+
+    compress_marks(["3", "1", "2", "C12", "C13", "C14", "12a"])
+    -> [1..3, 12a, C12..C14]
+    format_ranges(["1", "2", "3", "5"]) -> "1-3, 5"
+"""
+
+import random
+import re
+import time
+
+_DIGITS = re.compile(r"(\d+)")
+_LAST_NUMBER = re.compile(r"^(.*?)(\d+)(\D*)$")
+
+MIN_RUN = 3
+
+
+def natural_key(mark):
+    """Ключ естественной сортировки: "C2" < "C10", "12" < "12a" < "C1"."""
+    parts = _DIGITS.split(mark)
+    # split по группе даёт чередование: текст, число, текст, ... — типы на позициях совпадают
+    return tuple(int(p) if i % 2 else p.lower() for i, p in enumerate(parts))
+
+
+def split_mark(mark):
+    """(префикс, число или None, суффикс) по последней группе цифр."""
+    match = _LAST_NUMBER.match(mark)
+    if match is None:
+        return mark, None, ""
+    prefix, digits, suffix = match.groups()
+    return prefix, int(digits), suffix
+
+
+class MarkRange(object):
+    """Одиночная марка (first == last) или диапазон first..last из count марок."""
+
+    __slots__ = ("first", "last", "count")
+
+    def __init__(self, first, last=None, count=1):
+        self.first = first
+        self.last = last if last is not None else first
+        self.count = count
+
+    @property
+    def is_range(self):
+        return self.count > 1
+
+    def marks(self):
+        """Все марки диапазона."""
+        if not self.is_range:
+            return [self.first]
+        prefix, start, suffix = split_mark(self.first)
+        width = len(_LAST_NUMBER.match(self.first).group(2))
+        return [prefix + str(n).zfill(width) + suffix for n in range(start, start + self.count)]
+
+    def __repr__(self):
+        return "{}..{}".format(self.first, self.last) if self.is_range else self.first
+
+
+def _padded_width(digits):
+    """Ширина номера с ведущими нулями ("007" -> 3) или 0 для обычной записи."""
+    return len(digits) if len(digits) > 1 and digits.startswith("0") else 0
+
+
+def compress_marks(marks, min_run=MIN_RUN):
+    """[MarkRange] в естественном порядке; повторяющиеся марки учитываются один раз.
+
+    Группа — префикс и суффикс без учёта регистра (C1, c2, C3 -> C1..C3).
+    Внутри группы номера с нулями и без идут отдельными сериями: 1, 2, 3 и
+    01, 02, 03 — два диапазона. Номер без нулей той же ширины продолжает
+    серию с нулями: 08, 09, 10, 11 -> 08..11.
+    """
+    numbered = []
+    result = []
+    for mark in set(marks):
+        match = _LAST_NUMBER.match(mark)
+        if match is None:
+            result.append(MarkRange(mark))
+            continue
+        prefix, digits, suffix = match.groups()
+        numbered.append(((natural_key(prefix), suffix.lower()), int(digits), mark, digits))
+    numbered.sort(key=lambda e: (e[0], e[1], _padded_width(e[3]), e[2]))
+
+    def flush(run):
+        if len(run) >= min_run:
+            result.append(MarkRange(run[0][0], run[-1][0], len(run)))
+        else:
+            result.extend(MarkRange(mark) for mark, n in run)
+
+    group = None
+    lanes = {}  # ширина с нулями (0 — без нулей) -> текущая серия [(марка, число)]
+    for key, number, mark, digits in numbered:
+        if key != group:
+            for run in lanes.values():
+                flush(run)
+            group, lanes = key, {}
+        lane = _padded_width(digits)
+        if lane == 0:
+            padded = lanes.get(len(digits))
+            if padded and padded[-1][1] == number - 1:
+                lane = len(digits)
+        run = lanes.get(lane)
+        if run and run[-1][1] == number:
+            result.append(MarkRange(mark))  # тот же номер в другом регистре (C5 и c5) — серию не рвёт
+        elif run and run[-1][1] == number - 1:
+            run.append((mark, number))
+        else:
+            if run:
+                flush(run)
+            lanes[lane] = [(mark, number)]
+    for run in lanes.values():
+        flush(run)
+
+    # Группы в естественном порядке своих первых марок
+    result.sort(key=lambda r: (natural_key(r.first), r.first))
+    return result
+
+
+def format_ranges(marks, separator=", ", dash="-", min_run=MIN_RUN):
+    """Строка "1-3, 5, C12-C14" для подписи или спецификации."""
+    return separator.join(
+        r.first + dash + r.last if r.is_range else r.first for r in compress_marks(marks, min_run))
+
+
+def sort_marks(marks):
+    return sorted(marks, key=natural_key)
+
+
+# --- Проверка свойств и бенчмарк (тестов в репозитории нет — запуск как модуля) ---
+
+def check_properties(marks, min_run=MIN_RUN):
+    """Список нарушенных свойств compress_marks() на наборе марок (пусто — всё верно)."""
+    problems = []
+    ranges = compress_marks(marks, min_run)
+    # Диапазон разворачивается в регистре первой марки: C1..C3 из C1, c2, C3
+    expanded = [m.lower() for r in ranges for m in r.marks()]
+    if sorted(expanded) != sorted(m.lower() for m in set(marks)):
+        problems.append("expanded ranges differ from the unique marks")
+    firsts = [natural_key(r.first) for r in ranges]
+    if firsts != sorted(firsts):
+        problems.append("ranges are not in natural order")
+    for r in ranges:
+        if r.is_range and r.count < min_run:
+            problems.append("range {} shorter than {}".format(r, min_run))
+    # Никакие min_run одиночных марок одной группы не должны идти подряд
+    singles = {}
+    for r in ranges:
+        match = _LAST_NUMBER.match(r.first)
+        if not r.is_range and match is not None:
+            prefix, digits, suffix = match.groups()
+            singles.setdefault((prefix.lower(), suffix.lower(), _padded_width(digits)), set()).add(int(digits))
+    for numbers in singles.values():
+        for n in numbers:
+            if all(n + k in numbers for k in range(min_run)):
+                problems.append("uncompressed run starting at {}".format(n))
+                break
+    return problems
+
+
+def random_marks(count, seed=0):
+    """Марки с префиксами и суффиксами в разном регистре, номерами с нулями и без."""
+    rnd = random.Random(seed)
+    prefixes = ["", "", "", "C", "c", "K", "B-"]
+    suffixes = ["", "", "", "a", "A", "b"]
+    marks = []
+    for _ in range(count):
+        number = str(rnd.randint(1, count // 3 + 10))
+        if rnd.random() < 0.2:
+            number = number.zfill(3)
+        mark = rnd.choice(prefixes) + number + rnd.choice(suffixes)
+        marks.append(mark if rnd.random() > 0.01 else "N/A")
+    return marks
+
+
+def benchmark(count=100000, seed=0):
+    marks = random_marks(count, seed)
+    start = time.time()
+    ranges = compress_marks(marks)
+    return count, len(ranges), time.time() - start
+
+
+# Записи с нулями и регистр префикса: (марки, ожидаемая строка format_ranges)
+EXAMPLES = [
+    (["1", "2", "3", "01", "02", "03"], "01-03, 1-3"),
+    (["C1", "c2", "C3"], "C1-C3"),
+    (["08", "09", "10", "11"], "08-11"),
+    (["C5", "c5", "C6", "C7"], "C5-C7, c5"),
+]
+
+
+if __name__ == "__main__":
+    for marks, expected in EXAMPLES:
+        text = format_ranges(marks)
+        if text != expected or check_properties(marks):
+            print("{}: {!r}, expected {!r}".format(marks, text, expected))
+    failures = 0
+    for seed in range(300):
+        marks = random_marks(random.Random(seed).randint(0, 200), seed)
+        problems = check_properties(marks)
+        if problems:
+            failures += 1
+            print("seed {}: {}".format(seed, "; ".join(problems)))
+    print("property checks: {} of 300 failed".format(failures))
+    count, range_count, elapsed = benchmark()
+    print("{} marks -> {} entries in {:.3f} s".format(count, range_count, elapsed))
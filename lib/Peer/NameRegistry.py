@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Реестр занятых имён видов и номеров листов.
+
+Имена загружаются из документа один раз; reserve() возвращает свободное имя
+и сразу занимает его — без попыток "view.Name = ...; except: ..." и без
+повторного сбора видов в каждом инструменте. Для каждого базового имени
+запоминается следующий номер суффикса, поэтому серия резервирований одного
+имени не перебирает суффиксы заново.
+
+    names = NameRegistry.from_document(doc)
+    view.Name = names.reserve(view_kind(view.ViewType), "Column 150")   # "Column 150 (2)", если занято
+    names.reserve(view_kind(view.ViewType), "EF New View", STAR_SUFFIX)  # "EF New View*"
+
+Revit требует уникальности имени вида только внутри его ViewType (план
+этажа и чертёжный вид могут называться одинаково), поэтому у каждого
+ViewType своё пространство имён — view_kind(). Иначе имя, занятое видом
+другого типа, переименовало бы новый вид, и поиск по исходному имени при
+следующем запуске его бы не нашёл. Сравнение без учёта регистра.
+"""
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+VIEW = "view"
+SHEET_NUMBER = "sheet_number"
+SHEET_NAME = "sheet_name"
+
+# ViewFamily типа вида -> ViewType созданного по нему вида (для проверки имени до создания)
+VIEW_TYPE_OF_FAMILY = {
+    "FloorPlan": "FloorPlan",
+    "CeilingPlan": "CeilingPlan",
+    "StructuralPlan": "EngineeringPlan",
+    "AreaPlan": "AreaPlan",
+    "Drafting": "DraftingView",
+    "Section": "Section",
+    "Detail": "Detail",
+    "Elevation": "Elevation",
+    "ThreeDimensional": "ThreeD",
+    "Legend": "Legend",
+    "Schedule": "Schedule",
+}
+
+
+def view_kind(view_type):
+    """Пространство имён видов одного ViewType (значение enum или его имя)."""
+    return (VIEW, str(view_type))
+
+
+def family_view_kind(view_family):
+    """Пространство имён видов, создаваемых по типу вида семейства view_family (ViewFamily)."""
+    family = str(view_family)
+    return view_kind(VIEW_TYPE_OF_FAMILY.get(family, family))
+
+
+class SuffixStrategy(object):
+    """Кандидаты имени: pattern.format(name=..., n=...) для n = start, start + 1, ..."""
+
+    def __init__(self, pattern, start=2):
+        self.pattern = pattern
+        self.start = start
+
+    def candidate(self, name, n):
+        return self.pattern.format(name=name, n=n)
+
+
+class RepeatSuffix(SuffixStrategy):
+    """name*, name**, ... — как в примере ViewsSheets."""
+
+    def __init__(self, char):
+        SuffixStrategy.__init__(self, None, 1)
+        self.char = char
+
+    def candidate(self, name, n):
+        return name + self.char * n
+
+
+COUNTER_SUFFIX = SuffixStrategy(u"{name} ({n})")
+DASH_SUFFIX = SuffixStrategy(u"{name}-{n}")
+STAR_SUFFIX = RepeatSuffix(u"*")
+
+
+def _normalize(name):
+    return name.strip().lower()
+
+
+class NameRegistry(object):
+    def __init__(self, names=None):
+        self._taken = {}       # вид имени -> set(нормализованных имён)
+        self._next = {}        # (вид имени, нормализованное базовое имя, id стратегии) -> следующий n
+        for kind, values in (names or {}).items():
+            for name in values:
+                self.add(kind, name)
+
+    @classmethod
+    def from_views(cls, views):
+        """Реестр по видам и листам (например, корзинам VIEW + VIEW_SHEET из collect_buckets)."""
+        registry = cls()
+        for view in views:
+            if isinstance(view, DB.ViewSheet):
+                registry.add(SHEET_NUMBER, view.SheetNumber)
+                registry.add(SHEET_NAME, view.Name)
+            else:
+                registry.add(view_kind(view.ViewType), view.Name)
+        return registry
+
+    @classmethod
+    def from_document(cls, doc):
+        """Все виды (с шаблонами и спецификациями) и листы документа — один сбор."""
+        return cls.from_views(DB.FilteredElementCollector(doc).OfClass(DB.View))
+
+    def add(self, kind, name):
+        """Отмечает имя занятым (существующий или только что созданный элемент)."""
+        if name:
+            self._taken.setdefault(kind, set()).add(_normalize(name))
+
+    def release(self, kind, name):
+        """Освобождает имя (элемент удалён или переименован)."""
+        self._taken.get(kind, set()).discard(_normalize(name))
+
+    def is_taken(self, kind, name):
+        return _normalize(name) in self._taken.get(kind, ())
+
+    def names(self, kind):
+        return set(self._taken.get(kind, ()))
+
+    def reserve(self, kind, name, strategy=COUNTER_SUFFIX):
+        """Свободное имя: name, если оно не занято, иначе первый свободный кандидат strategy."""
+        if not self.is_taken(kind, name):
+            self.add(kind, name)
+            return name
+        key = (kind, _normalize(name), id(strategy))
+        n = self._next.get(key, strategy.start)
+        candidate = strategy.candidate(name, n)
+        while self.is_taken(kind, candidate):
+            n += 1
+            candidate = strategy.candidate(name, n)
+        self._next[key] = n + 1
+        self.add(kind, candidate)
+        return candidate
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""2D-упаковка прямоугольников в полосу фиксированной ширины (чистый Python).
+
+Стратегии:
+    - "shelf"      — полки (First-Fit Decreasing Height): высота полки = самый
+                     высокий элемент на ней, элемент идёт на первую полку, где хватает места;
+    - "skyline"    — "линия горизонта", bottom-left: элемент ставится туда, где его
+                     верх окажется ниже всего;
+    - "guillotine" — свободные прямоугольники с гильотинным разрезом по короткой оси.
+
+Система координат: x вправо, y ВНИЗ от верхнего левого угла полосы. Высота
+полосы не ограничена; результат — PackResult с размещениями и габаритом.
+
+    result = pack_best([(w, h, payload), ...], sheet_width)
+"""
+
+import random
+import time
+
+SHELF = "shelf"
+SKYLINE = "skyline"
+GUILLOTINE = "guillotine"
+STRATEGIES = (SHELF, SKYLINE, GUILLOTINE)
+
+
+class Placement(object):
+    __slots__ = ("x", "y", "width", "height", "payload")
+
+    def __init__(self, x, y, width, height, payload=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.payload = payload
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    def overlaps(self, other, eps=1e-9):
+        return (self.x < other.right - eps and other.x < self.right - eps and
+                self.y < other.bottom - eps and other.y < self.bottom - eps)
+
+
+class PackResult(object):
+    def __init__(self, strategy, placements):
+        self.strategy = strategy
+        self.placements = placements
+        self.width = max([p.right for p in placements] or [0])
+        self.height = max([p.bottom for p in placements] or [0])
+
+    @property
+    def area(self):
+        """Площадь габаритного прямоугольника раскладки."""
+        return self.width * self.height
+
+    @property
+    def utilization(self):
+        """Доля габарита, занятая элементами (0..1)."""
+        if not self.area:
+            return 0.0
+        return sum(p.width * p.height for p in self.placements) / float(self.area)
+
+
+def _normalize(items):
+    result = []
+    for item in items:
+        if isinstance(item, Placement):
+            result.append((item.width, item.height, item.payload))
+        else:
+            width, height = item[0], item[1]
+            result.append((width, height, item[2] if len(item) > 2 else None))
+    return result
+
+
+def _sorted_items(items):
+    # Сначала высокие, при равной высоте — широкие (полки и гильотина)
+    return sorted(items, key=lambda it: (-it[1], -it[0]))
+
+
+def _sorted_by_width(items):
+    # Для skyline заметно плотнее: сначала широкие, при равной ширине — высокие
+    return sorted(items, key=lambda it: (-it[0], -it[1]))
+
+
+# --- Shelf ---
+
+def pack_shelf(items, sheet_width):
+    shelves = []  # [y, высота, занятая ширина]
+    placements = []
+    total_height = 0
+    for width, height, payload in _sorted_items(items):
+        for shelf in shelves:
+            if shelf[2] + width <= sheet_width and height <= shelf[1]:
+                placements.append(Placement(shelf[2], shelf[0], width, height, payload))
+                shelf[2] += width
+                break
+        else:
+            shelves.append([total_height, height, width])
+            placements.append(Placement(0, total_height, width, height, payload))
+            total_height += height
+    return PackResult(SHELF, placements)
+
+
+# --- Skyline ---
+
+def _skyline_fit(skyline, index, width, sheet_width):
+    """y, на котором элемент шириной width встанет начиная с сегмента index (или None)."""
+    x = skyline[index][0]
+    if x + width > sheet_width:
+        return None
+    remaining = width
+    y = 0
+    i = index
+    while remaining > 0:
+        if i >= len(skyline):
+            return None
+        y = max(y, skyline[i][1])
+        remaining -= skyline[i][2]
+        i += 1
+    return y
+
+
+def _skyline_add(skyline, index, x, y, width):
+    skyline.insert(index, [x, y, width])
+    i = index + 1
+    while i < len(skyline):
+        seg = skyline[i]
+        prev_end = skyline[i - 1][0] + skyline[i - 1][2]
+        if seg[0] >= prev_end:
+            break
+        shrink = prev_end - seg[0]
+        seg[0] += shrink
+        seg[2] -= shrink
+        if seg[2] <= 0:
+            del skyline[i]
+        else:
+            break
+    # Склеиваем соседние сегменты одной высоты
+    i = 0
+    while i < len(skyline) - 1:
+        if skyline[i][1] == skyline[i + 1][1]:
+            skyline[i][2] += skyline[i + 1][2]
+            del skyline[i + 1]
+        else:
+            i += 1
+
+
+def pack_skyline(items, sheet_width):
+    skyline = [[0, 0, sheet_width]]  # сегменты [x, y, ширина]
+    placements = []
+    for width, height, payload in _sorted_by_width(items):
+        best = None  # (низ элемента, x, индекс, y)
+        for i in range(len(skyline)):
+            y = _skyline_fit(skyline, i, width, sheet_width)
+            if y is None:
+                continue
+            candidate = (y + height, skyline[i][0], i, y)
+            if best is None or candidate < best:
+                best = candidate
+        _, x, index, y = best
+        _skyline_add(skyline, index, x, y + height, width)
+        placements.append(Placement(x, y, width, height, payload))
+    return PackResult(SKYLINE, placements)
+
+
+# --- Guillotine ---
+
+def pack_guillotine(items, sheet_width):
+    infinity = float("inf")
+    free = [(0, 0, sheet_width, infinity)]  # свободные прямоугольники (x, y, w, h)
+    placements = []
+    for width, height, payload in _sorted_items(items):
+        best = None  # (y, короткий остаток, x, индекс)
+        for i, (fx, fy, fw, fh) in enumerate(free):
+            if width <= fw and height <= fh:
+                candidate = (fy, min(fw - width, fh - height), fx, i)
+                if best is None or candidate < best:
+                    best = candidate
+        fx, fy, fw, fh = free.pop(best[3])
+        placements.append(Placement(fx, fy, width, height, payload))
+
+        # Разрез по короткой оси: остаток справа и остаток снизу
+        right_w = fw - width
+        bottom_h = fh - height
+        if right_w < bottom_h:
+            right = (fx + width, fy, right_w, height)
+            below = (fx, fy + height, fw, bottom_h)
+        else:
+            right = (fx + width, fy, right_w, fh)
+            below = (fx, fy + height, width, bottom_h)
+        for rect in (right, below):
+            if rect[2] > 0 and rect[3] > 0:
+                free.append(rect)
+    return PackResult(GUILLOTINE, placements)
+
+
+_PACKERS = {SHELF: pack_shelf, SKYLINE: pack_skyline, GUILLOTINE: pack_guillotine}
+
+
+def pack(items, sheet_width, strategy=SKYLINE):
+    """Упаковка items ((ширина, высота[, payload]) или Placement) выбранной стратегией."""
+    items = _normalize(items)
+    if not items:
+        return PackResult(strategy, [])
+    # Элемент шире полосы всё равно должен встать — расширяем полосу под него
+    sheet_width = max(sheet_width, max(it[0] for it in items))
+    return _PACKERS[strategy](items, sheet_width)
+
+
+def pack_best(items, sheet_width, strategies=STRATEGIES):
+    """Пробует стратегии и возвращает раскладку с минимальной площадью габарита."""
+    results = [pack(items, sheet_width, s) for s in strategies]
+    return min(results, key=lambda r: (r.area, r.height))
+
+
+def check_no_overlaps(result):
+    """True, если никакие два размещения не пересекаются (заметание по x)."""
+    placements = sorted(result.placements, key=lambda p: p.x)
+    active = []
+    for p in placements:
+        active = [a for a in active if a.right > p.x]
+        for a in active:
+            if a.overlaps(p):
+                return False
+        active.append(p)
+    return True
+
+
+# --- Бенчмарк ---
+
+def random_items(count, seed=0, min_size=2.0, max_size=12.0):
+    rnd = random.Random(seed)
+    return [(rnd.uniform(min_size, max_size), rnd.uniform(min_size, max_size), i) for i in range(count)]
+
+
+def benchmark(counts=(1000, 5000, 10000), sheet_width=75.0, strategies=STRATEGIES, seed=0):
+    """[(стратегия, n, секунды, высота, заполнение)] на случайных прямоугольниках."""
+    rows = []
+    for count in counts:
+        items = random_items(count, seed)
+        for strategy in strategies:
+            start = time.time()
+            result = pack(items, sheet_width, strategy)
+            elapsed = time.time() - start
+            rows.append((strategy, count, elapsed, result.height, result.utilization))
+    return rows
+
+
+if __name__ == "__main__":
+    print("{:<11} {:>6} {:>9} {:>10} {:>7}".format("strategy", "n", "sec", "height", "fill"))
+    for strategy, count, elapsed, height, fill in benchmark():
+        print("{:<11} {:>6} {:>9.3f} {:>10.1f} {:>6.1%}".format(strategy, count, elapsed, height, fill))
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Копирование значений параметров между элементами по сырым значениям.
+
+Значения не проходят через AsValueString() и разбор строки: double копируется
+как double во внутренних единицах, int как int, строка как строка. Если
+StorageType источника и цели различаются, конвертер выбирается один раз на
+пару параметров по типу данных double-стороны: для параметров длины —
+LENGTH_CONVERTERS (в миллиметрах, как их хранили аннотации арматуры), для
+остальных (номер, количество, коэффициент) — NUMBER_CONVERTERS без пересчёта
+единиц. Значения источников и целей читаются пакетно read_parameters(),
+записываются только отличающиеся.
+
+    copier = ParamCopier(["Rebar_Number", "Rebar_Diameter", ("Rebar_Length", "Length")])
+    result = copier.copy(doc, [(source, target), ...])   # внутри транзакции
+"""
+
+from Peer.ParamTable import read_parameters, basestring_types, DOUBLE, INTEGER, STRING
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+MM_PER_FT = 304.8
+DOUBLE_TOLERANCE = 1e-9
+
+
+def _number(text):
+    cleaned = "".join(c for c in text if c.isdigit() or c in ".,-").replace(",", ".")
+    try:
+        return float(cleaned) if cleaned else None
+    except ValueError:
+        return None
+
+
+def _text_to_double(text):
+    number = _number(text)
+    return number / MM_PER_FT if number is not None else None
+
+
+def _text_to_int(text):
+    number = _number(text)
+    return int(round(number)) if number is not None else None
+
+
+def _same(value):
+    return value
+
+
+# (StorageType источника, StorageType цели) -> конвертер; None на выходе — перевести нельзя.
+# Double — длина во внутренних единицах (футы), снаружи — миллиметры
+LENGTH_CONVERTERS = {
+    (DOUBLE, INTEGER): lambda v: int(round(v * MM_PER_FT)),
+    (DOUBLE, STRING): lambda v: u"{:g}".format(round(v * MM_PER_FT, 3)),
+    (INTEGER, DOUBLE): lambda v: v / MM_PER_FT,
+    (INTEGER, STRING): lambda v: str(v),
+    (STRING, DOUBLE): _text_to_double,
+    (STRING, INTEGER): _text_to_int,
+}
+
+# Double без единиц длины: число без пересчёта, в целое — округлением (11.999999 -> 12)
+NUMBER_CONVERTERS = {
+    (DOUBLE, INTEGER): lambda v: int(round(v)),
+    (DOUBLE, STRING): lambda v: u"{:g}".format(v),
+    (INTEGER, DOUBLE): float,
+    (INTEGER, STRING): lambda v: str(v),
+    (STRING, DOUBLE): _number,
+    (STRING, INTEGER): _text_to_int,
+}
+
+
+def converter(source_storage, target_storage, length=False):
+    """Функция перевода значения или None, если пары нет в таблице.
+
+    length — double-сторона пары является параметром длины (см. is_length).
+    """
+    if source_storage == target_storage:
+        return _same
+    table = LENGTH_CONVERTERS if length else NUMBER_CONVERTERS
+    return table.get((source_storage, target_storage))
+
+
+def is_length(param):
+    """Тип данных параметра — длина (Revit 2022+: SpecTypeId, раньше — ParameterType)."""
+    if param is None or DB is None:
+        return False
+    definition = param.Definition
+    if hasattr(definition, "GetDataType"):
+        return definition.GetDataType() == DB.SpecTypeId.Length
+    return definition.ParameterType == DB.ParameterType.Length
+
+
+def _first_parameter(table, key):
+    for i in range(len(table)):
+        param = table.parameter(key, i)
+        if param is not None:
+            return param
+    return None
+
+
+def storage_of(value):
+    """StorageType для значения Python (для записи констант через те же конвертеры)."""
+    if isinstance(value, float):
+        return DOUBLE
+    if isinstance(value, bool) or not isinstance(value, (int, basestring_types)):
+        return None
+    return INTEGER if isinstance(value, int) else STRING
+
+
+def same_value(a, b, storage):
+    if storage == DOUBLE and a is not None and b is not None:
+        return abs(a - b) < DOUBLE_TOLERANCE
+    return a == b
+
+
+class CopyResult(object):
+    def __init__(self, count):
+        self.written = [0] * count   # записано значений на пару элементов
+        self.unchanged = 0           # значений, которые уже совпадали
+        self.skipped = 0             # нет значения, параметра или конвертера
+        self.failed = []             # [(индекс пары, параметр цели, текст ошибки)]
+
+    @property
+    def total_written(self):
+        return sum(self.written)
+
+
+class ParamCopier(object):
+    """Копирует пары параметров (имя или (источник, цель)) с источников на цели."""
+
+    def __init__(self, pairs):
+        self.pairs = [(p, p) if isinstance(p, basestring_types) else tuple(p) for p in pairs]
+
+    def copy(self, doc, element_pairs):
+        """Копирует значения для [(источник, цель)] (внутри транзакции) -> CopyResult."""
+        element_pairs = list(element_pairs)
+        result = CopyResult(len(element_pairs))
+        if not element_pairs:
+            return result
+        sources = read_parameters(doc, [s for s, _ in element_pairs], [s for s, _ in self.pairs])
+        targets = read_parameters(doc, [t for _, t in element_pairs], [t for _, t in self.pairs])
+
+        for source_name, target_name in self.pairs:
+            source_storage, target_storage = sources.storage(source_name), targets.storage(target_name)
+            length = False
+            if source_storage != target_storage:
+                if source_storage == DOUBLE:
+                    length = is_length(_first_parameter(sources, source_name))
+                elif target_storage == DOUBLE:
+                    length = is_length(_first_parameter(targets, target_name))
+            convert = converter(source_storage, target_storage, length)
+            source_values, source_mask = sources.values(source_name), sources.mask(source_name)
+            target_values, target_mask = targets.values(target_name), targets.mask(target_name)
+            for i in range(len(element_pairs)):
+                if convert is None or not source_mask[i]:
+                    result.skipped += 1
+                    continue
+                value = convert(source_values[i])
+                if value is None:
+                    result.skipped += 1
+                    continue
+                if target_mask[i] and same_value(target_values[i], value, target_storage):
+                    result.unchanged += 1
+                    continue
+                if self._write(targets.parameter(target_name, i), value, result, i, target_name):
+                    result.written[i] += 1
+        return result
+
+    @staticmethod
+    def _write(param, value, result, i, target_name):
+        if param is None or param.IsReadOnly:
+            result.skipped += 1
+            return False
+        try:
+            param.Set(value)
+            return True
+        except Exception as e:
+            result.failed.append((i, target_name, str(e)))
+            return False
+
+
+def set_value(param, value):
+    """Записывает значение Python в параметр с переводом по StorageType; False — нельзя."""
+    if param is None or param.IsReadOnly:
+        return False
+    target_storage = str(param.StorageType)
+    convert = converter(storage_of(value), target_storage, target_storage == DOUBLE and is_length(param))
+    value = convert(value) if convert is not None else None
+    if value is None:
+        return False
+    param.Set(value)
+    return True
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Пакетное чтение параметров: набор элементов -> таблица столбцов.
+
+LookupParameter("Имя") на каждый элемент и каждый параметр — это поиск по
+строке в наборе параметров элемента. Здесь определение параметра ищется один
+раз на (категория, тип), дальше значения читаются через get_Parameter по
+BuiltInParameter / GUID / Definition. Результат — ParamTable: по списку
+значений на параметр плюс маска HasValue.
+
+    table = read_parameters(doc, columns, ["PR_Level", "Mark", ParamSpec("B", from_type=True)])
+    levels = table.values("PR_Level")
+"""
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+# Имена StorageType (str(param.StorageType) в IronPython даёт имя члена enum)
+DOUBLE = "Double"
+INTEGER = "Integer"
+STRING = "String"
+ELEMENT_ID = "ElementId"
+
+try:
+    basestring_types = (basestring,)  # IronPython 2.7
+except NameError:
+    basestring_types = (str,)
+
+
+class ParamSpec(object):
+    """Что читать: имя или GUID параметра; from_type=True — параметр типа."""
+
+    def __init__(self, name_or_guid, from_type=False, key=None):
+        self.ref = name_or_guid
+        self.from_type = from_type
+        self.key = key if key is not None else str(name_or_guid)
+        self.is_guid = not _is_name(name_or_guid)
+
+
+def _is_name(ref):
+    if not isinstance(ref, basestring_types):
+        return False  # System.Guid
+    return not _looks_like_guid(ref)
+
+
+def _looks_like_guid(text):
+    parts = text.split("-")
+    if [len(p) for p in parts] != [8, 4, 4, 4, 12]:
+        return False
+    try:
+        int("".join(parts), 16)
+        return True
+    except ValueError:
+        return False
+
+
+def _as_spec(spec):
+    return spec if isinstance(spec, ParamSpec) else ParamSpec(spec)
+
+
+def _to_guid(ref):
+    if isinstance(ref, basestring_types):
+        from System import Guid
+        return Guid(ref)
+    return ref
+
+
+def read_value(param):
+    """(значение, HasValue, имя StorageType) из параметра Revit без строковых преобразований."""
+    storage = str(param.StorageType)
+    if storage == DOUBLE:
+        value = param.AsDouble()
+    elif storage == INTEGER:
+        value = param.AsInteger()
+    elif storage == STRING:
+        value = param.AsString()
+    elif storage == ELEMENT_ID:
+        value = param.AsElementId()
+    else:
+        value = None
+    return value, bool(param.HasValue), storage
+
+
+def _element_key(elem):
+    """Ключ кэша определений: (категория, тип)."""
+    category = elem.Category
+    category_id = category.Id.IntegerValue if category is not None else None
+    try:
+        type_id = elem.GetTypeId().IntegerValue
+    except Exception:
+        type_id = None
+    return category_id, type_id
+
+
+class ParamResolver(object):
+    """Находит параметр по спецификации, запоминая способ доступа на (категория, тип)."""
+
+    def __init__(self, spec):
+        self.spec = _as_spec(spec)
+        self._handles = {}  # ключ элемента -> способ доступа (или None, если параметра нет)
+
+    def find(self, elem):
+        return self.get(elem, _element_key(elem))
+
+    def get(self, elem, cache_key):
+        if self.spec.is_guid:
+            return elem.get_Parameter(_to_guid(self.spec.ref))
+
+        if cache_key in self._handles:
+            handle = self._handles[cache_key]
+            return elem.get_Parameter(handle) if handle is not None else None
+
+        param = elem.LookupParameter(self.spec.ref)
+        self._handles[cache_key] = _handle_of(param) if param is not None else None
+        return param
+
+
+def _handle_of(param):
+    """Самый быстрый ключ для get_Parameter: BuiltInParameter, GUID или Definition."""
+    definition = param.Definition
+    if DB is not None:
+        bip = getattr(definition, "BuiltInParameter", DB.BuiltInParameter.INVALID)
+        if bip != DB.BuiltInParameter.INVALID:
+            return bip
+    if getattr(param, "IsShared", False):
+        return param.GUID
+    return definition
+
+
+class ParamColumn(object):
+    """Столбец значений одного параметра."""
+
+    def __init__(self, size):
+        self.values = [None] * size
+        self.has_value = [False] * size
+        self.storage = None
+
+
+class ParamTable(object):
+    """Struct-of-arrays: elements[i] <-> columns[key].values[i]."""
+
+    def __init__(self, elements, keys, doc=None):
+        self.elements = elements
+        self.columns = dict((key, ParamColumn(len(elements))) for key in keys)
+        self.doc = doc
+        self._resolvers = {}
+
+    def __len__(self):
+        return len(self.elements)
+
+    def values(self, key):
+        return self.columns[key].values
+
+    def mask(self, key):
+        return self.columns[key].has_value
+
+    def storage(self, key):
+        return self.columns[key].storage
+
+    def get(self, key, i, default=None):
+        column = self.columns[key]
+        return column.values[i] if column.has_value[i] else default
+
+    def parameter(self, key, i):
+        """Сам параметр элемента i (для записи) через уже найденное определение.
+
+        Для ParamSpec(from_type=True) — параметр типа элемента i (запись меняет
+        все экземпляры этого типа); None, если параметра или типа нет.
+        """
+        resolver = self._resolvers[key]
+        elem = self.elements[i]
+        if resolver.spec.from_type:
+            elem = self.doc.GetElement(elem.GetTypeId())
+            if elem is None:
+                return None
+        return resolver.find(elem)
+
+
+def read_parameters(doc, elements, specs):
+    """Читает параметры specs (имена, GUID или ParamSpec) со всех elements за один проход."""
+    elements = list(elements)
+    specs = [_as_spec(s) for s in specs]
+    table = ParamTable(elements, [s.key for s in specs], doc)
+
+    instance_specs = [(s, ParamResolver(s), table.columns[s.key]) for s in specs if not s.from_type]
+    type_specs = [(s, ParamResolver(s), table.columns[s.key]) for s in specs if s.from_type]
+    for spec, resolver, column in instance_specs + type_specs:
+        table._resolvers[spec.key] = resolver
+    type_values = {}  # TypeId -> [(значение, HasValue, StorageType) по type_specs]
+
+    for i, elem in enumerate(elements):
+        cache_key = _element_key(elem)
+
+        for spec, resolver, column in instance_specs:
+            param = resolver.get(elem, cache_key)
+            if param is not None:
+                column.values[i], column.has_value[i], column.storage = read_value(param)
+
+        if type_specs:
+            type_id = cache_key[1]
+            cached = type_values.get(type_id)
+            if cached is None:
+                cached = type_values[type_id] = _read_type(doc, elem, type_specs)
+            for (spec, resolver, column), (value, has_value, storage) in zip(type_specs, cached):
+                column.values[i], column.has_value[i] = value, has_value
+                if storage is not None:
+                    column.storage = storage
+
+    return table
+
+
+def _read_type(doc, elem, type_specs):
+    elem_type = doc.GetElement(elem.GetTypeId())
+    result = []
+    for spec, resolver, column in type_specs:
+        param = resolver.get(elem_type, _element_key(elem_type)) if elem_type is not None else None
+        result.append(read_value(param) if param is not None else (None, False, None))
+    return result
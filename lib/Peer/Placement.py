@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Пакетное размещение экземпляров семейств на виде.
+
+doc.Create.NewFamilyInstance на каждый экземпляр и LookupParameter(...).Set
+на каждый параметр — сотни отдельных вызовов API. PlacementPlanner сначала
+собирает заявки (типоразмер, точка, значения параметров, роль), затем:
+    1. на каждую пару (роль, типоразмер) — один NewFamilyInstances2 со списком
+       FamilyInstanceCreationData;
+    2. вторым проходом пишет параметры, находя определение один раз на
+       (категория, тип) через ParamResolver.
+Время создания и записи параметров считается по ролям (колонна, марка, хомут).
+
+    planner = PlacementPlanner(doc, view)
+    request = planner.add(symbol, point, {"B": width, "H": height}, role="column")
+    planner.execute()
+    request.instance  # созданный FamilyInstance
+"""
+
+import time
+
+from Peer.ParamTable import ParamResolver, basestring_types
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+class PlacementRequest(object):
+    """Заявка на один экземпляр; instance заполняется в execute()."""
+
+    def __init__(self, symbol, point, params=None, role=None):
+        self.symbol = symbol
+        self.point = point
+        self.params = params or {}
+        self.role = role
+        self.instance = None
+
+
+class RoleStats(object):
+    def __init__(self, role):
+        self.role = role
+        self.count = 0
+        self.batches = 0
+        self.create_seconds = 0.0
+        self.param_seconds = 0.0
+
+
+class PlacementPlanner(object):
+    def __init__(self, doc, view):
+        self.doc = doc
+        self.view = view
+        self.requests = []
+        self.stats = {}      # роль -> RoleStats
+        self.errors = []     # (роль, параметр, текст ошибки)
+        self.bulk = True     # False, если пришлось создавать по одному
+        self._resolvers = {}
+
+    def add(self, symbol, point, params=None, role=None):
+        request = PlacementRequest(symbol, point, params, role)
+        self.requests.append(request)
+        return request
+
+    def __len__(self):
+        return len(self.requests)
+
+    def execute(self):
+        """Создаёт все заявки и пишет параметры; возвращает созданные экземпляры."""
+        batches = {}  # (роль, id типоразмера) -> [заявки]
+        order = []
+        for request in self.requests:
+            key = (request.role, request.symbol.Id.IntegerValue)
+            if key not in batches:
+                batches[key] = []
+                order.append(key)
+            batches[key].append(request)
+
+        for key in order:
+            stats = self._stats(key[0])
+            start = time.time()
+            self._create(batches[key])
+            stats.create_seconds += time.time() - start
+            stats.batches += 1
+            stats.count += len(batches[key])
+
+        for request in self.requests:
+            if request.instance is None or not request.params:
+                continue
+            start = time.time()
+            self._set_params(request)
+            self._stats(request.role).param_seconds += time.time() - start
+
+        created = [r.instance for r in self.requests if r.instance is not None]
+        self.requests = []
+        return created
+
+    def _stats(self, role):
+        stats = self.stats.get(role)
+        if stats is None:
+            stats = self.stats[role] = RoleStats(role)
+        return stats
+
+    # --- Создание ---
+
+    def _create(self, requests):
+        ids = None
+        if self.bulk:
+            try:
+                ids = self._create_bulk(requests)
+            except Exception:
+                # Нет view-specific FamilyInstanceCreationData в этой версии API
+                self.bulk = False
+        if ids is not None:
+            orphans = self._match(requests, ids)
+            if orphans:
+                # Экземпляр, который не удалось сопоставить с заявкой, не оставляем в модели:
+                # удаляем, а заявку создаём по одному ниже
+                self._delete(orphans)
+                self.errors.append((requests[0].role, "placement",
+                                    "{} unmatched instances deleted and recreated".format(len(orphans))))
+        for request in requests:
+            if request.instance is None:
+                request.instance = self.doc.Create.NewFamilyInstance(request.point, request.symbol, self.view)
+
+    def _create_bulk(self, requests):
+        from System.Collections.Generic import List
+        data = List[DB.Creation.FamilyInstanceCreationData]()
+        for request in requests:
+            data.Add(DB.Creation.FamilyInstanceCreationData(request.point, request.symbol, self.view))
+        return self.doc.Create.NewFamilyInstances2(data)
+
+    def _match(self, requests, ids):
+        """Связывает созданные экземпляры с заявками по точке вставки -> id несопоставленных."""
+        # Порядок возвращаемых id не гарантирован
+        waiting = {}
+        for request in requests:
+            waiting.setdefault(_point_key(request.point), []).append(request)
+        orphans = []
+        for element_id in ids:
+            instance = self.doc.GetElement(element_id)
+            point = getattr(instance.Location, "Point", None) if instance is not None else None
+            queue = waiting.get(_point_key(point)) if point is not None else None
+            if queue:
+                queue.pop(0).instance = instance
+            else:
+                orphans.append(element_id)
+        return orphans
+
+    def _delete(self, element_ids):
+        from System.Collections.Generic import List
+        ids = List[DB.ElementId]()
+        for element_id in element_ids:
+            ids.Add(element_id)
+        self.doc.Delete(ids)
+
+    # --- Параметры ---
+
+    def _set_params(self, request):
+        instance = request.instance
+        for key, value in request.params.items():
+            param = self._parameter(instance, key)
+            if param is None or param.IsReadOnly:
+                continue
+            try:
+                param.Set(value)
+            except Exception as e:
+                self.errors.append((request.role, str(key), str(e)))
+
+    def _parameter(self, instance, key):
+        if not isinstance(key, basestring_types):
+            return instance.get_Parameter(key)  # BuiltInParameter / GUID
+        resolver = self._resolvers.get(key)
+        if resolver is None:
+            resolver = self._resolvers[key] = ParamResolver(key)
+        return resolver.find(instance)
+
+    def timing_rows(self):
+        """[(роль, экземпляров, вызовов создания, создание с, параметры с)]."""
+        return [(s.role, s.count, s.batches, s.create_seconds, s.param_seconds)
+                for s in sorted(self.stats.values(), key=lambda s: -s.create_seconds)]
+
+
+def _point_key(point):
+    return round(point.X, 6), round(point.Y, 6), round(point.Z, 6)
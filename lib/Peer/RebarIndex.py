@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""Кэш "лист -> Rebar_Number -> элементы узлов" на всю сессию Revit.
+
+Rebar Tag Select запускается десятки раз подряд на одном листе. Вместо
+сбора видовых экранов и элементов узлов на каждый клик индекс строится один
+раз (размещение видов — при первом вопросе, элементы листа — при первом
+поиске на этом листе) и хранится в AppDomain между запусками скрипта.
+Обработчик DocumentChanged обновляет индекс на месте: добавленные,
+изменённые и удалённые элементы узлов переносятся между номерами по одному,
+а создание или удаление видового экрана сбрасывает размещение и листы.
+При закрытии документа (DocumentClosing) его индекс выбрасывается.
+
+    index = get_rebar_index(doc)
+    sheet_id = index.sheet_of(revit.active_view)
+    item_ids = index.find(sheet_id, "12")
+"""
+
+from Peer.ParamTable import read_parameters, read_value, basestring_types
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+NUMBER_PARAM = "Rebar_Number"
+CACHE_KEY = "PEER.RebarNumberIndex"
+HANDLER_KEY = "PEER.RebarNumberIndex.Handler"
+
+
+def number_key(value):
+    """Ключ номера: 12, 12.0 и " 12 " — один и тот же номер "12"."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        value = int(value)
+    if not isinstance(value, basestring_types):
+        value = str(value)
+    return value.strip() or None
+
+
+class RebarNumberIndex(object):
+    def __init__(self, doc=None):
+        self.doc = doc
+        self._view_sheet = None     # id вида -> id листа; None — размещение ещё не прочитано
+        self._viewport_ids = set()
+        self._sheets = {}           # id листа -> {ключ номера: set(id элемента)}
+        self._items = {}            # id элемента -> (id листа, ключ номера)
+        self.builds = 0             # сколько раз строились листы (для отчёта и проверки кэша)
+
+    # --- Чистая часть: заполнение и обновление по изменениям ---
+
+    def set_placement(self, viewports):
+        """viewports — [(id экрана, id листа, id вида)]."""
+        self._view_sheet = {}
+        self._viewport_ids = set()
+        for viewport_id, sheet_id, view_id in viewports:
+            self._viewport_ids.add(viewport_id)
+            self._view_sheet.setdefault(view_id, sheet_id)
+
+    def set_sheet(self, sheet_id, rows):
+        """rows — [(id элемента, значение Rebar_Number)] всех элементов узлов на видах листа."""
+        self._sheets[sheet_id] = {}
+        for item_id, value in rows:
+            self._put(item_id, sheet_id, number_key(value))
+        self.builds += 1
+
+    def _put(self, item_id, sheet_id, key):
+        self._items[item_id] = (sheet_id, key)
+        if key is not None:
+            self._sheets[sheet_id].setdefault(key, set()).add(item_id)
+
+    def _remove(self, item_id):
+        sheet_id, key = self._items.pop(item_id, (None, None))
+        if key is not None and sheet_id in self._sheets:
+            self._sheets[sheet_id].get(key, set()).discard(item_id)
+
+    def is_viewport(self, element_id):
+        return element_id in self._viewport_ids
+
+    def has_sheet(self, sheet_id):
+        return sheet_id in self._sheets
+
+    def has_placement(self):
+        return self._view_sheet is not None
+
+    def sheet_id_of_view(self, view_id):
+        return self._view_sheet.get(view_id) if self._view_sheet is not None else None
+
+    def view_ids_on(self, sheet_id):
+        return sorted(v for v, s in (self._view_sheet or {}).items() if s == sheet_id)
+
+    def lookup(self, sheet_id, number):
+        return sorted(self._sheets.get(sheet_id, {}).get(number_key(number), ()))
+
+    def reset(self):
+        self._view_sheet = None
+        self._viewport_ids = set()
+        self._sheets = {}
+        self._items = {}
+
+    def apply_changes(self, changed=(), deleted_ids=(), placement_changed=False):
+        """Обновляет индекс по событию без перестройки листов.
+
+        changed — [(id элемента, id вида-владельца, значение Rebar_Number)] для
+        добавленных и изменённых элементов узлов; deleted_ids — удалённые id;
+        placement_changed — создан или удалён видовой экран: размещение и
+        листы читаются заново при следующем обращении.
+        """
+        if placement_changed:
+            self.reset()
+            return
+        for element_id in deleted_ids:
+            self._remove(element_id)
+        for item_id, owner_view_id, value in changed:
+            self._remove(item_id)
+            sheet_id = self.sheet_id_of_view(owner_view_id)
+            if sheet_id in self._sheets:
+                self._put(item_id, sheet_id, number_key(value))
+
+    # --- Revit ---
+
+    def sheet_of(self, view):
+        """Id листа активного вида (сам лист — его id) или None."""
+        if isinstance(view, DB.ViewSheet):
+            return view.Id.IntegerValue
+        if self._view_sheet is None:
+            self.set_placement((vp.Id.IntegerValue, vp.SheetId.IntegerValue, vp.ViewId.IntegerValue)
+                               for vp in DB.FilteredElementCollector(self.doc).OfClass(DB.Viewport))
+        return self.sheet_id_of_view(view.Id.IntegerValue)
+
+    def find(self, sheet_id, number):
+        """Id элементов узлов листа с этим Rebar_Number; лист читается при первом обращении."""
+        if not self.has_sheet(sheet_id):
+            self._build_sheet(sheet_id)
+        return self.lookup(sheet_id, number)
+
+    def _build_sheet(self, sheet_id):
+        if self._view_sheet is None:
+            self.sheet_of(self.doc.GetElement(DB.ElementId(sheet_id)))
+        items = []
+        for view_id in self.view_ids_on(sheet_id):
+            collector = DB.FilteredElementCollector(self.doc, DB.ElementId(view_id))\
+                .OfCategory(DB.BuiltInCategory.OST_DetailComponents)\
+                .WhereElementIsNotElementType()
+            items.extend(item for item in collector if isinstance(item, DB.FamilyInstance))
+        numbers = read_parameters(self.doc, items, [NUMBER_PARAM]).values(NUMBER_PARAM)
+        self.set_sheet(sheet_id, [(item.Id.IntegerValue, value) for item, value in zip(items, numbers)])
+
+
+# --- Хранение между запусками, сброс по DocumentChanged и DocumentClosing ---
+
+def _domain():
+    from System import AppDomain
+    return AppDomain.CurrentDomain
+
+
+def _doc_key(doc):
+    return doc.PathName or doc.Title
+
+
+def _cache():
+    cache = _domain().GetData(CACHE_KEY)
+    if cache is None:
+        cache = {}
+        _domain().SetData(CACHE_KEY, cache)
+    return cache
+
+
+def on_document_changed(sender, args):
+    doc = args.GetDocument()
+    index = _cache().get(_doc_key(doc))
+    if index is None:
+        return
+    try:
+        detail_filter = DB.ElementCategoryFilter(DB.BuiltInCategory.OST_DetailComponents)
+        viewport_filter = DB.ElementClassFilter(DB.Viewport)
+        deleted = [element_id.IntegerValue for element_id in args.GetDeletedElementIds()]
+        # Удалённые id приходят без фильтра: видовой экран узнаём по индексу
+        placement_changed = bool(args.GetAddedElementIds(viewport_filter).Count) \
+            or any(index.is_viewport(i) for i in deleted)
+        changed = []
+        if not placement_changed:
+            for element_id in list(args.GetAddedElementIds(detail_filter)) + \
+                    list(args.GetModifiedElementIds(detail_filter)):
+                elem = doc.GetElement(element_id)
+                if elem is None:
+                    continue
+                param = elem.LookupParameter(NUMBER_PARAM)
+                value = read_value(param)[0] if param is not None else None
+                changed.append((element_id.IntegerValue, elem.OwnerViewId.IntegerValue, value))
+        index.apply_changes(changed, deleted, placement_changed)
+    except Exception:
+        # Кэш лучше выбросить, чем оставить неверным
+        _cache().pop(_doc_key(doc), None)
+
+
+def on_document_closing(sender, args):
+    # Закрытый без сохранения и заново открытый документ (или другая копия по тому же
+    # пути) не должен получить индекс с id прежнего
+    _cache().pop(_doc_key(args.Document), None)
+
+
+def get_rebar_index(doc):
+    """Индекс документа из кэша сессии; при первом вызове подписывается на
+    DocumentChanged и DocumentClosing."""
+    cache = _cache()
+    index = cache.get(_doc_key(doc))
+    if index is None:
+        index = cache[_doc_key(doc)] = RebarNumberIndex(doc)
+    index.doc = doc
+    domain = _domain()
+    if domain.GetData(HANDLER_KEY) is None:
+        doc.Application.DocumentChanged += on_document_changed
+        doc.Application.DocumentClosing += on_document_closing
+        domain.SetData(HANDLER_KEY, on_document_changed)
+    return index
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Синхронизация аннотаций арматуры с исходными элементами по PR_Rebar_ID.
+
+Аннотация PEER_Rebar TAG хранит id исходного элемента узла в PR_Rebar_ID и
+копию его параметров (Rebar_Number, Rebar_Diameter, Rebar_Length). Движок:
+
+    1. собирает все экземпляры семейства аннотации одним запросом
+       (FamilyInstanceFilter по типам семейства) — для листа, вида или проекта;
+    2. разбирает PR_Rebar_ID и получает каждый исходный элемент один раз;
+    3. читает параметры аннотаций и источников одним проходом read_parameters();
+    4. копирует сырые значения через ParamCopier и пишет только отличия;
+    5. собирает аннотации без источника (сироты) в один итог.
+
+    sync = RebarSync(doc)
+    result = sync.run(sync.collect(view_ids=view_ids))   # внутри транзакции
+"""
+
+from Peer.ParamCopy import ParamCopier
+from Peer.ParamTable import read_parameters
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+ANNOTATION_FAMILY_NAME = "PEER_Rebar TAG"
+SOURCE_ID_PARAM = "PR_Rebar_ID"
+SYNC_PARAMS = ("Rebar_Number", "Rebar_Diameter", "Rebar_Length")
+
+
+def parse_source_id(value):
+    """Id исходного элемента из значения PR_Rebar_ID (строка с цифрами или число) или None."""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value if value > 0 else None
+    digits = "".join(c for c in str(value) if c.isdigit())
+    return int(digits) if digits else None
+
+
+class SyncResult(object):
+    def __init__(self):
+        self.scanned = 0
+        self.updated = 0       # аннотаций с хотя бы одним записанным значением
+        self.written = 0       # записанных значений
+        self.unchanged = 0     # аннотаций, где всё уже совпадало
+        self.orphans = []      # [(id аннотации, id источника)] — источник не найден
+        self.without_id = []   # [id аннотации] — PR_Rebar_ID пуст
+        self.failed = []       # [(id аннотации, параметр, текст ошибки)]
+
+    def summary(self):
+        lines = [u"Аннотаций: {}, обновлено: {} (значений: {}), без изменений: {}".format(
+            self.scanned, self.updated, self.written, self.unchanged)]
+        if self.without_id:
+            lines.append(u"Без {}: {}".format(SOURCE_ID_PARAM, len(self.without_id)))
+        if self.orphans:
+            lines.append(u"Исходные элементы не найдены (удалены?): {}\n{}".format(
+                len(self.orphans), u", ".join(str(source_id) for _, source_id in sorted(set(self.orphans)))))
+        if self.failed:
+            lines.append(u"Ошибки записи: {}".format(len(self.failed)))
+        return u"\n".join(lines)
+
+
+class RebarSync(object):
+    def __init__(self, doc, family_name=ANNOTATION_FAMILY_NAME, params=SYNC_PARAMS):
+        self.doc = doc
+        self.family_name = family_name
+        self.params = list(params)
+
+    def annotation_filter(self):
+        """Фильтр экземпляров всех типов семейства аннотации или None, если семейства нет."""
+        for family in DB.FilteredElementCollector(self.doc).OfClass(DB.Family):
+            if family.Name == self.family_name:
+                filters = [DB.FamilyInstanceFilter(self.doc, symbol_id) for symbol_id in family.GetFamilySymbolIds()]
+                if not filters:
+                    return None
+                if len(filters) == 1:
+                    return filters[0]
+                from System.Collections.Generic import List
+                return DB.LogicalOrFilter(List[DB.ElementFilter](filters))
+        return None
+
+    def collect(self, view_ids=None):
+        """Аннотации проекта одним запросом; view_ids — только принадлежащие этим видам."""
+        element_filter = self.annotation_filter()
+        if element_filter is None:
+            return []
+        collector = DB.FilteredElementCollector(self.doc)\
+            .OfCategory(DB.BuiltInCategory.OST_DetailComponents)\
+            .WherePasses(element_filter)
+        if view_ids is None:
+            return list(collector)
+        view_ids = set(view_ids)
+        return [tag for tag in collector if tag.OwnerViewId.IntegerValue in view_ids]
+
+    def resolve(self, source_ids):
+        """Id источника -> элемент; каждый id запрашивается один раз."""
+        sources = {}
+        for source_id in set(source_ids):
+            elem = self.doc.GetElement(DB.ElementId(source_id))
+            if elem is not None:
+                sources[source_id] = elem
+        return sources
+
+    def run(self, tags):
+        """Синхронизирует аннотации tags (внутри транзакции) -> SyncResult."""
+        result = SyncResult()
+        result.scanned = len(tags)
+        id_table = read_parameters(self.doc, tags, [SOURCE_ID_PARAM])
+        source_ids = [parse_source_id(value) for value in id_table.values(SOURCE_ID_PARAM)]
+        sources = self.resolve(sid for sid in source_ids if sid is not None)
+
+        element_pairs = []
+        for tag, source_id in zip(tags, source_ids):
+            if source_id is None:
+                result.without_id.append(tag.Id.IntegerValue)
+            elif source_id not in sources:
+                result.orphans.append((tag.Id.IntegerValue, source_id))
+            else:
+                element_pairs.append((sources[source_id], tag))
+
+        copied = ParamCopier(self.params).copy(self.doc, element_pairs)
+        for i, written in enumerate(copied.written):
+            if written:
+                result.updated += 1
+                result.written += written
+            else:
+                result.unchanged += 1
+        result.failed = [(element_pairs[i][1].Id.IntegerValue, name, text) for i, name, text in copied.failed]
+        return result
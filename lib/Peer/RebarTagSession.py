@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Пакетный режим Rebar Tag Select: много аннотаций за один запуск.
+
+Каждая аннотация получает номер стержня — из собственного Rebar_Number, из
+списка номеров (по порядку выбора) или из CSV "id аннотации,номер". Номер
+ищется в индексе листа (Peer.RebarIndex, один на весь сеанс), все переносы
+делаются одним ParamCopier.copy() в одной транзакции, итог — одним отчётом.
+
+    numbers = resolve_numbers(tag_ids, own_numbers, list_numbers=parse_number_list("1, 2, 5"))
+    transfers, missing, unnumbered = plan_transfers(numbers, lambda tag_id, number: [...])
+"""
+
+import io
+
+
+def parse_number_list(text):
+    """Номера через запятую, точку с запятой, пробелы или с новой строки."""
+    for separator in ",;\r\n\t":
+        text = text.replace(separator, " ")
+    return [number for number in text.split(" ") if number]
+
+
+def read_mapping_csv(path):
+    """{id аннотации: номер} из CSV "id,номер" или "id;номер" (строки без числового id пропускаются)."""
+    mapping = {}
+    with io.open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            row = line.replace(";", ",").split(",")
+            if len(row) < 2:
+                continue
+            tag_id, number = row[0].strip().strip('"'), row[1].strip().strip('"')
+            if tag_id.isdigit() and number:
+                mapping[int(tag_id)] = number
+    return mapping
+
+
+def resolve_numbers(tag_ids, own_numbers=None, list_numbers=None, mapping=None):
+    """[(id аннотации, номер или None)] по выбранному источнику номеров.
+
+    Приоритет: mapping (CSV) -> list_numbers (по порядку tag_ids) -> own_numbers.
+    """
+    resolved = []
+    for i, tag_id in enumerate(tag_ids):
+        number = None
+        if mapping is not None:
+            number = mapping.get(tag_id)
+        elif list_numbers is not None:
+            number = list_numbers[i] if i < len(list_numbers) else None
+        elif own_numbers is not None:
+            number = own_numbers[i]
+        resolved.append((tag_id, number))
+    return resolved
+
+
+def plan_transfers(resolved, find_sources):
+    """(transfers, missing, unnumbered).
+
+    find_sources(id аннотации, номер) -> [id источников]; берётся первый.
+    transfers — [(id аннотации, id источника, номер)], missing — [(id аннотации,
+    номер)] без источника, unnumbered — [id аннотации] без номера.
+    """
+    transfers, missing, unnumbered = [], [], []
+    for tag_id, number in resolved:
+        if number is None or number == "":
+            unnumbered.append(tag_id)
+            continue
+        sources = find_sources(tag_id, number)
+        if sources:
+            transfers.append((tag_id, sources[0], number))
+        else:
+            missing.append((tag_id, number))
+    return transfers, missing, unnumbered
+
+
+class SessionReport(object):
+    def __init__(self, tags, transfers, missing, unnumbered, copied=None):
+        self.tags = tags
+        self.transfers = transfers
+        self.missing = missing
+        self.unnumbered = unnumbered
+        self.copied = copied
+
+    def text(self):
+        lines = [u"Аннотаций: {}, перенесено: {}".format(self.tags, len(self.transfers))]
+        if self.copied is not None:
+            lines.append(u"Записано значений: {}, уже совпадали: {}".format(
+                self.copied.total_written, self.copied.unchanged))
+            if self.copied.failed:
+                lines.append(u"Ошибки записи: {}".format(len(self.copied.failed)))
+        if self.missing:
+            lines.append(u"Номер не найден на листе: {}".format(
+                u", ".join(u"{}".format(number) for _, number in self.missing)))
+        if self.unnumbered:
+            lines.append(u"Без номера: {}".format(len(self.unnumbered)))
+        return u"\n".join(lines)
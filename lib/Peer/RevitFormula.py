@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""Вычисление формул семейств Revit вне модели.
+
+Правила армирования колонн ("Create Col Formula.txt": Spacing, LONG, SHORT,
+Vis_REbar, Vis_Clamra, Clamra_Quantity) живут только в формулах семейства —
+чтобы узнать число стержней, приходилось ставить экземпляр и регенерировать.
+Здесь формула разбирается один раз (if, and, or, not, roundup, rounddown,
+round, abs, sqrt, min, max, сравнения, единицы mm/cm/m/ft/in), компилируется
+в функцию Python и вычисляется сразу по массивам значений всех колонн:
+
+    formulas = load_formula_file(path)
+    result = evaluate(formulas, {"B": [...], "H": [...], "Rebar_Quantity": [...],
+                                "Clamra_Spacing": [...]})
+    result["Column_Quantity_Long"]  # список по колоннам
+
+Длины внутри — в футах, как во внутренних единицах Revit.
+
+Совпадение с семейством проверяется cross_check по размещённым экземплярам
+(Shift+клик Create Column -> Validate formulas); выгруженная оттуда выборка
+"Create Col Sample.json" сверяется в самопроверке:
+
+    cd lib && python -m Peer.RevitFormula [formulas.txt [sample.json]]
+"""
+
+import json
+import math
+import re
+
+from Peer.ParamTable import basestring_types
+
+
+class FormulaError(Exception):
+    pass
+
+
+UNITS = {
+    "mm": 1 / 304.8,
+    "cm": 1 / 30.48,
+    "m": 1 / 0.3048,
+    "ft": 1.0,
+    "in": 1 / 12.0,
+}
+
+# Метки строк "Create Col Formula.txt" -> параметр семейства, который они задают
+FILE_TARGETS = {
+    "LONG": "Column_Quantity_Long",
+    "SHORT": "Column_Quantity_Short",
+    "Clamra_Quantity H": "Clamra_Quantity",
+}
+
+# Параметры, которые формулы файла читают, но не задают
+INPUT_NAMES = ("B", "H", "Rebar_Quantity", "Clamra_Spacing")
+
+# Целочисленные параметры: Revit округляет результат формулы до целого
+INTEGER_TARGETS = set(["Column_Quantity_Long", "Column_Quantity_Short", "Clamra_Quantity"])
+
+EPS = 1e-9
+
+
+# --- Разбор ---
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_][A-Za-z_0-9]*)|(<=|>=|<>|[-+*/^()=<>,]))")
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise FormulaError("Unexpected character {!r} at {} in: {}".format(text[pos], pos, text))
+        number, name, op = match.groups()
+        if number is not None:
+            tokens.append(("num", float(number)))
+        elif name is not None:
+            tokens.append(("name", name))
+        else:
+            tokens.append(("op", op))
+        pos = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """Рекурсивный спуск; результат — выражение Python (строка) и набор имён."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.names = set()
+
+    def parse(self):
+        expr = self.comparison()
+        if self.pos != len(self.tokens):
+            raise FormulaError("Unexpected {!r} in: {}".format(self.tokens[self.pos][1], self.text))
+        return expr
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        kind, tok = self.peek()
+        if kind is None or (value is not None and tok != value):
+            raise FormulaError("Expected {!r} in: {}".format(value or "expression", self.text))
+        self.pos += 1
+        return kind, tok
+
+    def comparison(self):
+        left = self.additive()
+        kind, tok = self.peek()
+        if kind == "op" and tok in ("=", "<", ">", "<=", ">=", "<>"):
+            self.pos += 1
+            right = self.additive()
+            return "_cmp({!r}, {}, {})".format(tok, left, right)
+        return left
+
+    def additive(self):
+        expr = self.term()
+        while self.peek() in (("op", "+"), ("op", "-")):
+            op = self.take()[1]
+            expr = "({} {} {})".format(expr, op, self.term())
+        return expr
+
+    def term(self):
+        expr = self.power()
+        while self.peek() in (("op", "*"), ("op", "/")):
+            op = self.take()[1]
+            right = self.power()
+            expr = "({} * {})".format(expr, right) if op == "*" else "_div({}, {})".format(expr, right)
+        return expr
+
+    def power(self):
+        base = self.unary()
+        if self.peek() == ("op", "^"):
+            self.pos += 1
+            return "({} ** {})".format(base, self.power())
+        return base
+
+    def unary(self):
+        if self.peek() == ("op", "-"):
+            self.pos += 1
+            return "(-{})".format(self.unary())
+        if self.peek() == ("op", "+"):
+            self.pos += 1
+            return self.unary()
+        return self.atom()
+
+    def atom(self):
+        kind, tok = self.take()
+        if kind == "num":
+            unit_kind, unit = self.peek()
+            if unit_kind == "name" and unit in UNITS:
+                self.pos += 1
+                return repr(tok * UNITS[unit])
+            return repr(tok)
+        if kind == "op" and tok == "(":
+            expr = self.comparison()
+            self.take(")")
+            return expr
+        if kind == "name":
+            if self.peek() == ("op", "("):
+                return self.call(tok)
+            if tok.lower() == "pi":
+                return repr(math.pi)
+            self.names.add(tok)
+            return "_v[{!r}]".format(tok)
+        raise FormulaError("Unexpected {!r} in: {}".format(tok, self.text))
+
+    def call(self, name):
+        self.take("(")
+        args = [self.comparison()]
+        while self.peek() == ("op", ","):
+            self.pos += 1
+            args.append(self.comparison())
+        self.take(")")
+        func = name.lower()
+        if func == "if":
+            if len(args) != 3:
+                raise FormulaError("if() needs 3 arguments in: {}".format(self.text))
+            return "({1} if {0} else {2})".format(*args)
+        if func in ("and", "or"):
+            return "(" + " {} ".format(func).join("bool({})".format(a) for a in args) + ")"
+        if func == "not":
+            return "(not {})".format(args[0])
+        if func not in _FUNCTIONS:
+            raise FormulaError("Unknown function {!r} in: {}".format(name, self.text))
+        return "_f[{!r}]({})".format(func, ", ".join(args))
+
+
+def _div(a, b):
+    return float(a) / b
+
+
+def _cmp(op, a, b):
+    if op == "=":
+        return abs(a - b) < EPS
+    if op == "<>":
+        return abs(a - b) >= EPS
+    if op == "<":
+        return a < b - EPS
+    if op == ">":
+        return a > b + EPS
+    if op == "<=":
+        return a <= b + EPS
+    return a >= b - EPS
+
+
+def revit_round(value):
+    """Округление Revit: половина — от нуля."""
+    return int(math.floor(abs(value) + 0.5)) * (1 if value >= 0 else -1)
+
+
+_FUNCTIONS = {
+    "roundup": lambda x: int(math.ceil(x - EPS)),
+    "rounddown": lambda x: int(math.floor(x + EPS)),
+    "round": revit_round,
+    "abs": abs,
+    "sqrt": math.sqrt,
+    "min": min,
+    "max": max,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+}
+
+_GLOBALS = {"_div": _div, "_cmp": _cmp, "_f": _FUNCTIONS, "bool": bool}
+
+
+class Formula(object):
+    """Разобранная формула: target = expression."""
+
+    def __init__(self, target, text):
+        self.target = target
+        self.text = text
+        parser = _Parser(text)
+        self.source = parser.parse()
+        self.names = parser.names
+        self._code = compile("lambda _v: " + self.source, "<formula {}>".format(target), "eval")
+        self._func = eval(self._code, _GLOBALS)
+
+    def __call__(self, values):
+        """Значение по словарю имя -> значение одной строки."""
+        return self._func(values)
+
+    def __repr__(self):
+        return "Formula({!r}, {!r})".format(self.target, self.text)
+
+
+def parse_formulas(lines, targets=None):
+    """Formula из строк "<метка>  <формула>"; метка и формула разделены 2+ пробелами или табом."""
+    targets = FILE_TARGETS if targets is None else targets
+    formulas = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = re.split(r"\t|\s{2,}", line, 1)
+        if len(parts) != 2:
+            raise FormulaError("Cannot split label and formula: {}".format(line))
+        label, text = parts[0].strip(), parts[1].strip()
+        formulas.append(Formula(targets.get(label, label), text))
+    return formulas
+
+
+def load_formula_file(path, targets=None):
+    with open(path) as f:
+        return parse_formulas(f.read().splitlines(), targets)
+
+
+def evaluation_order(formulas, inputs):
+    """Формулы в порядке зависимостей; FormulaError при цикле или неизвестном имени."""
+    by_target = dict((f.target, f) for f in formulas)
+    order = []
+    state = {}  # target -> 1 (в обходе) / 2 (готово)
+
+    def visit(name, chain):
+        if name in inputs:
+            return
+        if name not in by_target:
+            raise FormulaError("Unknown parameter {!r} (needed by {})".format(name, " -> ".join(chain)))
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise FormulaError("Circular formulas: {}".format(" -> ".join(chain + [name])))
+        state[name] = 1
+        for dep in sorted(by_target[name].names):
+            visit(dep, chain + [name])
+        state[name] = 2
+        order.append(by_target[name])
+
+    for formula in formulas:
+        visit(formula.target, [])
+    return order
+
+
+def evaluate(formulas, columns, integer_targets=INTEGER_TARGETS):
+    """Вычисляет все формулы по столбцам входа (имя -> список); возвращает имя -> список.
+
+    Параметры, которые формулы читают, но не задают (в файле — B, H,
+    Rebar_Quantity, Clamra_Spacing), должны быть во входе. Результат содержит и
+    входные столбцы. Ошибка вычисления (деление на ноль и т.п.) даёт None в
+    строке, как незаданное значение параметра.
+    """
+    columns = dict(columns)
+    lengths = set(len(v) for v in columns.values())
+    if len(lengths) > 1:
+        raise FormulaError("Input columns differ in length: {}".format(sorted(lengths)))
+    size = lengths.pop() if lengths else 0
+    order = evaluation_order(formulas, columns)
+
+    rows = [dict((name, values[i]) for name, values in columns.items()) for i in range(size)]
+    for formula in order:
+        is_integer = formula.target in integer_targets
+        values = []
+        for row in rows:
+            try:
+                value = formula(row)
+                if is_integer and value is not None and not isinstance(value, bool):
+                    value = revit_round(value)
+            except (ZeroDivisionError, TypeError, ValueError):
+                value = None
+            row[formula.target] = value
+            values.append(value)
+        columns[formula.target] = values
+    return columns
+
+
+def evaluate_one(formulas, **values):
+    """Вычисление для одной колонны: evaluate_one(formulas, B=..., H=..., Rebar_Quantity=...)."""
+    result = evaluate(formulas, dict((k, [v]) for k, v in values.items()))
+    return dict((k, v[0]) for k, v in result.items())
+
+
+# --- Сверка с семейством ---
+
+def compare_columns(expected, actual, names, tolerance=1e-6):
+    """[(индекс, имя, формула, семейство)] расхождений; булевы и 0/1 считаются равными."""
+    mismatches = []
+    for name in names:
+        for i, (a, b) in enumerate(zip(expected[name], actual[name])):
+            if a is None or b is None:
+                if a is not b:
+                    mismatches.append((i, name, a, b))
+                continue
+            if isinstance(a, basestring_types) or isinstance(b, basestring_types):
+                same = a == b
+            else:
+                same = abs(float(a) - float(b)) <= tolerance
+            if not same:
+                mismatches.append((i, name, a, b))
+    return mismatches
+
+
+def check_rows(formulas, rows, input_names=INPUT_NAMES):
+    """Сверка с посчитанными семейством значениями: rows — [{параметр: значение}].
+
+    Проверяются только результаты, которые есть хоть в одной строке;
+    возвращает [(индекс строки, параметр, формула, семейство)].
+    """
+    targets = [f.target for f in formulas]
+    inputs = dict((name, [row.get(name) for row in rows]) for name in input_names)
+    expected = evaluate(formulas, inputs)
+    actual = dict((name, [row.get(name) for row in rows]) for name in targets)
+    checked = [name for name in targets if any(v is not None for v in actual[name])]
+    return compare_columns(expected, actual, checked)
+
+
+def read_rows(doc, instances, formulas, input_names=INPUT_NAMES):
+    """(экземпляры, [{параметр: значение}]) — входы и результаты формул одной ParamTable."""
+    from Peer.ParamTable import read_parameters
+    names = list(input_names) + [f.target for f in formulas]
+    table = read_parameters(doc, instances, names)
+    rows = [dict((name, table.get(name, i)) for name in names) for i in range(len(table))]
+    return table.elements, rows
+
+
+def cross_check(doc, instances, formulas, input_names=INPUT_NAMES):
+    """Сверка формул с семейством на размещённых экземплярах.
+
+    Возвращает (строки значений, [(элемент, параметр, формула, семейство)]);
+    строки можно сохранить dump_sample для самопроверки модуля.
+    """
+    elements, rows = read_rows(doc, instances, formulas, input_names)
+    mismatches = check_rows(formulas, rows, input_names)
+    return rows, [(elements[i], name, a, b) for i, name, a, b in mismatches]
+
+
+def dump_sample(path, rows):
+    with open(path, "w") as f:
+        json.dump(rows, f, indent=1, sort_keys=True)
+
+
+def load_sample(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+    folder = os.path.join(os.path.dirname(__file__), "..", "..", "PEERG.tab", "Dev.panel",
+                          "DevButton_3.pushbutton")
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(folder, "Create Col Formula.txt")
+    sample_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(folder, "Create Col Sample.json")
+    formulas = load_formula_file(path)
+    for formula in evaluation_order(formulas, INPUT_NAMES):
+        print("{:<22} {}".format(formula.target, formula.text))
+
+    count = 100000
+    sizes = [(25 + 5 * (i % 12)) * UNITS["cm"] for i in range(count)]
+    inputs = {"B": sizes, "H": list(reversed(sizes)), "Rebar_Quantity": [4 + 2 * (i % 8) for i in range(count)],
+              "Clamra_Spacing": [(150 + 50 * (i % 4)) * UNITS["mm"] for i in range(count)]}
+    start = time.time()
+    result = evaluate(formulas, inputs)
+    print("{} columns in {:.3f} s".format(count, time.time() - start))
+
+    sample = load_sample(sample_path)
+    mismatches = check_rows(formulas, sample)
+    for i, name, a, b in mismatches:
+        print("row {}: {} formula {!r} family {!r}".format(i, name, a, b))
+    print("sample: {} rows, {} mismatches".format(len(sample), len(mismatches)))
+    if mismatches:
+        sys.exit(1)
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""Нумерация элементов спецификации: порядок таблицы, сброс по группам, запись только изменений.
+
+Порядок строк берётся из самой таблицы: один проход по строкам тела
+спецификации даёт id элементов в том порядке, в котором их показывает Revit.
+Элементы собираются одним FilteredElementCollector(doc, schedule.Id), значения
+полей сортировки (для сброса по группам) и целевого параметра читаются одним
+проходом read_parameters(). Дальше всё — чистые функции:
+
+    order = rows_order(ids, body_ids)                    # индексы в порядке строк таблицы
+    numbers = number_rows(order, sort_values, 1, NumberFormat.parse("C-###"))
+    writes, skipped = plan_writes(current_values, numbers)
+
+Если строки нельзя сопоставить с элементами (спецификация без построчного
+вывода), порядок восстанавливается сортировкой order_rows() — только когда все
+поля сортировки читаются как параметры; иначе нумерация не выполняется
+(unreadable_fields), чтобы не разойтись с видимой таблицей.
+
+Счётчик сбрасывается при смене значений первых reset_depth полей группировки
+(группа с заголовком в спецификации). Формат — шаблон с '#': "C-###" -> C-001.
+"""
+
+import random
+import time
+
+from Peer.MarkRanges import natural_key
+from Peer.ParamTable import ParamSpec, read_parameters, INTEGER, STRING
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+try:
+    basestring_types = (basestring,)  # IronPython 2.7
+except NameError:
+    basestring_types = (str,)
+
+
+class NumberFormat(object):
+    """Префикс + номер с дополнением нулями до width + суффикс; номера start, start + step, ..."""
+
+    def __init__(self, prefix="", suffix="", width=0, start=1, step=1):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.width = width
+        self.start = start
+        self.step = step
+
+    @classmethod
+    def parse(cls, pattern, start=1, step=1):
+        """Шаблон с '#': "C-###" -> префикс "C-", 3 цифры; без '#' номер дописывается в конец."""
+        first = pattern.find("#")
+        if first < 0:
+            return cls(pattern, "", 0, start, step)
+        last = first
+        while last < len(pattern) and pattern[last] == "#":
+            last += 1
+        width = last - first
+        return cls(pattern[:first], pattern[last:], width if width > 1 else 0, start, step)
+
+    def number(self, position):
+        """Номер position-й строки группы (с нуля)."""
+        return self.start + position * self.step
+
+    def text(self, n):
+        return u"{}{}{}".format(self.prefix, str(n).zfill(self.width), self.suffix)
+
+
+def sort_key(value):
+    """Ключ сортировки значения поля: пусто < числа < строки (естественный порядок)."""
+    if value is None:
+        return (0,)
+    if isinstance(value, basestring_types):
+        return (2, natural_key(value))
+    return (1, value)
+
+
+def rows_order(ids, body_ids):
+    """Индексы элементов в порядке строк тела таблицы.
+
+    body_ids — id элементов строк по порядку (заголовки и итоги уже отброшены).
+    None, если какой-то элемент спецификации не виден отдельной строкой.
+    """
+    position = {}
+    for element_id in body_ids:
+        position.setdefault(element_id, len(position))
+    if any(element_id not in position for element_id in ids):
+        return None
+    return sorted(range(len(ids)), key=lambda i: position[ids[i]])
+
+
+def unreadable_fields(fields, sort_values):
+    """Имена полей, которые не читаются как параметры (Count, формулы, связанные
+    элементы...) или пусты у всех строк — по ним нельзя повторить порядок таблицы."""
+    names = []
+    for level, field in enumerate(fields):
+        if not field.readable or all(row[level] is None for row in sort_values):
+            names.append(field.name)
+    return names
+
+
+def order_rows(ids, sort_values, descending):
+    """Индексы строк в порядке сортировки по полям (когда строки таблицы недоступны).
+
+    ids — id элементов (последний критерий, как при равных значениях в Revit),
+    sort_values[i] — кортеж значений полей сортировки строки i, descending —
+    направление по каждому полю. Сортировка устойчивая: от последнего поля к первому.
+    """
+    order = sorted(range(len(ids)), key=lambda i: ids[i])
+    for level in reversed(range(len(descending))):
+        order.sort(key=lambda i: sort_key(sort_values[i][level]), reverse=descending[level])
+    return order
+
+
+def number_rows(order, sort_values, reset_depth, fmt):
+    """{индекс строки: (номер, текст)}; счётчик сбрасывается при смене первых reset_depth полей."""
+    numbers = {}
+    group = None
+    position = 0
+    for i in order:
+        key = tuple(sort_key(v) for v in sort_values[i][:reset_depth])
+        if key != group:
+            group = key
+            position = 0
+        n = fmt.number(position)
+        numbers[i] = (n, fmt.text(n))
+        position += 1
+    return numbers
+
+
+def plan_writes(current, numbers, storage=STRING):
+    """([(индекс, значение)] для записи, число совпавших): пишется только то, что отличается."""
+    writes = []
+    skipped = 0
+    for i in sorted(numbers):
+        n, text = numbers[i]
+        value = n if storage == INTEGER else text
+        if current[i] == value:
+            skipped += 1
+        else:
+            writes.append((i, value))
+    return writes, skipped
+
+
+class NumberingReport(object):
+    def __init__(self):
+        self.scanned = 0
+        self.written = 0
+        self.skipped = 0
+        self.failed = 0
+        self.timings = []   # [(этап, секунды)]
+
+    def timed(self, stage, start):
+        self.timings.append((stage, time.time() - start))
+
+    def text(self):
+        lines = [u"Строк: {}, записано: {}, без изменений: {}, не записано: {}".format(
+            self.scanned, self.written, self.skipped, self.failed)]
+        lines.extend(u"{}: {:.2f} с".format(stage, seconds) for stage, seconds in self.timings)
+        return u"\n".join(lines)
+
+
+# --- Revit ---
+
+class SortField(object):
+    def __init__(self, name, descending, has_header, readable=True):
+        self.name = name
+        self.descending = descending
+        self.has_header = has_header
+        self.readable = readable    # поле — параметр экземпляра или типа
+
+
+def sort_fields(schedule):
+    """Поля сортировки/группировки спецификации по порядку."""
+    definition = schedule.Definition
+    fields = []
+    for i in range(definition.GetSortGroupFieldCount()):
+        sort_field = definition.GetSortGroupField(i)
+        field = definition.GetField(sort_field.FieldId)
+        readable = field.FieldType in (DB.ScheduleFieldType.Instance, DB.ScheduleFieldType.ElementType) \
+            and not field.IsCalculatedField
+        fields.append(SortField(field.GetName(),
+                                sort_field.SortOrder == DB.ScheduleSortOrder.Descending,
+                                sort_field.ShowHeader or sort_field.ShowFooter,
+                                readable))
+    return fields
+
+
+def body_element_ids(schedule):
+    """Id элементов строк тела таблицы по порядку (один проход); None — строки недоступны."""
+    if not hasattr(schedule, "GetCellElementId"):
+        return None
+    section = schedule.GetTableData().GetSectionData(DB.SectionType.Body)
+    ids = []
+    for row in range(section.NumberOfRows):
+        try:
+            element_id = schedule.GetCellElementId(DB.SectionType.Body, row, 0)
+        except Exception:
+            continue  # строка без элемента: заголовок группы, итог, пустая строка
+        if element_id is not None and element_id.IntegerValue > 0:
+            ids.append(element_id.IntegerValue)
+    return ids
+
+
+def schedule_elements(doc, schedule):
+    """Элементы спецификации (с её фильтрами) — один сборщик."""
+    return list(DB.FilteredElementCollector(doc, schedule.Id).WhereElementIsNotElementType())
+
+
+def read_rows(doc, elements, fields, target_name):
+    """(ParamTable, sort_values): значения полей сортировки (экземпляр, иначе тип) и цели."""
+    specs = [ParamSpec(target_name)]
+    for field in fields:
+        specs.append(ParamSpec(field.name))
+        specs.append(ParamSpec(field.name, from_type=True, key=field.name + "@type"))
+    table = read_parameters(doc, elements, specs)
+
+    names = {}  # ElementId (уровень, материал...) сортируется по имени элемента, как в таблице
+
+    def comparable(value):
+        if hasattr(value, "IntegerValue"):
+            key = value.IntegerValue
+            if key not in names:
+                elem = doc.GetElement(value) if key > 0 else None
+                names[key] = elem.Name if elem is not None else None
+            return names[key]
+        return value
+
+    sort_values = []
+    for i in range(len(elements)):
+        row = []
+        for field in fields:
+            value = table.get(field.name, i)
+            if value is None:
+                value = table.get(field.name + "@type", i)
+            row.append(comparable(value))
+        sort_values.append(tuple(row))
+    return table, sort_values
+
+
+def writable_rows(table, target_name):
+    """Индексы строк, у которых целевой параметр есть и доступен для записи."""
+    rows = set()
+    for i in range(len(table)):
+        param = table.parameter(target_name, i)
+        if param is not None and not param.IsReadOnly:
+            rows.add(i)
+    return rows
+
+
+def write_numbers(table, target_name, writes):
+    """Записывает значения (внутри транзакции) -> (записано, не записано)."""
+    written = failed = 0
+    for i, value in writes:
+        param = table.parameter(target_name, i)
+        if param is None or param.IsReadOnly:
+            failed += 1
+            continue
+        try:
+            param.Set(value)
+            written += 1
+        except Exception:
+            failed += 1
+    return written, failed
+
+
+# --- Бенчмарк (тестов в репозитории нет — запуск как модуля) ---
+
+def benchmark(count=50000, seed=0):
+    rnd = random.Random(seed)
+    ids = list(range(count))
+    sort_values = [("L{}".format(rnd.randint(1, 20)), rnd.choice(["C", "W", None]), rnd.random())
+                   for _ in ids]
+    current = [None] * count
+    start = time.time()
+    order = order_rows(ids, sort_values, [False, False, True])
+    numbers = number_rows(order, sort_values, 1, NumberFormat.parse("C-###"))
+    writes, skipped = plan_writes(current, numbers)
+    return count, len(writes), time.time() - start
+
+
+if __name__ == "__main__":
+    count, writes, elapsed = benchmark()
+    print("{} rows -> {} writes in {:.3f} s".format(count, writes, elapsed))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Пакетное создание листов в одной транзакции.
+
+Сначала планируются все листы (имя, номер, рамка); занятые номера
+отбрасываются по NameRegistry ещё до записи в модель. Затем execute()
+внутри уже открытой транзакции создаёт каждый лист в своей SubTransaction:
+исключение на одном листе откатывает только его, остальные создаются.
+Предупреждения при фиксации транзакции забирает Peer.Failures.
+"""
+
+from Peer.NameRegistry import NameRegistry, SHEET_NUMBER
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+class SheetPlan(object):
+    def __init__(self, name, number, titleblock_id):
+        self.name = name
+        self.number = number
+        self.titleblock_id = titleblock_id
+        self.sheet = None
+        self.error = None
+
+
+class SheetBatch(object):
+    def __init__(self, doc, index, names=None):
+        self.doc = doc
+        self.index = index
+        self.plans = []
+        if names is None:
+            names = NameRegistry({SHEET_NUMBER: index.sheet_numbers()})
+        self.names = names
+
+    def add(self, name, number, titleblock_id):
+        """SheetPlan или None, если лист с таким номером уже есть или запланирован."""
+        if self.names.is_taken(SHEET_NUMBER, number):
+            return None
+        self.names.add(SHEET_NUMBER, number)
+        plan = SheetPlan(name, number, titleblock_id)
+        self.plans.append(plan)
+        return plan
+
+    def __len__(self):
+        return len(self.plans)
+
+    def execute(self):
+        """Создаёт запланированные листы; вызывается внутри открытой транзакции."""
+        for plan in self.plans:
+            if plan.sheet is not None:
+                continue
+            st = DB.SubTransaction(self.doc)
+            st.Start()
+            try:
+                sheet = DB.ViewSheet.Create(self.doc, plan.titleblock_id)
+                sheet.Name = plan.name
+                sheet.SheetNumber = plan.number
+                st.Commit()
+            except Exception as e:
+                st.RollBack()
+                plan.error = str(e)
+                self.names.release(SHEET_NUMBER, plan.number)
+                continue
+            plan.sheet = sheet
+            self.index.add_sheet(sheet)
+        return self.created
+
+    @property
+    def created(self):
+        return [plan for plan in self.plans if plan.sheet is not None]
+
+    @property
+    def failed(self):
+        return [plan for plan in self.plans if plan.error is not None]
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""Номер листа в Mark элементов узлов: разовая запись и живое обновление.
+
+Разовый режим (Mark Detail Items): detail_items_on_views() собирает элементы
+только с нужных видов, assign_marks() пишет номер листа там, где он отличается.
+
+Живой режим: SheetMarkUpdater (IUpdater) срабатывает на создание и удаление
+видовых экранов, на создание листа и смену его номера и переписывает Mark только на видах,
+которых это касается. Решение "какие виды и какой номер" — чистая функция
+plan_mark_updates(changes, state) над ChangeSet и PlacementState, без Revit:
+
+    state = PlacementState({10: (1, 100)}, {1: "S-101"})
+    targets, state = plan_mark_updates(ChangeSet(sheet_numbers={1: "S-102"}), state)
+    # targets == {100: "S-102"}
+
+Отмена, повтор и открытие документа IUpdater не вызывают: на них (DocumentChanged,
+DocumentOpened) состояние перечитывается, на DocumentClosing — выбрасывается.
+"""
+
+import random
+import time
+
+from Peer.ParamTable import read_parameters
+
+try:
+    from Autodesk.Revit import DB
+    from Autodesk.Revit.DB.Events import UndoOperation
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+PARAM_MARK = "Mark"
+UPDATER_GUID = "6f0d5b8e-3c1a-4e5f-9a7b-2d4c8e1f0a93"
+UPDATER_KEY = "PEER.SheetMarkUpdater"  # AppDomain: зарегистрированный updater и его подписки
+
+
+class PlacementState(object):
+    """Видовые экраны (id -> (id листа, id вида)) и номера листов (id листа -> номер)."""
+
+    def __init__(self, viewports=None, sheet_numbers=None):
+        self.viewports = dict(viewports or {})
+        self.sheet_numbers = dict(sheet_numbers or {})
+        self._sheets_by_view = {}
+        self._views_by_sheet = {}
+        for sheet_id, view_id in self.viewports.values():
+            self._sheets_by_view.setdefault(view_id, set()).add(sheet_id)
+            self._views_by_sheet.setdefault(sheet_id, set()).add(view_id)
+
+    def views_on(self, sheet_id):
+        return set(self._views_by_sheet.get(sheet_id, ()))
+
+    def number_of_view(self, view_id):
+        """Номер листа вида (наименьший, если вид на нескольких листах) или None."""
+        numbers = [self.sheet_numbers.get(sheet_id) for sheet_id in self._sheets_by_view.get(view_id, ())]
+        numbers = [n for n in numbers if n is not None]
+        return min(numbers) if numbers else None
+
+    def applied(self, changes):
+        """Новое состояние после изменений (текущее не меняется)."""
+        viewports = dict(self.viewports)
+        sheet_numbers = dict(self.sheet_numbers)
+        for element_id in changes.deleted_ids:
+            viewports.pop(element_id, None)
+            sheet_numbers.pop(element_id, None)
+        sheet_numbers.update(changes.sheet_numbers)
+        for viewport_id, sheet_id, view_id in changes.added_viewports:
+            viewports[viewport_id] = (sheet_id, view_id)
+        # Удалённый лист уносит свои экраны, даже если их удаление не пришло отдельно
+        viewports = dict((vp, place) for vp, place in viewports.items()
+                         if place[0] not in changes.deleted_ids)
+        return PlacementState(viewports, sheet_numbers)
+
+
+class ChangeSet(object):
+    """Изменения одного события: новые экраны, удалённые id, новые номера листов."""
+
+    def __init__(self, added_viewports=(), deleted_ids=(), sheet_numbers=None):
+        self.added_viewports = list(added_viewports)   # [(id экрана, id листа, id вида)]
+        self.deleted_ids = set(deleted_ids)
+        self.sheet_numbers = dict(sheet_numbers or {})  # id листа -> номер
+
+    def __nonzero__(self):
+        return bool(self.added_viewports or self.deleted_ids or self.sheet_numbers)
+
+    __bool__ = __nonzero__
+
+
+def plan_mark_updates(changes, state):
+    """(targets, new_state): id вида -> номер листа для видов, которых касаются изменения.
+
+    Вид попадает в targets, если его номер листа изменился или он только что
+    размещён. Вид, снятый со всех листов, не попадает: его Mark не трогаем.
+    """
+    new_state = state.applied(changes)
+    added = set(view_id for _, _, view_id in changes.added_viewports)
+    affected = set(added)
+    for element_id in changes.deleted_ids:
+        if element_id in state.viewports:
+            affected.add(state.viewports[element_id][1])
+        affected.update(state.views_on(element_id))
+    for sheet_id in changes.sheet_numbers:
+        affected.update(new_state.views_on(sheet_id))
+
+    targets = {}
+    for view_id in affected:
+        number = new_state.number_of_view(view_id)
+        if number is not None and (view_id in added or number != state.number_of_view(view_id)):
+            targets[view_id] = number
+    return targets, new_state
+
+
+# --- Revit ---
+
+def detail_items_on_views(doc, view_ids):
+    """Элементы узлов, принадлежащие видам (сборщик на вид, без прохода по документу).
+
+    Зависимый вид показывает элементы родительского — OwnerViewId оставляет
+    только свои, чтобы элемент не получил номер чужого листа.
+    """
+    items = []
+    for view_id in sorted(view_ids):
+        collector = DB.FilteredElementCollector(doc, DB.ElementId(view_id))\
+            .OfCategory(DB.BuiltInCategory.OST_DetailComponents)\
+            .WhereElementIsNotElementType()
+        for item in collector:
+            if item.OwnerViewId.IntegerValue == view_id:
+                items.append(item)
+    return items
+
+
+def assign_marks(doc, items, number_of_view, param_name=PARAM_MARK):
+    """Пишет номер листа вида в Mark (внутри транзакции) -> (обновлено, пропущено)."""
+    marks = read_parameters(doc, items, [param_name])
+    updated = skipped = 0
+    for i, item in enumerate(items):
+        sheet_number = number_of_view.get(item.OwnerViewId.IntegerValue)
+        if sheet_number is None:
+            continue
+        if marks.get(param_name, i) == sheet_number:
+            skipped += 1
+            continue
+        param = marks.parameter(param_name, i)
+        if param and not param.IsReadOnly:
+            try:
+                param.Set(sheet_number)
+                updated += 1
+            except Exception:
+                continue
+    return updated, skipped
+
+
+def state_from_document(doc):
+    viewports = {}
+    for viewport in DB.FilteredElementCollector(doc).OfClass(DB.Viewport):
+        viewports[viewport.Id.IntegerValue] = (viewport.SheetId.IntegerValue, viewport.ViewId.IntegerValue)
+    sheet_numbers = dict((sheet.Id.IntegerValue, sheet.SheetNumber)
+                         for sheet in DB.FilteredElementCollector(doc).OfClass(DB.ViewSheet))
+    return PlacementState(viewports, sheet_numbers)
+
+
+def changes_from_data(doc, data, state):
+    """ChangeSet из UpdaterData: добавленные экраны, удалённые id, новые и изменённые листы.
+
+    Номер листа, которого ещё нет в state (создан после prime()), читается из
+    документа вместе с экраном — иначе виды на нём остались бы без Mark.
+    """
+    added = []
+    sheet_numbers = {}
+    for element_id in list(data.GetAddedElementIds()) + list(data.GetModifiedElementIds()):
+        elem = doc.GetElement(element_id)
+        if isinstance(elem, DB.Viewport):
+            added.append((elem.Id.IntegerValue, elem.SheetId.IntegerValue, elem.ViewId.IntegerValue))
+        elif isinstance(elem, DB.ViewSheet):
+            sheet_numbers[elem.Id.IntegerValue] = elem.SheetNumber
+    for _, sheet_id, _ in added:
+        if sheet_id not in state.sheet_numbers and sheet_id not in sheet_numbers:
+            sheet = doc.GetElement(DB.ElementId(sheet_id))
+            if isinstance(sheet, DB.ViewSheet):
+                sheet_numbers[sheet_id] = sheet.SheetNumber
+    deleted = [element_id.IntegerValue for element_id in data.GetDeletedElementIds()]
+    return ChangeSet(added, deleted, sheet_numbers)
+
+
+def updater_id(addin_id):
+    from System import Guid
+    return DB.UpdaterId(addin_id, Guid(UPDATER_GUID))
+
+
+if DB is not None:
+    class SheetMarkUpdater(DB.IUpdater):
+        """Переписывает Mark на видах, чьи листы изменились, в той же транзакции."""
+
+        def __init__(self, addin_id):
+            self._id = updater_id(addin_id)
+            self.states = {}   # Document -> PlacementState (не по имени: одноимённые документы)
+            self.last_error = None
+
+        def prime(self, doc):
+            self.states[doc] = state_from_document(doc)
+
+        def forget(self, doc):
+            self.states.pop(doc, None)
+
+        def on_document_opened(self, sender, args):
+            try:
+                self.prime(args.Document)
+            except Exception as e:
+                self.forget(args.Document)
+                self.last_error = str(e)
+
+        def on_document_closing(self, sender, args):
+            self.forget(args.Document)
+
+        def on_document_changed(self, sender, args):
+            if args.Operation == UndoOperation.TransactionCommitted:
+                return  # зафиксированные правки уже прошли через Execute
+            doc = args.GetDocument()
+            try:
+                self.prime(doc)
+            except Exception as e:
+                self.forget(doc)  # Execute перечитает документ сам
+                self.last_error = str(e)
+
+        def attach(self, app):
+            app.DocumentOpened += self.on_document_opened
+            app.DocumentClosing += self.on_document_closing
+            app.DocumentChanged += self.on_document_changed
+
+        def detach(self, app):
+            app.DocumentOpened -= self.on_document_opened
+            app.DocumentClosing -= self.on_document_closing
+            app.DocumentChanged -= self.on_document_changed
+
+        def Execute(self, data):
+            doc = data.GetDocument()
+            try:
+                state = self.states.get(doc)
+                if state is None:
+                    state = state_from_document(doc)
+                changes = changes_from_data(doc, data, state)
+                targets, self.states[doc] = plan_mark_updates(changes, state)
+                if targets:
+                    assign_marks(doc, detail_items_on_views(doc, targets), targets)
+            except Exception as e:
+                # Ошибка обновления Mark не должна откатывать правку пользователя
+                self.last_error = str(e)
+
+        def GetUpdaterId(self):
+            return self._id
+
+        def GetUpdaterName(self):
+            return "Sheet number to detail item Mark"
+
+        def GetAdditionalInformation(self):
+            return "Writes the sheet number of the owner view into Mark of detail items"
+
+        def GetChangePriority(self):
+            return DB.ChangePriority.Annotations
+
+
+def is_registered(addin_id):
+    return DB.UpdaterRegistry.IsUpdaterRegistered(updater_id(addin_id))
+
+
+def _domain():
+    from System import AppDomain
+    return AppDomain.CurrentDomain
+
+
+def register(doc, addin_id):
+    """Включает живой режим (для всех документов сессии) и читает размещение doc.
+
+    Вызывающий скрипт должен жить в постоянном движке (__persistentengine__):
+    Execute и обработчики событий вызываются после его завершения.
+    """
+    updater = SheetMarkUpdater(addin_id)
+    updater.prime(doc)
+    DB.UpdaterRegistry.RegisterUpdater(updater, True)
+    updater.attach(doc.Application)
+    _domain().SetData(UPDATER_KEY, (updater, doc.Application))
+    uid = updater.GetUpdaterId()
+    DB.UpdaterRegistry.AddTrigger(uid, DB.ElementClassFilter(DB.Viewport),
+                                  DB.Element.GetChangeTypeElementAddition())
+    DB.UpdaterRegistry.AddTrigger(uid, DB.ElementClassFilter(DB.Viewport),
+                                  DB.Element.GetChangeTypeElementDeletion())
+    DB.UpdaterRegistry.AddTrigger(uid, DB.ElementClassFilter(DB.ViewSheet),
+                                  DB.Element.GetChangeTypeElementAddition())
+    DB.UpdaterRegistry.AddTrigger(uid, DB.ElementClassFilter(DB.ViewSheet),
+                                  DB.Element.GetChangeTypeParameter(
+                                      DB.ElementId(DB.BuiltInParameter.SHEET_NUMBER)))
+    DB.UpdaterRegistry.AddTrigger(uid, DB.ElementClassFilter(DB.ViewSheet),
+                                  DB.Element.GetChangeTypeElementDeletion())
+    return updater
+
+
+def unregister(addin_id):
+    registered = _domain().GetData(UPDATER_KEY)
+    if registered is not None:
+        updater, app = registered
+        updater.detach(app)
+        _domain().SetData(UPDATER_KEY, None)
+    DB.UpdaterRegistry.UnregisterUpdater(updater_id(addin_id))
+
+
+# --- Проверка на синтетических событиях (тестов в репозитории нет — запуск как модуля) ---
+
+def check_events(events, state, truths):
+    """Прогоняет события и сверяет инкрементальный итог с пересчётом с нуля.
+
+    truths[i] — состояние модели после i-го события, построенное заново.
+    Возвращает список расхождений (пусто — всё верно): после каждого события
+    у каждого размещённого вида накопленный Mark должен совпасть с
+    number_of_view() этого состояния — в том числе у видов на новых листах.
+    """
+    problems = []
+    marks = dict((view_id, state.number_of_view(view_id))
+                 for _, view_id in state.viewports.values())
+    for step, (changes, truth) in enumerate(zip(events, truths)):
+        targets, state = plan_mark_updates(changes, state)
+        marks.update(targets)
+        for view_id in set(view_id for _, view_id in truth.viewports.values()):
+            number = marks.get(view_id)
+            expected = truth.number_of_view(view_id)
+            if expected is not None and number != expected:
+                problems.append("step {}: view {} marked {!r}, expected {!r}".format(
+                    step, view_id, number, expected))
+    return problems
+
+
+def random_events(count, seed=0, sheets=20, views=200):
+    """Синтетический поток: экраны создаются и удаляются, листы создаются и перенумеровываются.
+
+    Новый лист приходит либо отдельным событием (триггер на создание листа), либо
+    вместе с первым экраном на нём — номер тогда несёт сам ChangeSet, как его
+    дочитывает changes_from_data(). Возвращает (события, начальное состояние,
+    состояние модели после каждого события).
+    """
+    rnd = random.Random(seed)
+    numbers = dict((s, "S-{}".format(s)) for s in range(1, sheets + 1))
+    state = PlacementState({}, numbers)
+    sheet_ids = list(range(1, sheets + 1))
+    viewports = {}
+    truths = []
+    next_id = 10000
+    next_sheet = 5000
+    events = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < 0.05:
+            next_sheet += 1
+            sheet_ids.append(next_sheet)
+            events.append(ChangeSet(sheet_numbers={next_sheet: "N-{}".format(next_sheet)}))
+        elif kind < 0.1:
+            # Лист и экран на нём в одной транзакции
+            next_sheet += 1
+            next_id += 1
+            sheet_ids.append(next_sheet)
+            view_id = rnd.randint(sheets + 1, sheets + views)
+            viewports[next_id] = (next_sheet, view_id)
+            events.append(ChangeSet(added_viewports=[(next_id, next_sheet, view_id)],
+                                    sheet_numbers={next_sheet: "N-{}".format(next_sheet)}))
+        elif kind < 0.5 or not viewports:
+            next_id += 1
+            place = (rnd.choice(sheet_ids), rnd.randint(sheets + 1, sheets + views))
+            viewports[next_id] = place
+            events.append(ChangeSet(added_viewports=[(next_id, place[0], place[1])]))
+        elif kind < 0.8:
+            viewport_id = rnd.choice(sorted(viewports))
+            del viewports[viewport_id]
+            events.append(ChangeSet(deleted_ids=[viewport_id]))
+        else:
+            sheet_id = rnd.choice(sheet_ids)
+            events.append(ChangeSet(sheet_numbers={sheet_id: "S-{}-{}".format(sheet_id, rnd.randint(0, 99))}))
+        numbers.update(events[-1].sheet_numbers)
+        truths.append(PlacementState(viewports, numbers))
+    return events, state, truths
+
+
+def benchmark(count=2000, seed=0):
+    events, state, _ = random_events(count, seed)
+    start = time.time()
+    for changes in events:
+        _, state = plan_mark_updates(changes, state)
+    return count, time.time() - start
+
+
+if __name__ == "__main__":
+    failures = 0
+    for seed in range(100):
+        events, state, truths = random_events(200, seed)
+        problems = check_events(events, state, truths)
+        if problems:
+            failures += 1
+            print("seed {}: {}".format(seed, problems[0]))
+    print("event stream checks: {} of 100 failed".format(failures))
+    count, elapsed = benchmark()
+    print("{} events in {:.3f} s".format(count, elapsed))
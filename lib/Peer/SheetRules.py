@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""Правила нумерации листов и видов по уровням — из JSON-конфигурации.
+
+Конфигурация (sheet_rules.json рядом со скриптом Create Sheets):
+
+    {
+      "bases": {"start": 100, "stop": 230, "step": 10},   или список [100, 110, ...]
+      "sheets": [
+        {"offset": 0, "name": "... {elevation}"},
+        {"offset": 5, "name": "... {prev_elevation} ... {elevation}", "requires_previous": true}
+      ],
+      "views": [
+        {"name": "{base}RE", "family": "StructuralPlan", "type": "Structural Plan RE", "sheet_offset": 0,
+         "align_group": "plan"}
+      ],
+      "viewport_point": [0.5, 0.5],
+      "align": {"margins_mm": {"left": 20, "bottom": 10, "right": 10, "top": 10}}
+    }
+
+Виды с одинаковым "align_group" на одном листе совмещаются центрами по
+центру рабочей области рамки (габарит рамки минус поля margins_mm).
+
+В шаблонах доступны {base}, {number}, {level}, {elevation}, {prev_elevation},
+{prev_level}. Номер уровня ищется в имени одним заранее скомпилированным
+регулярным выражением-альтернативой; предыдущий уровень (ниже по отметке,
+с номером) — bisect по отсортированным отметкам. Планирование чистое, без
+Revit: на вход — (имя, отметка в футах, ключ) уровней.
+"""
+
+import bisect
+import io
+import json
+import re
+import time
+
+from Peer.ViewportAlign import GROUP_GAP_MM
+
+FT_TO_M = 0.3048
+
+_MISSING = object()
+
+
+class RulesError(Exception):
+    pass
+
+
+def elevation_str(elev):
+    m = round(elev, 2)
+    # Сначала число, потом знак, чтобы получить 5.10+ или 3.60-
+    return u"{}{}".format(abs(m), "+" if m >= 0 else "-")
+
+
+class LevelInfo(object):
+    __slots__ = ("name", "elevation", "key", "base")
+
+    def __init__(self, name, elevation, key=None, base=None):
+        self.name = name
+        self.elevation = elevation  # футы
+        self.key = key if key is not None else name
+        self.base = base
+
+
+class SheetSpec(object):
+    def __init__(self, number, name, level):
+        self.number = number
+        self.name = name
+        self.level = level
+
+
+class ViewSpec(object):
+    def __init__(self, name, family, type_name, level, sheet_number, align_group=None):
+        self.name = name
+        self.family = family
+        self.type_name = type_name
+        self.level = level
+        self.sheet_number = sheet_number
+        self.align_group = align_group  # виды одной группы на листе совмещаются центрами
+
+
+class SheetRulesPlan(object):
+    def __init__(self):
+        self.sheets = []
+        self.views = []
+        self.skipped = []  # выбранные уровни без номера в имени
+
+    def views_by_sheet(self):
+        """Номер листа -> [ViewSpec] в порядке конфигурации."""
+        result = {}
+        for spec in self.views:
+            if spec.sheet_number is not None:
+                result.setdefault(spec.sheet_number, []).append(spec)
+        return result
+
+    def align_groups(self):
+        """Номер листа -> [[ViewSpec]] групп выравнивания (без группы — не выравниваются)."""
+        result = {}
+        for sheet_number, specs in self.views_by_sheet().items():
+            groups = {}
+            order = []
+            for spec in specs:
+                if spec.align_group is None:
+                    continue
+                if spec.align_group not in groups:
+                    groups[spec.align_group] = []
+                    order.append(spec.align_group)
+                groups[spec.align_group].append(spec)
+            if order:
+                result[sheet_number] = [groups[name] for name in order]
+        return result
+
+
+def _bases(config):
+    bases = config.get("bases")
+    if isinstance(bases, dict):
+        bases = range(bases["start"], bases["stop"], bases.get("step", 1))
+    if not bases:
+        raise RulesError("No level bases in rules")
+    return [int(b) for b in bases]
+
+
+class SheetRules(object):
+    def __init__(self, config):
+        self.config = config
+        self.bases = _bases(config)
+        # Длинные номера первыми, строгие границы — не часть другого числа
+        alternation = "|".join(sorted((str(b) for b in self.bases), key=lambda b: (-len(b), b)))
+        self._base_re = re.compile(r"(?<!\d)(" + alternation + r")(?!\d)")
+        self.sheet_rules = config.get("sheets", [])
+        self.view_rules = config.get("views", [])
+        self.viewport_point = tuple(config.get("viewport_point", (0.5, 0.5)))
+        align = config.get("align", {})
+        self.align_margins_mm = align.get("margins_mm", {})
+        self.align_gap_mm = align.get("gap_mm", GROUP_GAP_MM)
+        self.elevation_scale = config.get("elevation_scale", FT_TO_M)
+        self._bases_cache = {}
+
+    def base_of(self, level_name):
+        """Номер уровня из имени или None."""
+        base = self._bases_cache.get(level_name, _MISSING)
+        if base is _MISSING:
+            match = self._base_re.search(level_name)
+            base = self._bases_cache[level_name] = int(match.group(1)) if match else None
+        return base
+
+    def plan(self, levels, selected):
+        """SheetRulesPlan: levels — все уровни проекта, selected — выбранные (LevelInfo)."""
+        numbered = []
+        for level in levels:
+            level.base = self.base_of(level.name)
+            if level.base is not None:
+                numbered.append(level)
+        numbered.sort(key=lambda l: l.elevation)
+        elevations = [l.elevation for l in numbered]
+
+        result = SheetRulesPlan()
+        for level in selected:
+            level.base = self.base_of(level.name)
+            if level.base is None:
+                result.skipped.append(level)
+                continue
+            # Предыдущий уровень с номером — строго ниже по отметке
+            i = bisect.bisect_left(elevations, level.elevation) - 1
+            previous = numbered[i] if i >= 0 else None
+            fields = self._fields(level, previous)
+
+            for rule in self.sheet_rules:
+                if rule.get("requires_previous") and previous is None:
+                    continue
+                number = level.base + rule.get("offset", 0)
+                fields["number"] = number
+                result.sheets.append(SheetSpec(
+                    rule.get("number", u"{number}").format(**fields),
+                    rule["name"].format(**fields),
+                    level))
+
+            for rule in self.view_rules:
+                sheet_offset = rule.get("sheet_offset")
+                fields["number"] = level.base + (sheet_offset or 0)
+                sheet_number = None
+                if sheet_offset is not None:
+                    sheet_number = rule.get("sheet_number", u"{number}").format(**fields)
+                result.views.append(ViewSpec(
+                    rule["name"].format(**fields), rule.get("family"), rule.get("type"),
+                    level, sheet_number, rule.get("align_group")))
+        return result
+
+    def _fields(self, level, previous):
+        fields = {
+            "base": level.base,
+            "level": level.name,
+            "elevation": elevation_str(level.elevation * self.elevation_scale),
+            "prev_level": u"",
+            "prev_elevation": u"",
+        }
+        if previous is not None:
+            fields["prev_level"] = previous.name
+            fields["prev_elevation"] = elevation_str(previous.elevation * self.elevation_scale)
+        return fields
+
+
+def load_rules(path):
+    with io.open(path, encoding="utf-8") as f:
+        return SheetRules(json.load(f))
+
+
+# --- Бенчмарк ---
+
+def benchmark(rules, level_count=100, repeat=20):
+    """(уровней, листов, видов, лучшее время с) планирования всего проекта."""
+    levels = [LevelInfo(u"Level {} +{}".format(rules.bases[i % len(rules.bases)], i), i * 10.0, i)
+              for i in range(level_count)]
+    best = None
+    plan = None
+    for _ in range(repeat):
+        rules._bases_cache.clear()
+        start = time.time()
+        plan = rules.plan(levels, levels[1:])
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return level_count, len(plan.sheets), len(plan.views), best
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(__file__), "..", "..", "PEERG.tab", "Dev.panel", "DevButton_4.pushbutton",
+        "sheet_rules.json")
+    rules = load_rules(path)
+    print("{} levels -> {} sheets, {} views in {:.4f} s".format(*benchmark(rules)))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Индекс размещения видов на листах: лист -> виды и вид -> листы.
+
+Строится один раз через ViewSheet.GetAllPlacedViews() вместо сбора всех
+Viewport на каждый вопрос "размещён ли вид" / "на каком листе вид".
+place() создаёт Viewport и сразу дополняет индекс.
+
+    sheet_views = SheetViewIndex(doc)
+    sheet = sheet_views.sheet_of(revit.active_view)
+    views = sheet_views.views_on(sheet)
+"""
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+
+def _key(item):
+    """Целочисленный id из элемента, ElementId или числа."""
+    if hasattr(item, "Id"):
+        item = item.Id
+    return getattr(item, "IntegerValue", item)
+
+
+class SheetViewIndex(object):
+    def __init__(self, doc, sheets=None):
+        self.doc = doc
+        if sheets is None:
+            sheets = DB.FilteredElementCollector(doc).OfClass(DB.ViewSheet).WhereElementIsNotElementType()
+        self._sheets = {}           # id листа -> ViewSheet
+        self._views_by_sheet = {}   # id листа -> set(id вида)
+        self._sheets_by_view = {}   # id вида -> set(id листа); легенды бывают на нескольких листах
+        self._viewports = {}        # (id листа, id вида) -> Viewport; листы читаются по запросу
+        self._viewports_read = set()
+        for sheet in sheets:
+            self._sheets[_key(sheet)] = sheet
+            self._views_by_sheet.setdefault(_key(sheet), set())
+            for view_id in sheet.GetAllPlacedViews():
+                self.add(sheet, view_id)
+
+    def add(self, sheet, view):
+        sheet_key, view_key = _key(sheet), _key(view)
+        if hasattr(sheet, "GetAllPlacedViews"):
+            self._sheets[sheet_key] = sheet
+        self._views_by_sheet.setdefault(sheet_key, set()).add(view_key)
+        self._sheets_by_view.setdefault(view_key, set()).add(sheet_key)
+
+    def is_placed(self, view, sheet=None):
+        sheets = self._sheets_by_view.get(_key(view), ())
+        if sheet is None:
+            return bool(sheets)
+        return _key(sheet) in sheets
+
+    def view_ids_on(self, sheet):
+        return sorted(self._views_by_sheet.get(_key(sheet), ()))
+
+    def views_on(self, sheet):
+        """Виды на листе (элементы)."""
+        return [self.doc.GetElement(DB.ElementId(view_id)) for view_id in self.view_ids_on(sheet)]
+
+    def sheets_of(self, view):
+        return [self._sheet(sheet_id) for sheet_id in sorted(self._sheets_by_view.get(_key(view), ()))]
+
+    def sheet_of(self, view):
+        """Лист, на котором размещён вид (первый, если их несколько), или None."""
+        sheets = self.sheets_of(view)
+        return sheets[0] if sheets else None
+
+    def _sheet(self, sheet_id):
+        sheet = self._sheets.get(sheet_id)
+        if sheet is None:
+            sheet = self._sheets[sheet_id] = self.doc.GetElement(DB.ElementId(sheet_id))
+        return sheet
+
+    def viewport(self, sheet, view):
+        """Viewport вида на листе или None (GetAllViewports читается один раз на лист)."""
+        sheet_key = _key(sheet)
+        if sheet_key not in self._viewports_read:
+            self._viewports_read.add(sheet_key)
+            for viewport_id in self._sheet(sheet_key).GetAllViewports():
+                viewport = self.doc.GetElement(viewport_id)
+                self._viewports.setdefault((sheet_key, _key(viewport.ViewId)), viewport)
+        return self._viewports.get((sheet_key, _key(view)))
+
+    def place(self, sheet, view, point):
+        """Viewport вида на листе (внутри транзакции) с обновлением индекса; None, если нельзя."""
+        if self.is_placed(view, sheet) or not DB.Viewport.CanAddViewToSheet(self.doc, sheet.Id, view.Id):
+            return None
+        viewport = DB.Viewport.Create(self.doc, sheet.Id, view.Id, point)
+        self.add(sheet, view)
+        self._viewports[(_key(sheet), _key(view))] = viewport
+        return viewport
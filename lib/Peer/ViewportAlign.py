@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Пакетное выравнивание видовых экранов по центру рабочей области листа.
+
+Виды одной группы (например, RE и GR одного уровня) ставятся друг на друга —
+общим центром. Сами группы не накладываются: они раскладываются рядами слева
+направо с зазором gap, а весь блок рядов центрируется в рабочей области рамки
+(габарит рамки минус поля — штамп, отступы); одна группа встаёт точно в
+центр. Все центры и габариты читаются один раз, цели считаются чистой
+функцией align_groups(), затем SetBoxCenter применяется одним проходом.
+Отчёт — на сколько сдвинулся каждый экран.
+"""
+
+import math
+
+try:
+    from Autodesk.Revit import DB
+except ImportError:  # вне Revit (тесты, бенчмарки)
+    DB = None
+
+MM_TO_FT = 1 / 304.8
+TOLERANCE_FT = 1e-6
+GROUP_GAP_MM = 20
+
+
+class ViewportBox(object):
+    """Видовой экран: центр и размеры рамки на листе (футы)."""
+
+    __slots__ = ("key", "center", "width", "height")
+
+    def __init__(self, key, center, width=0.0, height=0.0):
+        self.key = key
+        self.center = center
+        self.width = width
+        self.height = height
+
+
+class Move(object):
+    __slots__ = ("key", "old", "new")
+
+    def __init__(self, key, old, new):
+        self.key = key
+        self.old = old
+        self.new = new
+
+    @property
+    def distance(self):
+        return math.hypot(self.new[0] - self.old[0], self.new[1] - self.old[1])
+
+
+def drawable_area(outline_min, outline_max, margins_mm=None):
+    """(min_x, min_y, max_x, max_y) рабочей области по габариту рамки и полям в мм."""
+    margins_mm = margins_mm or {}
+    return (outline_min[0] + margins_mm.get("left", 0) * MM_TO_FT,
+            outline_min[1] + margins_mm.get("bottom", 0) * MM_TO_FT,
+            outline_max[0] - margins_mm.get("right", 0) * MM_TO_FT,
+            outline_max[1] - margins_mm.get("top", 0) * MM_TO_FT)
+
+
+def group_centers(sizes, area, gap=0.0):
+    """Центры групп размерами sizes [(ширина, высота)]: ряды слева направо, блок по центру area.
+
+    Группа, не помещающаяся в ширину area, начинает новый ряд; каждый ряд
+    центрируется по горизонтали, ряды идут сверху вниз.
+    """
+    area_width = area[2] - area[0]
+    rows = []  # [[индекс группы]], ширина и высота ряда
+    for i, (width, height) in enumerate(sizes):
+        if rows and rows[-1][1] + gap + width <= area_width:
+            row = rows[-1]
+            row[0].append(i)
+            row[1] += gap + width
+            row[2] = max(row[2], height)
+        else:
+            rows.append([[i], width, height])
+
+    centers = [None] * len(sizes)
+    total_height = sum(row[2] for row in rows) + gap * (len(rows) - 1)
+    center_x = (area[0] + area[2]) / 2.0
+    top = (area[1] + area[3]) / 2.0 + total_height / 2.0
+    for indices, row_width, row_height in rows:
+        x = center_x - row_width / 2.0
+        y = top - row_height / 2.0
+        for i in indices:
+            centers[i] = (x + sizes[i][0] / 2.0, y)
+            x += sizes[i][0] + gap
+        top -= row_height + gap
+    return centers
+
+
+def align_groups(groups, area, gap=GROUP_GAP_MM * MM_TO_FT):
+    """[Move] для групп ViewportBox: экраны группы — общим центром, группы — без наложений."""
+    sizes = [(max(box.width for box in group), max(box.height for box in group)) for group in groups]
+    moves = []
+    for group, target in zip(groups, group_centers(sizes, area, gap)):
+        for box in group:
+            moves.append(Move(box.key, box.center, target))
+    return moves
+
+
+# --- Revit ---
+
+def titleblocks_by_sheet(doc):
+    """Id листа -> первая рамка на нём (один сбор по всему документу)."""
+    result = {}
+    collector = DB.FilteredElementCollector(doc)\
+        .OfCategory(DB.BuiltInCategory.OST_TitleBlocks)\
+        .WhereElementIsNotElementType()
+    for titleblock in collector:
+        result.setdefault(titleblock.OwnerViewId.IntegerValue, titleblock)
+    return result
+
+
+def sheet_area(sheet, titleblock, margins_mm=None):
+    """Рабочая область листа: по рамке, а без рамки — по контуру листа."""
+    if titleblock is not None:
+        box = titleblock.get_BoundingBox(sheet)
+        if box is not None:
+            return drawable_area((box.Min.X, box.Min.Y), (box.Max.X, box.Max.Y), margins_mm)
+    outline = sheet.Outline
+    return drawable_area((outline.Min.U, outline.Min.V), (outline.Max.U, outline.Max.V), margins_mm)
+
+
+def viewport_box(viewport):
+    center = viewport.GetBoxCenter()
+    outline = viewport.GetBoxOutline()
+    return ViewportBox(viewport, (center.X, center.Y),
+                       outline.MaximumPoint.X - outline.MinimumPoint.X,
+                       outline.MaximumPoint.Y - outline.MinimumPoint.Y)
+
+
+def align_sheets(doc, sheet_groups, margins_mm=None, gap_mm=GROUP_GAP_MM):
+    """Выравнивает видовые экраны (внутри транзакции).
+
+    sheet_groups — [(лист, [[Viewport, ...], ...])]. Возвращает
+    [(лист, Viewport, Move)] только для сдвинутых экранов.
+    """
+    titleblocks = titleblocks_by_sheet(doc)
+    planned = []
+    for sheet, groups in sheet_groups:
+        area = sheet_area(sheet, titleblocks.get(sheet.Id.IntegerValue), margins_mm)
+        boxes = [[viewport_box(vp) for vp in group] for group in groups if group]
+        for move in align_groups(boxes, area, gap_mm * MM_TO_FT):
+            if move.distance > TOLERANCE_FT:
+                planned.append((sheet, move.key, move))
+
+    for sheet, viewport, move in planned:
+        viewport.SetBoxCenter(DB.XYZ(move.new[0], move.new[1], 0))
+    return planned
@@ -206,13 +206,11 @@ t.Commit()
 view = doc.ActiveView
 
 # RENAME VIEW UNIQUE by adding * symbol.
-new_name =  'EF New View'
-for i in range(20):
-    try:
-        view.Name = new_name
-        break
-    except:
-        new_name += '*'
+# NameRegistry knows all view names up front: no rename-and-retry loop.
+from Peer.NameRegistry import NameRegistry, view_kind, STAR_SUFFIX
+names = NameRegistry.from_document(doc)
+names.release(view_kind(view.ViewType), view.Name)
+view.Name = names.reserve(view_kind(view.ViewType), 'EF New View', STAR_SUFFIX)
 
 
 